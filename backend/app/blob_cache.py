@@ -0,0 +1,210 @@
+"""On-disk cache of downloaded SharePoint files for the download proxy.
+
+Files are stored under the SHA-256 of the item's cTag, which changes whenever
+the file content changes, so a cached blob never needs revalidation. Only
+files requested at least ``min_hits`` times are cached, the total size is
+capped, and the least recently served blobs are evicted first. Request
+counts are only kept for the ``_MAX_TRACKED_CTAGS`` most recently requested
+cTags, and temporary files of interrupted downloads are removed on startup.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from app.config import get_settings
+
+
+# cTags whose request counts are remembered (least recently requested dropped first)
+_MAX_TRACKED_CTAGS = 10000
+
+# Temporary files older than this are left over from a crashed writer
+_STALE_PART_SECONDS = 3600
+
+
+class BlobWriter:
+    """Write a blob to a temporary file and publish it atomically on ``commit``."""
+
+    def __init__(self, cache: "BlobCache", ctag: str) -> None:
+        self._cache = cache
+        self._ctag = ctag
+        self._size = 0
+        fd, self._tmp_path = tempfile.mkstemp(dir=cache.directory, suffix=".part")
+        self._file = os.fdopen(fd, "wb")
+
+    def write(self, data: bytes) -> bool:
+        """Append a chunk. Returns False (and aborts) once the blob is too large to cache."""
+        if self._file.closed:
+            return False
+        self._size += len(data)
+        if self._size > self._cache.max_blob_bytes:
+            self.abort()
+            return False
+        self._file.write(data)
+        return True
+
+    def commit(self) -> None:
+        """Move the completed blob into the cache."""
+        if self._file.closed:
+            return
+        self._file.close()
+        self._cache._publish(self._ctag, self._tmp_path, self._size)
+
+    def abort(self) -> None:
+        """Discard the partial blob."""
+        if not self._file.closed:
+            self._file.close()
+        try:
+            os.unlink(self._tmp_path)
+        except OSError:
+            pass
+
+
+class BlobCache:
+    """Size-capped LRU cache of file contents keyed by cTag.
+
+    Attributes:
+        directory: Directory holding the cached blobs.
+        max_bytes: Total size cap of all blobs.
+        max_blob_bytes: Files larger than this are never cached.
+        min_hits: Number of requests for a cTag before it is cached.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int,
+        max_blob_bytes: int,
+        min_hits: int = 2,
+    ) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_blob_bytes = max_blob_bytes
+        self.min_hits = min_hits
+
+        self._lock = threading.Lock()
+        self._requests: "OrderedDict[str, int]" = OrderedDict()
+        self._remove_stale_parts()
+        self._total_bytes = sum(path.stat().st_size for path in self.directory.glob("*.blob"))
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def _path(self, ctag: str) -> Path:
+        return self.directory / f"{hashlib.sha256(ctag.encode('utf-8')).hexdigest()}.blob"
+
+    def get(self, ctag: str) -> Optional[str]:
+        """Return the path of the cached blob for ``ctag``, or None.
+
+        Every lookup also counts as a request towards ``min_hits``.
+        """
+        path = self._path(ctag)
+        with self._lock:
+            self._requests[ctag] = self._requests.pop(ctag, 0) + 1
+            if len(self._requests) > _MAX_TRACKED_CTAGS:
+                self._requests.popitem(last=False)
+            if path.exists():
+                self._hits += 1
+                os.utime(path)  # mtime doubles as LRU timestamp
+                return str(path)
+            self._misses += 1
+            return None
+
+    def writer(self, ctag: str, size: Optional[int] = None) -> Optional[BlobWriter]:
+        """Start caching ``ctag`` if it is popular enough and small enough.
+
+        Args:
+            ctag: cTag of the file being downloaded.
+            size: Expected size in bytes, if known.
+
+        Returns:
+            A BlobWriter to feed the downloaded bytes into, or None if the
+            file should not be cached.
+        """
+        if not ctag or (size is not None and size > self.max_blob_bytes):
+            return None
+        with self._lock:
+            if self._requests.get(ctag, 0) < self.min_hits:
+                return None
+        return BlobWriter(self, ctag)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return size and hit/miss counters."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def _publish(self, ctag: str, tmp_path: str, size: int) -> None:
+        path = self._path(ctag)
+        with self._lock:
+            previous = path.stat().st_size if path.exists() else 0
+            os.replace(tmp_path, path)
+            self._total_bytes += size - previous
+            self._evict()
+
+    def _remove_stale_parts(self) -> None:
+        """Delete temporary files left behind by writers that never finished."""
+        cutoff = time.time() - _STALE_PART_SECONDS
+        for part in self.directory.glob("*.part"):
+            try:
+                if part.stat().st_mtime < cutoff:
+                    part.unlink()
+            except OSError:
+                continue
+
+    def _evict(self) -> None:
+        """Delete least recently served blobs until under ``max_bytes`` (lock held)."""
+        if self._total_bytes <= self.max_bytes:
+            return
+        blobs = sorted(self.directory.glob("*.blob"), key=lambda p: p.stat().st_mtime)
+        for blob in blobs:
+            if self._total_bytes <= self.max_bytes:
+                break
+            try:
+                size = blob.stat().st_size
+                blob.unlink()
+            except OSError:
+                continue
+            self._total_bytes -= size
+            self._evictions += 1
+
+
+_BLOB_CACHE: Optional[BlobCache] = None
+_blob_cache_lock = threading.Lock()
+
+
+def get_blob_cache() -> Optional[BlobCache]:
+    """Get the process-wide download blob cache configured from settings.
+
+    Returns:
+        BlobCache: Shared cache instance, or None if the cache is disabled
+        (``download_cache_max_mb`` is 0).
+    """
+    global _BLOB_CACHE
+
+    settings = get_settings()
+    if settings.download_cache_max_mb <= 0:
+        return None
+
+    with _blob_cache_lock:
+        if _BLOB_CACHE is None:
+            _BLOB_CACHE = BlobCache(
+                directory=settings.download_cache_dir,
+                max_bytes=int(settings.download_cache_max_mb * 1024 * 1024),
+                max_blob_bytes=int(settings.download_cache_max_file_mb * 1024 * 1024),
+                min_hits=settings.download_cache_min_hits,
+            )
+        return _BLOB_CACHE
@@ -16,12 +16,101 @@ class Settings(BaseSettings):
         client_id: Application (client) ID for Microsoft Graph API.
         client_secret: Client secret for Microsoft Graph API authentication.
         sharepoint_site_id: SharePoint site identifier.
+        graph_token_refresh_margin_seconds: Seconds before token expiry at which
+            a background refresh is started.
+        graph_token_expiry_skew_seconds: Seconds before token expiry at which a
+            cached token is no longer handed out.
+        http_timeout_seconds: Default read/write/pool timeout for outbound HTTP calls.
+        http_connect_timeout_seconds: Connect timeout for outbound HTTP calls.
+        http_max_connections: Connection limit for hosts without a dedicated pool.
+        http_max_keepalive_connections: Idle keep-alive connections kept per pool.
+        http_keepalive_expiry_seconds: Idle time before a pooled connection is closed.
+        http_graph_max_connections: Connection limit for graph.microsoft.com.
+        http_download_max_connections: Connection limit for SharePoint download hosts.
+        http2_enabled: Negotiate HTTP/2 when the ``h2`` package is installed.
+        graph_concurrency_initial: Initial concurrent Graph requests per tenant.
+        graph_concurrency_min: Lowest concurrency the throttle controller shrinks to.
+        graph_concurrency_max: Highest concurrency the throttle controller grows to.
+        graph_max_retries: Retries for throttled (429/503) or failed (5xx) Graph requests.
+        metadata_cache_max_entries: Documents kept in the metadata cache (LRU).
+        metadata_cache_ttl_seconds: Seconds cached metadata is served before
+            being revalidated with ``If-None-Match``.
+        download_url_ttl_seconds: Seconds a cached pre-signed download URL is
+            trusted before the metadata is refetched.
+        index_file_extensions: Comma-separated file extensions to index
+            (e.g. ".pdf,.docx"); empty indexes every file.
+        index_max_file_size_mb: Skip files larger than this; 0 means no limit.
+        download_spool_max_memory_mb: Downloads larger than this are spooled to disk.
+        download_spool_dir: Directory for spooled downloads (system temp dir if unset).
+        download_chunk_size_kb: Chunk size used when streaming downloads.
+        download_cache_dir: Directory of the download proxy's on-disk file cache.
+        download_cache_max_mb: Total size cap of the download cache; 0 disables it.
+        download_cache_max_file_mb: Files larger than this are never cached.
+        download_cache_min_hits: Requests for a file before it is cached.
+        extraction_mode: 'process' to extract text in worker processes,
+            'inline' to extract in the calling thread.
+        extraction_workers: Number of extraction worker processes; 0 uses all CPU cores.
+        extraction_timeout_seconds: Time allowed to extract one file before
+            its worker is killed and the file is skipped.
+        extraction_max_tasks_per_child: Files a worker extracts before it is
+            replaced; 0 never recycles workers.
+        extraction_stream_min_mb: PDFs and Excel workbooks at least this large
+            are parsed page by page (or row group by row group) in a worker
+            process that streams the blocks back while they are indexed.
+        excel_rows_per_block: Maximum worksheet rows grouped into one text block.
+        excel_max_block_chars: Maximum characters grouped into one row block.
+        excel_max_rows: Rows read per worksheet; 0 reads every row.
+        excel_max_columns: Columns read per worksheet row; 0 reads every column.
+        extraction_cache_dir: Directory of the on-disk extracted-text cache.
+        extraction_cache_max_mb: Size cap of the extracted-text cache; 0 disables it.
+        index_embed_batch_size: Chunks embedded and uploaded per batch while
+            a document is being indexed.
+        index_document_workers: Documents indexed in parallel by index-all
+            and sync runs.
+        sync_state_path: JSON file storing the Graph delta link of each synced site.
         qdrant_host: Qdrant vector database host address.
         qdrant_port: Qdrant vector database port number.
         qdrant_collection_name: Name of the Qdrant collection for SPO documents.
         embedding_model: Name or identifier of the embedding model to use.
+        embedding_dimension: Expected output dimension of the embedding model;
+            0 uses the dimension probed from the model at startup.
+        embedding_truncate_dimension: Matryoshka dimension vectors are cut
+            to (and renormalized) before storage and search; 0 keeps the
+            full vectors.
+        vector_datatype: Storage type of vectors in Qdrant: 'float32' or
+            'float16' (half the memory).
+        embedding_cache_path: SQLite file of the persistent embedding cache.
+        embedding_cache_max_mb: Size cap of the cached vectors; 0 disables the cache.
+        embedding_batch_max_tokens: Token budget of one embedding request.
+        embedding_batch_max_items: Maximum number of texts per embedding request.
+        embedding_concurrency: Embedding requests sent in parallel.
+        embedding_max_retries: Retries of a failed embedding request.
+        query_embed_window_ms: Milliseconds concurrent search queries are
+            collected before their embeddings are requested together.
+        query_embed_max_batch: Queries per batched query-embedding request.
+        query_cache_max_entries: Normalized queries whose embedding and search
+            hits are kept in memory (each); 0 disables the query cache.
+        query_cache_ttl_seconds: Seconds a cached query embedding or search
+            result stays valid.
         chunk_size: Maximum size of text chunks in characters.
         chunk_overlap: Overlap size between consecutive chunks.
+        chunking_strategy: How chunks are cut: 'characters' (fixed windows of
+            chunk_size/chunk_overlap), 'tokens' (windows of chunk_size_tokens/
+            chunk_overlap_tokens, counted with the embedding model's tokenizer),
+            'structure' (up to chunk_size characters, ending at headings,
+            paragraphs or sentences, without overlap) or 'content' (up to
+            chunk_size characters, ending where a rolling hash of the text
+            matches, so unchanged chunks survive edits and are not re-embedded).
+        chunk_size_tokens: Maximum size of text chunks in tokens.
+        chunk_overlap_tokens: Overlap in tokens between consecutive chunks.
+        tokenizer_encoding: tiktoken encoding name used for token chunking.
+            Empty derives it from embedding_model.
+        dedup_threshold: Estimated Jaccard similarity above which a new chunk
+            is recorded as a duplicate of another document's chunk instead of
+            being embedded and stored. 0 (default) disables deduplication;
+            0.9 is a typical value.
+        dedup_index_path: SQLite file of the LSH band and duplicate-source
+            lookup tables used by deduplication.
     """
 
     # Demo mode (set to True to use dummy data without real SharePoint)
@@ -32,6 +121,64 @@ class Settings(BaseSettings):
     client_id: str = "demo-client-id"
     client_secret: str = "demo-client-secret"
     sharepoint_site_id: Optional[str] = None
+    graph_token_refresh_margin_seconds: int = 300
+    graph_token_expiry_skew_seconds: int = 60
+
+    # Shared HTTP transport settings
+    http_timeout_seconds: float = 30.0
+    http_connect_timeout_seconds: float = 10.0
+    http_max_connections: int = 100
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry_seconds: float = 30.0
+    http_graph_max_connections: int = 16
+    http_download_max_connections: int = 16
+    http2_enabled: bool = False
+
+    # Graph throttling (AIMD concurrency control)
+    graph_concurrency_initial: int = 4
+    graph_concurrency_min: int = 1
+    graph_concurrency_max: int = 32
+    graph_max_retries: int = 5
+
+    # Document metadata cache
+    metadata_cache_max_entries: int = 2048
+    metadata_cache_ttl_seconds: float = 60
+    download_url_ttl_seconds: float = 600
+
+    # Document enumeration filters
+    index_file_extensions: str = ""
+    index_max_file_size_mb: float = 0
+
+    # Streaming downloads
+    download_spool_max_memory_mb: float = 16
+    download_spool_dir: Optional[str] = None
+    download_chunk_size_kb: int = 256
+
+    # Download proxy blob cache (keyed by cTag)
+    download_cache_dir: str = "./download_cache"
+    download_cache_max_mb: float = 1024
+    download_cache_max_file_mb: float = 100
+    download_cache_min_hits: int = 2
+
+    # Text extraction worker pool
+    extraction_mode: str = "process"  # "process" or "inline"
+    extraction_workers: int = 0
+    extraction_timeout_seconds: float = 120
+    extraction_max_tasks_per_child: int = 50
+    extraction_stream_min_mb: float = 20
+    excel_rows_per_block: int = 50
+    excel_max_block_chars: int = 2000
+    excel_max_rows: int = 100000
+    excel_max_columns: int = 200
+    index_embed_batch_size: int = 64
+    index_document_workers: int = 4
+
+    # Extracted-text cache (keyed by file content hash)
+    extraction_cache_dir: str = "./extraction_cache"
+    extraction_cache_max_mb: float = 2048
+
+    # Incremental sync state (Graph delta links per site)
+    sync_state_path: str = "./sync_state.json"
 
     # Qdrant settings
     qdrant_mode: str = "local"  # "local" or "server"
@@ -42,11 +189,39 @@ class Settings(BaseSettings):
 
     # Embedding settings
     embedding_model: str = "text-embedding-3-small"
-    embedding_dimension: int = 1536
+    embedding_dimension: int = 0  # 0: probe the model
+    embedding_truncate_dimension: int = 0  # e.g. 256, 512 or 1024 for text-embedding-3
+    vector_datatype: str = "float32"  # "float32" or "float16"
+
+    # Persistent embedding cache (keyed by model, dimension and text hash)
+    embedding_cache_path: str = "./embedding_cache.sqlite3"
+    embedding_cache_max_mb: float = 1024
+
+    # Embedding request batching (shared by concurrently indexed documents)
+    embedding_batch_max_tokens: int = 32000
+    embedding_batch_max_items: int = 128
+    embedding_concurrency: int = 4
+    embedding_max_retries: int = 3
+
+    # Query embedding coalescing (concurrent searches)
+    query_embed_window_ms: float = 5
+    query_embed_max_batch: int = 32
+
+    # Query embedding and search hit cache (keyed by normalized query text)
+    query_cache_max_entries: int = 1024
+    query_cache_ttl_seconds: float = 600
 
     # Chunking settings
     chunk_size: int = 1000
     chunk_overlap: int = 200
+    chunking_strategy: str = "characters"  # "characters", "tokens", "structure" or "content"
+    chunk_size_tokens: int = 512
+    chunk_overlap_tokens: int = 64
+    tokenizer_encoding: str = ""
+
+    # Near-duplicate chunk detection (MinHash/LSH)
+    dedup_threshold: float = 0.0  # e.g. 0.9; 0 disables
+    dedup_index_path: str = "./dedup_index.sqlite3"
 
     openai_api_key: str = "demo_openai_api_key"
     llm_model: str = "demo_llm_model"
@@ -0,0 +1,210 @@
+"""Local lookup tables for near-duplicate detection.
+
+Finding near-duplicate candidates (``app.rag.dedup``) and maintaining the
+``duplicate_sources`` of stored chunks used to be payload filter queries on
+Qdrant. The local Qdrant ignores payload indexes, so every such query scanned
+the whole collection while holding the client lock. This SQLite database
+keeps the same relations keyed for direct lookup:
+
+- ``bands``: LSH band key -> IDs of the stored points carrying it
+- ``duplicates``: document deduplicated into a point -> point ID
+
+Qdrant stays the source of truth: point IDs found here are resolved against
+the collection and IDs that no longer exist are ignored. A missing database
+is rebuilt from the ``lsh_bands`` and ``duplicate_sources`` payloads (see
+``app.qdrant_client.create_collection``).
+"""
+
+import os
+import sqlite3
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from app.config import get_settings
+
+
+# Keys per SQL statement (SQLite limits the number of bound parameters)
+_LOOKUP_BATCH = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bands (
+    band TEXT NOT NULL,
+    point_id TEXT NOT NULL,
+    PRIMARY KEY (band, point_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS bands_point_id ON bands (point_id);
+CREATE TABLE IF NOT EXISTS duplicates (
+    document_id TEXT NOT NULL,
+    point_id TEXT NOT NULL,
+    PRIMARY KEY (document_id, point_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS duplicates_point_id ON duplicates (point_id);
+"""
+
+
+def _batches(items: Sequence[str]) -> Iterable[List[str]]:
+    for start in range(0, len(items), _LOOKUP_BATCH):
+        yield list(items[start:start + _LOOKUP_BATCH])
+
+
+class DedupIndex:
+    """SQLite tables of LSH band keys and duplicate sources per point.
+
+    Attributes:
+        path: SQLite database file.
+        created: Whether the database file did not exist when opened (its
+            contents must then be rebuilt from the collection).
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.created = not os.path.exists(path)
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def add_bands(self, rows: Iterable[Tuple[str, Sequence[str]]]) -> None:
+        """Record the band keys of stored points.
+
+        Args:
+            rows: ``(point_id, band_keys)`` pairs.
+        """
+        values = [(band, point_id) for point_id, keys in rows for band in keys]
+        if not values:
+            return
+        with self._lock:
+            self._write("INSERT OR IGNORE INTO bands (band, point_id) VALUES (?, ?)", values)
+
+    def find_candidates(self, band_keys: Sequence[Sequence[str]], limit: int) -> List[List[str]]:
+        """Find points sharing band keys with each of several chunks.
+
+        All band keys of the chunks are looked up together.
+
+        Args:
+            band_keys: Band keys of each chunk.
+            limit: Maximum number of candidates per chunk.
+
+        Returns:
+            Point IDs per chunk, most shared band keys first.
+        """
+        all_keys = list({key for keys in band_keys for key in keys})
+        points_by_band: Dict[str, List[str]] = defaultdict(list)
+        with self._lock:
+            for batch in _batches(all_keys):
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT band, point_id FROM bands WHERE band IN ({placeholders})", batch
+                ).fetchall()
+                for band, point_id in rows:
+                    points_by_band[band].append(point_id)
+
+        candidates: List[List[str]] = []
+        for keys in band_keys:
+            shared: Counter = Counter()
+            for key in keys:
+                shared.update(points_by_band.get(key, ()))
+            candidates.append([point_id for point_id, _ in shared.most_common(limit)])
+        return candidates
+
+    def add_duplicate(self, point_id: str, document_id: str) -> None:
+        """Record that a document was deduplicated into a point."""
+        with self._lock:
+            self._write(
+                "INSERT OR IGNORE INTO duplicates (document_id, point_id) VALUES (?, ?)",
+                [(document_id, point_id)],
+            )
+
+    def remove_duplicate(self, point_id: str, document_id: str) -> None:
+        """Forget that a document was deduplicated into a point."""
+        with self._lock:
+            self._write(
+                "DELETE FROM duplicates WHERE document_id = ? AND point_id = ?",
+                [(document_id, point_id)],
+            )
+
+    def duplicated_points(self, document_id: str) -> List[str]:
+        """Return the points a document was deduplicated into."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT point_id FROM duplicates WHERE document_id = ?", (document_id,)
+            ).fetchall()
+        return [point_id for (point_id,) in rows]
+
+    def remove_document(self, document_id: str) -> None:
+        """Forget every point a document was deduplicated into."""
+        with self._lock:
+            self._write("DELETE FROM duplicates WHERE document_id = ?", [(document_id,)])
+
+    def duplicate_document_ids(self) -> Set[str]:
+        """Return every document recorded as duplicate source of some point."""
+        with self._lock:
+            rows = self._conn.execute("SELECT DISTINCT document_id FROM duplicates").fetchall()
+        return {document_id for (document_id,) in rows}
+
+    def points_with_duplicates(self, point_ids: Sequence[str]) -> Set[str]:
+        """Return the points among ``point_ids`` that other documents were deduplicated into."""
+        found: Set[str] = set()
+        with self._lock:
+            for batch in _batches(list(point_ids)):
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT DISTINCT point_id FROM duplicates WHERE point_id IN ({placeholders})", batch
+                ).fetchall()
+                found.update(point_id for (point_id,) in rows)
+        return found
+
+    def remove_points(self, point_ids: Sequence[str]) -> None:
+        """Forget the band keys and duplicate sources of deleted points."""
+        point_ids = list(point_ids)
+        if not point_ids:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for batch in _batches(point_ids):
+                    placeholders = ",".join("?" * len(batch))
+                    self._conn.execute(f"DELETE FROM bands WHERE point_id IN ({placeholders})", batch)
+                    self._conn.execute(f"DELETE FROM duplicates WHERE point_id IN ({placeholders})", batch)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def _write(self, statement: str, rows: List[Tuple[str, ...]]) -> None:
+        """Run a statement for several rows in one transaction (lock held)."""
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.executemany(statement, rows)
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+
+
+_DEDUP_INDEX: Optional[DedupIndex] = None
+_dedup_index_lock = threading.Lock()
+
+
+def get_dedup_index() -> DedupIndex:
+    """Get the process-wide dedup index configured from settings.
+
+    Returns:
+        DedupIndex: Shared index instance.
+    """
+    global _DEDUP_INDEX
+
+    with _dedup_index_lock:
+        if _DEDUP_INDEX is None:
+            _DEDUP_INDEX = DedupIndex(get_settings().dedup_index_path)
+        return _DEDUP_INDEX
@@ -0,0 +1,84 @@
+"""Bounded-memory buffer for streamed file downloads.
+
+Downloads are written chunk by chunk into a ``DownloadSpool``. Small files
+stay in memory; once the content grows past a threshold it is moved to a
+temporary file on disk, so a handful of concurrent large downloads cannot
+exhaust the indexer's memory.
+"""
+
+import io
+import os
+import tempfile
+from typing import BinaryIO, Optional
+
+
+class DownloadSpool:
+    """Write-once buffer that spills from memory to a named temporary file.
+
+    This behaves like ``tempfile.SpooledTemporaryFile``, except that the
+    on-disk file has a path, so it can be handed to code that opens files
+    by name.
+
+    Attributes:
+        max_memory_bytes: Size above which the content is moved to disk.
+        size: Number of bytes written so far.
+        path: Path of the on-disk file, or None while the content is in memory.
+    """
+
+    def __init__(self, max_memory_bytes: int, directory: Optional[str] = None) -> None:
+        self.max_memory_bytes = max_memory_bytes
+        self.size = 0
+        self.path: Optional[str] = None
+        self._directory = directory
+        self._file: BinaryIO = io.BytesIO()
+
+    @property
+    def in_memory(self) -> bool:
+        """Whether the content is still held in memory."""
+        return self.path is None
+
+    def write(self, data: bytes) -> None:
+        """Append a chunk, spilling to disk once ``max_memory_bytes`` is exceeded."""
+        if self.in_memory and self.size + len(data) > self.max_memory_bytes:
+            self._rollover()
+        self._file.write(data)
+        self.size += len(data)
+
+    def open(self) -> BinaryIO:
+        """Return the buffered content as a readable file object positioned at the start."""
+        self._file.flush()
+        self._file.seek(0)
+        return self._file
+
+    def getvalue(self) -> bytes:
+        """Return the whole content as bytes (reads the file if spilled to disk)."""
+        return self.open().read()
+
+    def close(self) -> None:
+        """Release the buffer and delete the on-disk file, if any."""
+        self._file.close()
+        if self.path is not None:
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+    def __enter__(self) -> "DownloadSpool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _rollover(self) -> None:
+        if self._directory:
+            os.makedirs(self._directory, exist_ok=True)
+        disk_file = tempfile.NamedTemporaryFile(
+            prefix="rag-spo-",
+            suffix=".download",
+            dir=self._directory,
+            delete=False,
+        )
+        disk_file.write(self._file.getvalue())
+        self._file.close()
+        self._file = disk_file
+        self.path = disk_file.name
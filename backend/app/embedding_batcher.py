@@ -0,0 +1,220 @@
+"""Token-budgeted, concurrent micro-batching of embedding requests.
+
+``embed_texts`` used to send whatever it was given in one request: a huge
+request for a large document, and one small request at a time while
+documents were indexed one by one. The batcher instead queues texts from
+every caller (e.g. several documents indexed in parallel), packs them into
+requests bounded by a token budget and an item limit, and keeps up to
+``embedding_concurrency`` requests in flight. A failed request is retried
+on its own with exponential backoff; only the callers whose texts were in
+it see the error if every attempt fails.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+import tiktoken
+
+from app.config import get_settings
+from app.rag.tokenizer import count_tokens, get_tokenizer
+
+
+EmbedFunction = Callable[[List[str]], List[List[float]]]
+
+_tokenizer: Optional[tiktoken.Encoding] = None
+_tokenizer_resolved = False
+_tokenizer_lock = threading.Lock()
+
+
+def _batching_tokenizer() -> Optional[tiktoken.Encoding]:
+    """Load the tokenizer once; None if it is unavailable.
+
+    A failed load is remembered: loading downloads the BPE file without a
+    timeout, which must not be retried for every request on offline hosts.
+    """
+    global _tokenizer, _tokenizer_resolved
+
+    with _tokenizer_lock:
+        if not _tokenizer_resolved:
+            try:
+                _tokenizer = get_tokenizer()
+            except Exception as exc:
+                # BPE files cannot be downloaded (offline host without TIKTOKEN_CACHE_DIR)
+                print(f"[EmbeddingBatcher] Tokenizer unavailable, estimating token counts: {exc}")
+            _tokenizer_resolved = True
+        return _tokenizer
+
+
+def _estimate_tokens(texts: List[str]) -> List[int]:
+    """Token counts for batching; a byte-based estimate if tiktoken is unavailable."""
+    tokenizer = _batching_tokenizer()
+    if tokenizer is None:
+        return [len(text.encode("utf-8")) // 3 + 1 for text in texts]
+    return count_tokens(texts, tokenizer)
+
+
+class EmbeddingBatcher:
+    """Packs texts from concurrent callers into bounded, parallel embedding requests.
+
+    Attributes:
+        max_tokens: Token budget of one request (a longer single text is sent alone).
+        max_items: Maximum number of texts per request.
+        concurrency: Maximum number of requests in flight.
+        max_retries: Retries of a failed request before its texts fail.
+    """
+
+    def __init__(
+        self,
+        embed_function: EmbedFunction,
+        max_tokens: int = 32000,
+        max_items: int = 128,
+        concurrency: int = 4,
+        max_retries: int = 3,
+        retry_backoff: float = 1.0,
+    ) -> None:
+        self.max_tokens = max_tokens
+        self.max_items = max_items
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self._embed_function = embed_function
+        self._retry_backoff = retry_backoff
+
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="embed-batch")
+        self._lock = threading.Lock()
+        self._pending: Deque[Tuple[str, int, Future]] = deque()
+        self._in_flight = 0
+
+        self._requests = 0
+        self._retries = 0
+        self._failures = 0
+        self._texts = 0
+        self._tokens = 0
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        """Embed texts, sharing requests with other concurrent callers.
+
+        Args:
+            texts: Texts to embed.
+
+        Returns:
+            Embedding vectors in the order of ``texts``.
+
+        Raises:
+            Exception: The last error of a request containing one of the
+                texts, if all its attempts failed.
+        """
+        if not texts:
+            return []
+
+        futures: List[Future] = []
+        token_counts = _estimate_tokens(list(texts))
+        with self._lock:
+            for text, tokens in zip(texts, token_counts):
+                future: Future = Future()
+                self._pending.append((text, tokens, future))
+                futures.append(future)
+            self._dispatch()
+        return [future.result() for future in futures]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return request, retry and packing counters."""
+        with self._lock:
+            return {
+                "requests": self._requests,
+                "retries": self._retries,
+                "failed_requests": self._failures,
+                "texts": self._texts,
+                "tokens": self._tokens,
+                "avg_texts_per_request": round(self._texts / self._requests, 2) if self._requests else 0.0,
+                "in_flight": self._in_flight,
+                "pending": len(self._pending),
+            }
+
+    def shutdown(self) -> None:
+        """Stop the request threads after the requests in flight finish."""
+        self._executor.shutdown(wait=True)
+
+    def _dispatch(self) -> None:
+        """Start requests for pending texts while slots are free (lock held)."""
+        while self._pending and self._in_flight < self.concurrency:
+            batch: List[Tuple[str, int, Future]] = []
+            tokens = 0
+            while self._pending and len(batch) < self.max_items:
+                text_tokens = self._pending[0][1]
+                if batch and tokens + text_tokens > self.max_tokens:
+                    break
+                batch.append(self._pending.popleft())
+                tokens += text_tokens
+            self._in_flight += 1
+            self._requests += 1
+            self._texts += len(batch)
+            self._tokens += tokens
+            self._executor.submit(self._run, batch)
+
+    def _run(self, batch: List[Tuple[str, int, Future]]) -> None:
+        texts = [text for text, _, _ in batch]
+        error: Optional[BaseException] = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                with self._lock:
+                    self._retries += 1
+                delay = self._retry_backoff * 2 ** (attempt - 1)
+                print(f"[EmbeddingBatcher] Retrying request of {len(texts)} texts in {delay:.1f}s: {error}")
+                time.sleep(delay)
+            try:
+                vectors = self._embed_function(texts)
+                if len(vectors) != len(texts):
+                    raise ValueError(f"Expected {len(texts)} embeddings, got {len(vectors)}")
+            except Exception as exc:
+                error = exc
+                continue
+            for (_, _, future), vector in zip(batch, vectors):
+                future.set_result(vector)
+            break
+        else:
+            with self._lock:
+                self._failures += 1
+            for _, _, future in batch:
+                future.set_exception(error)
+
+        with self._lock:
+            self._in_flight -= 1
+            self._dispatch()
+
+
+_EMBEDDING_BATCHER: Optional[EmbeddingBatcher] = None
+_embedding_batcher_lock = threading.Lock()
+
+
+def get_embedding_batcher(embed_function: EmbedFunction) -> EmbeddingBatcher:
+    """Get the process-wide embedding batcher configured from settings.
+
+    Args:
+        embed_function: Function sending one embedding request; used when
+            the batcher is created.
+
+    Returns:
+        EmbeddingBatcher: Shared batcher instance.
+    """
+    global _EMBEDDING_BATCHER
+
+    with _embedding_batcher_lock:
+        if _EMBEDDING_BATCHER is None:
+            settings = get_settings()
+            _EMBEDDING_BATCHER = EmbeddingBatcher(
+                embed_function,
+                max_tokens=settings.embedding_batch_max_tokens,
+                max_items=settings.embedding_batch_max_items,
+                concurrency=settings.embedding_concurrency,
+                max_retries=settings.embedding_max_retries,
+            )
+        return _EMBEDDING_BATCHER
+
+
+def get_embedding_batcher_stats() -> Dict[str, Any]:
+    """Return the shared batcher's counters (empty before first use)."""
+    batcher = _EMBEDDING_BATCHER
+    return batcher.stats() if batcher is not None else {}
@@ -0,0 +1,213 @@
+"""Persistent cache of embedding vectors.
+
+Vectors are stored in a local SQLite database keyed by
+``(model name, dimension, SHA-256 of the text)``, so text that was embedded
+once (unchanged documents on re-index, shared boilerplate, a full re-index
+after the Qdrant collection was wiped) never goes to the embedding API
+again. Vectors are stored as compact float32 blobs. The total size is capped
+and the least recently used vectors are evicted first.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.config import get_settings
+
+
+# Keys per SQL statement (SQLite limits the number of bound parameters)
+_LOOKUP_BATCH = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    model TEXT NOT NULL,
+    dim INTEGER NOT NULL,
+    text_hash BLOB NOT NULL,
+    vector BLOB NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (model, dim, text_hash)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used);
+"""
+
+
+def text_hash(text: str) -> bytes:
+    """SHA-256 digest of a text, as used in cache keys."""
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    """Size-capped LRU cache of embedding vectors in SQLite.
+
+    Attributes:
+        path: SQLite database file.
+        max_bytes: Total size cap of the stored vectors.
+    """
+
+    def __init__(self, path: str, max_bytes: int) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+        self._lock = threading.Lock()
+        self._total_bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+        ).fetchone()[0]
+        self._hits = 0
+        self._misses = 0
+        self._stores = 0
+        self._evictions = 0
+
+    def get_many(self, model: str, dim: int, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """Look up the vectors of several texts.
+
+        Args:
+            model: Embedding model name.
+            dim: Embedding dimension requested from the model.
+            texts: Texts to look up.
+
+        Returns:
+            Vector of each text in order, or None where it is not cached.
+        """
+        hashes = [text_hash(text) for text in texts]
+        found: Dict[bytes, bytes] = {}
+        now = time.time()
+        with self._lock:
+            for start in range(0, len(hashes), _LOOKUP_BATCH):
+                batch = list(set(hashes[start:start + _LOOKUP_BATCH]))
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings "
+                    f"WHERE model = ? AND dim = ? AND text_hash IN ({placeholders})",
+                    [model, dim, *batch],
+                ).fetchall()
+                found.update(rows)
+            if found:
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND dim = ? AND text_hash = ?",
+                    [(now, model, dim, digest) for digest in found],
+                )
+            vectors = [
+                np.frombuffer(found[digest], dtype=np.float32).tolist() if digest in found else None
+                for digest in hashes
+            ]
+            hits = sum(1 for vector in vectors if vector is not None)
+            self._hits += hits
+            self._misses += len(vectors) - hits
+        return vectors
+
+    def put_many(
+        self,
+        model: str,
+        dim: int,
+        texts: Sequence[str],
+        vectors: Sequence[Sequence[float]],
+    ) -> None:
+        """Store the vectors of several texts.
+
+        Args:
+            model: Embedding model name.
+            dim: Embedding dimension requested from the model.
+            texts: Embedded texts.
+            vectors: Vector of each text, in the same order.
+        """
+        now = time.time()
+        rows = {
+            text_hash(text): np.asarray(vector, dtype=np.float32).tobytes()
+            for text, vector in zip(texts, vectors)
+        }
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for digest, blob in rows.items():
+                    cursor = self._conn.execute(
+                        "INSERT OR IGNORE INTO embeddings (model, dim, text_hash, vector, last_used) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (model, dim, digest, blob, now),
+                    )
+                    if cursor.rowcount:
+                        self._total_bytes += len(blob)
+                        self._stores += 1
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._evict()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return size and hit/miss counters."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "stores": self._stores,
+                "evictions": self._evictions,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def _evict(self) -> None:
+        """Delete least recently used vectors until under ``max_bytes`` (lock held)."""
+        if self._total_bytes <= self.max_bytes:
+            return
+        # Evict down to 90% so the next few stores do not evict again
+        target = int(self.max_bytes * 0.9)
+        rows = self._conn.execute(
+            "SELECT model, dim, text_hash, LENGTH(vector) FROM embeddings ORDER BY last_used"
+        )
+        victims = []
+        for model, dim, digest, size in rows:
+            if self._total_bytes <= target:
+                break
+            victims.append((model, dim, digest))
+            self._total_bytes -= size
+        rows.close()
+        self._conn.executemany(
+            "DELETE FROM embeddings WHERE model = ? AND dim = ? AND text_hash = ?",
+            victims,
+        )
+        self._evictions += len(victims)
+
+
+_EMBEDDING_CACHE: Optional[EmbeddingCache] = None
+_embedding_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Get the process-wide embedding cache configured from settings.
+
+    Returns:
+        EmbeddingCache: Shared cache instance, or None if the cache is
+        disabled (``embedding_cache_max_mb`` is 0).
+    """
+    global _EMBEDDING_CACHE
+
+    settings = get_settings()
+    if settings.embedding_cache_max_mb <= 0:
+        return None
+
+    with _embedding_cache_lock:
+        if _EMBEDDING_CACHE is None:
+            _EMBEDDING_CACHE = EmbeddingCache(
+                path=settings.embedding_cache_path,
+                max_bytes=int(settings.embedding_cache_max_mb * 1024 * 1024),
+            )
+        return _EMBEDDING_CACHE
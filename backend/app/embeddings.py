@@ -4,14 +4,33 @@ This module provides functions to convert text into vector embeddings.
 
 It is wired to use the shared ``llm_utils.load_embed_model`` utility, which
 handles provider selection and model caching based on environment variables.
+Document embeddings go through the persistent ``EmbeddingCache`` first, so
+only text that was never embedded with the current model reaches the API,
+and the remaining texts are sent through the shared ``EmbeddingBatcher``.
+
+The model's output dimension is probed with one request instead of being
+trusted from the settings. With ``embedding_truncate_dimension`` set, every
+vector is cut to its leading dimensions and renormalized (Matryoshka
+embeddings such as text-embedding-3 keep most of their retrieval quality),
+so documents and queries are stored and searched in the smaller space.
 """
 
-from typing import List
+import threading
+from typing import List, Optional
 
+import numpy as np
+
+from app.config import get_settings
+from app.embedding_batcher import get_embedding_batcher
+from app.embedding_cache import get_embedding_cache
+from app.query_cache import get_query_vector_cache, normalize_query
+from app.query_coalescer import get_query_coalescer
 from llm_utils import load_embed_model
 
 
 _EMBEDDING_MODEL = None
+_MODEL_DIMENSION: Optional[int] = None
+_dimension_lock = threading.Lock()
 
 
 def _get_embedding_model():
@@ -33,6 +52,79 @@ def _get_embedding_model():
     return _EMBEDDING_MODEL
 
 
+def _model_name(model) -> str:
+    """Name identifying the embedding model in cache keys."""
+    return getattr(model, "model", None) or get_settings().embedding_model
+
+
+def get_embedding_model_key() -> str:
+    """Identify the vectors produced now: model name and stored dimension.
+
+    The same key as the embedding cache uses; it changes with the embedding
+    provider, model or truncate dimension.
+    """
+    return f"{_model_name(_get_embedding_model())}/{get_embedding_dimension()}"
+
+
+def get_embedding_dimension() -> int:
+    """Get the dimension of the vectors stored in and searched against Qdrant.
+
+    The model's own dimension is probed with one embedding request the
+    first time this is called.
+
+    Returns:
+        ``embedding_truncate_dimension`` if set, otherwise the model's dimension.
+
+    Raises:
+        ValueError: If ``embedding_dimension`` is set and differs from the
+            model's dimension, or the truncate dimension exceeds it.
+    """
+    global _MODEL_DIMENSION
+
+    if _MODEL_DIMENSION is None:
+        with _dimension_lock:
+            if _MODEL_DIMENSION is None:
+                _MODEL_DIMENSION = _probe_model_dimension()
+
+    truncate_dimension = get_settings().embedding_truncate_dimension
+    return truncate_dimension if truncate_dimension > 0 else _MODEL_DIMENSION
+
+
+def _probe_model_dimension() -> int:
+    settings = get_settings()
+    model = _get_embedding_model()
+    model_name = _model_name(model)
+
+    dimension = len(model.embed_query("dimension probe"))
+    print(f"[Embeddings] Model {model_name} produces {dimension}-dimensional vectors")
+
+    if settings.embedding_dimension > 0 and settings.embedding_dimension != dimension:
+        raise ValueError(
+            f"EMBEDDING_DIMENSION is {settings.embedding_dimension} but model {model_name} "
+            f"produces {dimension}-dimensional vectors (set it to 0 to use the probed dimension)"
+        )
+    if settings.embedding_truncate_dimension > dimension:
+        raise ValueError(
+            f"EMBEDDING_TRUNCATE_DIMENSION ({settings.embedding_truncate_dimension}) exceeds "
+            f"the {dimension} dimensions of model {model_name}"
+        )
+    return dimension
+
+
+def _truncate(vectors: List[List[float]]) -> List[List[float]]:
+    """Cut vectors to ``embedding_truncate_dimension`` and renormalize them."""
+    dimension = get_settings().embedding_truncate_dimension
+    if not vectors or dimension <= 0:
+        return vectors
+    # Probes (and validates against) the model's dimension on first use
+    get_embedding_dimension()
+
+    array = np.asarray(vectors, dtype=np.float32)[:, :dimension]
+    norms = np.linalg.norm(array, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (array / norms).tolist()
+
+
 def embed_texts(texts: List[str]) -> List[List[float]]:
     """Convert a list of text strings into vector embeddings.
 
@@ -41,16 +133,44 @@ def embed_texts(texts: List[str]) -> List[List[float]]:
 
     Returns:
         List of embedding vectors, where each vector is a list of floats.
+        
+    Note:
+        Safe to call from several threads at once: texts of concurrent calls
+        are packed into shared requests (see ``app.embedding_batcher``).
     """
     if not texts:
         return []
 
     model = _get_embedding_model()
-
+    batcher = get_embedding_batcher(_embed_documents)
+    cache = get_embedding_cache()
+    if cache is None:
+        return batcher.embed(texts)
+
+    model_name = _model_name(model)
+    dimension = get_embedding_dimension()
+    embeddings = cache.get_many(model_name, dimension, texts)
+    cached = sum(1 for vector in embeddings if vector is not None)
+
+    # Embed each missing text once, even if it occurs several times
+    missing = list(dict.fromkeys(text for text, vector in zip(texts, embeddings) if vector is None))
+    if missing:
+        new_vectors = batcher.embed(missing)
+        cache.put_many(model_name, dimension, missing, new_vectors)
+        by_text = dict(zip(missing, new_vectors))
+        embeddings = [by_text[text] if vector is None else vector for text, vector in zip(texts, embeddings)]
+    if cached:
+        print(f"[Embeddings] {cached}/{len(texts)} embeddings served from cache")
+    return embeddings
+
+
+def _embed_documents(texts: List[str]) -> List[List[float]]:
+    """Send one embedding request (called by the batcher)."""
+    model = _get_embedding_model()
     try:
         embeddings = model.embed_documents(texts)
         print(f"[Embeddings] Generated embeddings for {len(texts)} texts")
-        return embeddings
+        return _truncate(embeddings)
     except Exception as exc:  # pragma: no cover - defensive
         print(f"[ERROR] Failed to generate embeddings: {exc}")
         raise
@@ -65,13 +185,67 @@ def embed_query(query: str) -> List[float]:
     Returns:
         Embedding vector as a list of floats.
     """
+    cache = get_query_vector_cache()
+    if cache is not None:
+        cached = cache.get(normalize_query(query))
+        if cached is not None:
+            return cached
+
     model = _get_embedding_model()
 
     try:
-        embedding = model.embed_query(query)
+        embedding = _truncate([model.embed_query(query)])[0]
         print("[Embeddings] Generated embedding for query")
+        if cache is not None:
+            cache.put(normalize_query(query), embedding)
         return embedding
     except Exception as exc:  # pragma: no cover - defensive
         print(f"[ERROR] Failed to generate query embedding: {exc}")
         raise
 
+
+
+def embed_queries(queries: List[str]) -> List[List[float]]:
+    """Convert several query strings into vector embeddings with one request.
+
+    Args:
+        queries: Query text strings to embed.
+
+    Returns:
+        Embedding vectors in the order of ``queries``.
+    """
+    model = _get_embedding_model()
+
+    try:
+        embeddings = model.embed_documents(queries)
+        print(f"[Embeddings] Generated embeddings for {len(queries)} queries")
+        return _truncate(embeddings)
+    except Exception as exc:  # pragma: no cover - defensive
+        print(f"[ERROR] Failed to generate query embeddings: {exc}")
+        raise
+
+
+async def aembed_query(query: str) -> List[float]:
+    """Embed a query from async code, batched with concurrent queries.
+
+    Queries arriving within ``QUERY_EMBED_WINDOW_MS`` of each other share
+    one embedding request (see ``app.query_coalescer``); repeated queries
+    are answered from the query cache.
+
+    Args:
+        query: Query text string to embed.
+
+    Returns:
+        Embedding vector as a list of floats.
+    """
+    cache = get_query_vector_cache()
+    key = normalize_query(query)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    embedding = await get_query_coalescer(embed_queries).embed(query)
+    if cache is not None:
+        cache.put(key, embedding)
+    return embedding
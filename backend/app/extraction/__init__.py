@@ -0,0 +1,45 @@
+"""Text extraction from downloaded SharePoint files."""
+
+from app.extraction.cache import ExtractionCache, get_extraction_cache
+from app.extraction.extractors import (
+    EXTRACTOR_VERSION,
+    ExtractionError,
+    ExtractionTruncated,
+    Extractor,
+    TextBlock,
+    UnsupportedFormat,
+    extract_blocks,
+    extract_text,
+    get_extractor,
+    iter_text_blocks,
+    register_extractor,
+)
+from app.extraction.formats import STREAMABLE_FORMATS, sniff_format
+from app.extraction.pool import (
+    ExtractionService,
+    ExtractionTimeout,
+    get_extraction_service,
+    shutdown_extraction_service,
+)
+
+__all__ = [
+    "EXTRACTOR_VERSION",
+    "STREAMABLE_FORMATS",
+    "ExtractionCache",
+    "ExtractionError",
+    "ExtractionService",
+    "ExtractionTimeout",
+    "ExtractionTruncated",
+    "Extractor",
+    "TextBlock",
+    "UnsupportedFormat",
+    "extract_blocks",
+    "extract_text",
+    "get_extraction_cache",
+    "get_extraction_service",
+    "get_extractor",
+    "iter_text_blocks",
+    "register_extractor",
+    "shutdown_extraction_service",
+    "sniff_format",
+]
@@ -0,0 +1,184 @@
+"""On-disk cache of extracted text blocks keyed by file content.
+
+Entries are keyed by the SHA-256 of the downloaded bytes plus the extractor
+fingerprint (version and output-shaping settings), so an unchanged file is
+never parsed twice, while a new extractor version never reads stale output.
+Chunking and embedding settings are not part of the key: re-indexing after
+changing them reuses the cached text.
+
+Each entry is a zstd-compressed JSON Lines file with one ``TextBlock`` per
+line, written and read as a stream. The total size is capped and the least
+recently used entries are evicted first.
+"""
+
+import dataclasses
+import io
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+import zstandard
+
+from app.config import get_settings
+from app.extraction.extractors import TextBlock, extractor_fingerprint
+
+
+class ExtractionCache:
+    """Size-capped LRU cache of extraction results.
+
+    Attributes:
+        directory: Directory holding the cache entries.
+        max_bytes: Total size cap of all entries (compressed).
+    """
+
+    def __init__(self, directory: str, max_bytes: int, compression_level: int = 3) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._compression_level = compression_level
+
+        self._lock = threading.Lock()
+        self._total_bytes = sum(path.stat().st_size for path in self.directory.glob("*.jsonl.zst"))
+        self._hits = 0
+        self._misses = 0
+        self._stores = 0
+        self._evictions = 0
+
+    def _path(self, content_hash: str) -> Path:
+        return self.directory / f"{content_hash}-{extractor_fingerprint()}.jsonl.zst"
+
+    def get(self, content_hash: str) -> Optional[Iterator[TextBlock]]:
+        """Look up the extraction of a file.
+
+        Args:
+            content_hash: Hex SHA-256 of the file bytes.
+
+        Returns:
+            Iterator over the cached blocks (decompressed lazily), or None
+            on a miss.
+        """
+        path = self._path(content_hash)
+        try:
+            cache_file = open(path, "rb")
+        except OSError:
+            with self._lock:
+                self._misses += 1
+            return None
+
+        try:
+            os.utime(path)  # mtime doubles as LRU timestamp
+        except FileNotFoundError:
+            # Evicted since it was opened; the open handle still reads it
+            pass
+        with self._lock:
+            self._hits += 1
+        return self._read(cache_file)
+
+    def store(self, content_hash: str, blocks: Iterable[TextBlock]) -> Iterator[TextBlock]:
+        """Pass ``blocks`` through while writing them to the cache.
+
+        The entry is only published once the iteration completes, so an
+        extraction abandoned halfway, or ended by an error (including
+        ``ExtractionTruncated``), never leaves a truncated entry.
+
+        Args:
+            content_hash: Hex SHA-256 of the file bytes.
+            blocks: Blocks produced by the extractor.
+
+        Yields:
+            The same blocks, unchanged.
+        """
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".part")
+        completed = False
+        try:
+            with os.fdopen(fd, "wb") as raw:
+                compressor = zstandard.ZstdCompressor(level=self._compression_level)
+                with compressor.stream_writer(raw, closefd=False) as writer:
+                    for block in blocks:
+                        line = json.dumps(dataclasses.asdict(block), ensure_ascii=False) + "\n"
+                        writer.write(line.encode("utf-8"))
+                        yield block
+            completed = True
+            self._publish(content_hash, tmp_path)
+        finally:
+            if not completed:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+
+    def stats(self) -> Dict[str, Any]:
+        """Return size and hit/miss counters."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "stores": self._stores,
+                "evictions": self._evictions,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def _read(self, cache_file: io.BufferedReader) -> Iterator[TextBlock]:
+        with cache_file:
+            reader = zstandard.ZstdDecompressor().stream_reader(cache_file)
+            for line in io.TextIOWrapper(reader, encoding="utf-8"):
+                if line.strip():
+                    yield TextBlock(**json.loads(line))
+
+    def _publish(self, content_hash: str, tmp_path: str) -> None:
+        path = self._path(content_hash)
+        size = os.path.getsize(tmp_path)
+        with self._lock:
+            previous = path.stat().st_size if path.exists() else 0
+            os.replace(tmp_path, path)
+            self._total_bytes += size - previous
+            self._stores += 1
+            self._evict()
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until under ``max_bytes`` (lock held)."""
+        if self._total_bytes <= self.max_bytes:
+            return
+        entries = sorted(self.directory.glob("*.jsonl.zst"), key=lambda p: p.stat().st_mtime)
+        for entry in entries:
+            if self._total_bytes <= self.max_bytes:
+                break
+            try:
+                size = entry.stat().st_size
+                entry.unlink()
+            except OSError:
+                continue
+            self._total_bytes -= size
+            self._evictions += 1
+
+
+_EXTRACTION_CACHE: Optional[ExtractionCache] = None
+_extraction_cache_lock = threading.Lock()
+
+
+def get_extraction_cache() -> Optional[ExtractionCache]:
+    """Get the process-wide extraction cache configured from settings.
+
+    Returns:
+        ExtractionCache: Shared cache instance, or None if the cache is
+        disabled (``extraction_cache_max_mb`` is 0).
+    """
+    global _EXTRACTION_CACHE
+
+    settings = get_settings()
+    if settings.extraction_cache_max_mb <= 0:
+        return None
+
+    with _extraction_cache_lock:
+        if _EXTRACTION_CACHE is None:
+            _EXTRACTION_CACHE = ExtractionCache(
+                directory=settings.extraction_cache_dir,
+                max_bytes=int(settings.extraction_cache_max_mb * 1024 * 1024),
+            )
+        return _EXTRACTION_CACHE
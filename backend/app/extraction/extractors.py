@@ -0,0 +1,363 @@
+"""Text extraction for the document formats found in SharePoint libraries.
+
+Extractors are registered per format in a registry; the format of a file is
+detected from its content (see ``app.extraction.formats``), and each parser
+library is imported only when the first file of its format is extracted.
+Formats without an extractor (images, archives, media, ...) are rejected
+with ``UnsupportedFormat`` instead of being decoded as garbage text.
+
+The functions here are pure CPU work with no shared state, so they can run
+either in the calling thread or inside an extraction worker process (see
+``app.extraction.pool``).
+"""
+
+import codecs
+import io
+from dataclasses import dataclass
+from typing import BinaryIO, Callable, Dict, Iterator, List, Optional, Union
+
+from app.config import get_settings
+from app.extraction.formats import sniff_format
+
+
+# Bump whenever a change to the extractors alters their output, so cached
+# extractions (see ``app.extraction.cache``) from older versions are ignored
+EXTRACTOR_VERSION = 3
+
+
+def extractor_fingerprint() -> str:
+    """Identify the extractor version and the settings that shape its output."""
+    settings = get_settings()
+    return (
+        f"v{EXTRACTOR_VERSION}"
+        f"-xr{settings.excel_rows_per_block}"
+        f"-xc{settings.excel_max_block_chars}"
+        f"-xm{settings.excel_max_rows}x{settings.excel_max_columns}"
+    )
+
+
+class ExtractionError(Exception):
+    """Raised when the text of a file cannot be extracted."""
+
+
+class UnsupportedFormat(ExtractionError):
+    """Raised for files whose format has no extractor (images, archives, ...)."""
+
+    def __init__(self, format_name: str) -> None:
+        self.format_name = format_name
+        super().__init__(f"unsupported file format: {format_name}")
+
+    def __reduce__(self):
+        # Keep the exception picklable across the worker pool boundary
+        return (UnsupportedFormat, (self.format_name,))
+
+
+class ExtractionTruncated(ExtractionError):
+    """Raised when the parser fails after some text blocks were produced.
+
+    The blocks already produced are usable, but they are not the whole file
+    and must not be cached as its extraction.
+
+    Attributes:
+        blocks: Blocks produced before the failure (filled in by
+            ``extract_blocks``; empty when raised by ``iter_text_blocks``,
+            whose caller has already received them).
+    """
+
+    def __init__(self, message: str, blocks: Optional[List["TextBlock"]] = None) -> None:
+        self.blocks = blocks or []
+        super().__init__(message)
+
+    def __reduce__(self):
+        return (ExtractionTruncated, (str(self), self.blocks))
+
+
+@dataclass
+class TextBlock:
+    """A piece of extracted text and where it came from in the file.
+
+    Attributes:
+        text: Extracted text.
+        page: 1-based page number for paginated formats (PDF), else None.
+        sheet: Worksheet name for spreadsheets, else None.
+        row_start: First worksheet row (1-based) contained in the block.
+        row_end: Last worksheet row contained in the block.
+    """
+
+    text: str
+    page: Optional[int] = None
+    sheet: Optional[str] = None
+    row_start: Optional[int] = None
+    row_end: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class Extractor:
+    """A registered format extractor.
+
+    Attributes:
+        format_name: Format it handles (as returned by ``sniff_format``).
+        iter_blocks: Function reading a seekable binary file object and
+            yielding its text blocks in document order.
+        package: Package to install if the parser library is missing.
+    """
+
+    format_name: str
+    iter_blocks: Callable[[BinaryIO], Iterator[TextBlock]]
+    package: str = ""
+
+
+_EXTRACTORS: Dict[str, Extractor] = {}
+
+
+def register_extractor(
+    format_name: str,
+    iter_blocks: Callable[[BinaryIO], Iterator[TextBlock]],
+    package: str = "",
+) -> None:
+    """Register (or replace) the extractor for a format.
+
+    Args:
+        format_name: Format as returned by ``sniff_format``.
+        iter_blocks: Function yielding the text blocks of a file object. It
+            should import its parser library inside the function body.
+        package: Package to install if the parser library is missing.
+    """
+    _EXTRACTORS[format_name] = Extractor(format_name, iter_blocks, package)
+
+
+def get_extractor(format_name: str) -> Optional[Extractor]:
+    """Return the extractor registered for a format, or None."""
+    return _EXTRACTORS.get(format_name)
+
+
+def extract_text(
+    file_source: Union[bytes, str, BinaryIO],
+    file_name: str,
+    content_type: Optional[str] = None,
+) -> str:
+    """Extract text content from a file.
+
+    This helper function supports multiple file formats:
+
+    - Plain text files (e.g., .txt, .csv, .md; UTF-8, UTF-16 or CP949)
+    - Microsoft Word documents (.docx)
+    - PDF documents (.pdf, text-based)
+    - Excel workbooks (.xlsx, .xlsm, .xltx, .xltm)
+
+    Args:
+        file_source: Raw file content as bytes, a path to the file, or a
+            seekable binary file object that parsers read directly.
+        file_name: Name of the file.
+        content_type: MIME type of the file, if available.
+
+    Returns:
+        Extracted text content as a string.
+
+    Raises:
+        UnsupportedFormat: If the file is not in a supported format.
+        ExtractionError: If the parser fails before producing any text.
+    """
+    texts: List[str] = []
+    try:
+        for block in iter_text_blocks(file_source, file_name, content_type):
+            texts.append(block.text)
+    except ExtractionTruncated as exc:
+        print(f"[WARN] {exc}")
+    return "\n\n".join(texts).strip()
+
+
+def extract_blocks(
+    file_source: Union[bytes, str, BinaryIO],
+    file_name: str,
+    content_type: Optional[str] = None,
+) -> List[TextBlock]:
+    """Extract a file into a list of text blocks (see ``iter_text_blocks``).
+
+    Raises:
+        ExtractionTruncated: If parsing failed partway; the blocks produced
+            before the failure are attached to the exception.
+    """
+    blocks: List[TextBlock] = []
+    try:
+        for block in iter_text_blocks(file_source, file_name, content_type):
+            blocks.append(block)
+    except ExtractionTruncated as exc:
+        exc.blocks = blocks
+        raise
+    return blocks
+
+
+def iter_text_blocks(
+    file_source: Union[bytes, str, BinaryIO],
+    file_name: str,
+    content_type: Optional[str] = None,
+) -> Iterator[TextBlock]:
+    """Extract a file as a stream of text blocks.
+
+    PDFs are parsed one page at a time and yield one block per non-empty
+    page, so a long manual never has to be held in memory as a whole.
+    Excel workbooks are read in openpyxl's read-only mode and yield groups
+    of rows per sheet. Other formats yield a single block without location
+    information.
+
+    Args:
+        file_source: Raw file content as bytes, a path to the file, or a
+            seekable binary file object that parsers read directly.
+        file_name: Name of the file.
+        content_type: MIME type of the file, if available.
+
+    Yields:
+        TextBlock objects in document order.
+
+    Raises:
+        UnsupportedFormat: If the file is not in a supported format.
+        ExtractionTruncated: If the parser fails after some blocks were
+            produced (callers may keep those blocks as a partial extraction).
+        ExtractionError: If the parser fails before producing any text.
+    """
+    if isinstance(file_source, str):
+        with open(file_source, "rb") as file_obj:
+            yield from iter_text_blocks(file_obj, file_name, content_type)
+        return
+
+    file_obj = io.BytesIO(file_source) if isinstance(file_source, bytes) else file_source
+    format_name = sniff_format(file_obj, file_name, content_type)
+    extractor = get_extractor(format_name)
+    if extractor is None:
+        raise UnsupportedFormat(format_name)
+
+    blocks_yielded = 0
+    try:
+        for block in extractor.iter_blocks(file_obj):
+            blocks_yielded += 1
+            yield block
+    except ImportError as exc:
+        raise ImportError(
+            f"{extractor.package} is required for {format_name.upper()} text extraction. "
+            f"Install it with 'pip install {extractor.package}'."
+        ) from exc
+    except Exception as exc:
+        if not blocks_yielded:
+            raise ExtractionError(f"{format_name.upper()} text extraction failed: {exc}") from exc
+        raise ExtractionTruncated(
+            f"{format_name.upper()} text extraction of {file_name} stopped after {blocks_yielded} blocks: {exc}"
+        ) from exc
+
+
+def _iter_pdf_pages(file_obj: BinaryIO) -> Iterator[TextBlock]:
+    """Yield the text of each non-empty PDF page, parsing pages lazily."""
+    from PyPDF2 import PdfReader
+
+    file_obj.seek(0)
+    pdf_reader = PdfReader(file_obj)
+    for page_number, page in enumerate(pdf_reader.pages, start=1):
+        page_text = page.extract_text() or ""
+        if page_text.strip():
+            yield TextBlock(text=page_text, page=page_number)
+
+
+def _iter_excel_row_groups(file_obj: BinaryIO) -> Iterator[TextBlock]:
+    """Yield groups of non-empty worksheet rows, streaming the workbook.
+
+    The workbook is opened in read-only mode, which parses rows lazily
+    instead of building every cell object up front. Each sheet yields blocks
+    of at most ``EXCEL_ROWS_PER_BLOCK`` rows (fewer if the text would exceed
+    ``EXCEL_MAX_BLOCK_CHARS``); the first block of a sheet starts with its name. Rows
+    and columns beyond ``EXCEL_MAX_ROWS`` / ``EXCEL_MAX_COLUMNS`` are ignored.
+    """
+    from openpyxl import load_workbook
+
+    settings = get_settings()
+    max_rows = settings.excel_max_rows or None
+    max_columns = settings.excel_max_columns or None
+
+    file_obj.seek(0)
+    workbook = load_workbook(file_obj, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            lines: List[str] = [f"# 시트: {sheet.title}"]
+            length = len(lines[0])
+            row_start: Optional[int] = None
+            row_end: Optional[int] = None
+
+            rows = sheet.iter_rows(
+                max_row=max_rows + 1 if max_rows else None,
+                max_col=max_columns,
+                values_only=True,
+            )
+            for row_number, row in enumerate(rows, start=1):
+                if max_rows and row_number > max_rows:
+                    print(f"[WARN] Sheet '{sheet.title}' truncated to {max_rows} rows")
+                    break
+
+                row_values = [
+                    str(value).strip()
+                    for value in row
+                    if value not in (None, "")
+                ]
+                if not row_values:
+                    continue
+                line = " \t ".join(row_values)
+
+                group_full = row_start is not None and (
+                    row_end - row_start + 1 >= settings.excel_rows_per_block
+                    or length + len(line) > settings.excel_max_block_chars
+                )
+                if group_full:
+                    yield TextBlock("\n".join(lines), sheet=sheet.title, row_start=row_start, row_end=row_end)
+                    lines, length, row_start = [], 0, None
+
+                lines.append(line)
+                length += len(line) + 1
+                row_start = row_number if row_start is None else row_start
+                row_end = row_number
+
+            if row_start is not None:
+                yield TextBlock("\n".join(lines), sheet=sheet.title, row_start=row_start, row_end=row_end)
+    finally:
+        # Read-only workbooks keep the archive open until closed
+        workbook.close()
+
+
+def _iter_docx_paragraphs(file_obj: BinaryIO) -> Iterator[TextBlock]:
+    """Yield the non-empty paragraphs of a Word document as one block."""
+    from docx import Document
+
+    file_obj.seek(0)
+    document = Document(file_obj)
+    paragraphs: List[str] = []
+    for paragraph in document.paragraphs:
+        text = paragraph.text.strip()
+        if text:
+            paragraphs.append(text)
+    if paragraphs:
+        yield TextBlock(text="\n\n".join(paragraphs))
+
+
+def _iter_plain_text(file_obj: BinaryIO) -> Iterator[TextBlock]:
+    """Decode a plain text file (UTF-8, UTF-16 with BOM, or CP949)."""
+    file_obj.seek(0)
+    file_bytes = file_obj.read()
+
+    if file_bytes.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        text = file_bytes.decode("utf-16")
+    else:
+        for encoding in ("utf-8-sig", "cp949"):
+            try:
+                text = file_bytes.decode(encoding)
+                break
+            except UnicodeDecodeError:
+                continue
+        else:
+            # Sniffed as mostly printable single-byte text
+            text = file_bytes.decode("latin-1")
+
+    if text.strip():
+        yield TextBlock(text=text)
+
+
+register_extractor("pdf", _iter_pdf_pages, package="PyPDF2")
+register_extractor("docx", _iter_docx_paragraphs, package="python-docx")
+register_extractor("xlsx", _iter_excel_row_groups, package="openpyxl")
+register_extractor("text", _iter_plain_text)
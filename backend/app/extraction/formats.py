@@ -0,0 +1,135 @@
+"""File format detection from magic bytes.
+
+SharePoint file names and MIME types are unreliable (renamed files, generic
+``application/octet-stream``), so the extractor is chosen from the first
+bytes of the content instead. Formats without a registered extractor, such
+as images, archives and media, are identified so they can be skipped before
+any parsing or embedding work.
+"""
+
+import codecs
+import zipfile
+from typing import BinaryIO, Optional
+
+
+# Number of leading bytes inspected
+SNIFF_BYTES = 8192
+
+# Formats that can be parsed incrementally (page by page or row group by row group)
+STREAMABLE_FORMATS = frozenset({"pdf", "xlsx"})
+
+# File extensions of Excel workbooks
+EXCEL_EXTENSIONS = (".xlsx", ".xlsm", ".xltx", ".xltm")
+
+# (offset, magic bytes, format)
+_SIGNATURES = (
+    (0, b"\x89PNG\r\n\x1a\n", "image"),
+    (0, b"\xff\xd8\xff", "image"),
+    (0, b"GIF87a", "image"),
+    (0, b"GIF89a", "image"),
+    (0, b"II*\x00", "image"),
+    (0, b"MM\x00*", "image"),
+    (0, b"PK\x03\x04", "zip"),
+    (0, b"PK\x05\x06", "zip"),
+    (0, b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "ole"),  # Legacy Office (.doc, .xls, .ppt), .msg
+    (0, b"\x1f\x8b", "archive"),
+    (0, b"7z\xbc\xaf\x27\x1c", "archive"),
+    (0, b"Rar!\x1a\x07", "archive"),
+    (0, b"\xfd7zXZ\x00", "archive"),
+    (0, b"ID3", "media"),
+    (0, b"OggS", "media"),
+    (0, b"fLaC", "media"),
+    (0, b"\x1a\x45\xdf\xa3", "media"),  # Matroska / WebM
+    (4, b"ftyp", "media"),  # MP4, MOV, HEIC
+)
+
+# RIFF containers are told apart by the form type at offset 8
+_RIFF_TYPES = {b"WEBP": "image", b"WAVE": "media", b"AVI ": "media"}
+
+# Part names identifying Office Open XML documents inside a ZIP container
+_OOXML_PARTS = (
+    ("word/document.xml", "docx"),
+    ("xl/workbook.xml", "xlsx"),
+    ("ppt/presentation.xml", "pptx"),
+)
+
+
+def sniff_format(file_obj: BinaryIO, file_name: str = "", content_type: Optional[str] = None) -> str:
+    """Detect the format of a file from its content.
+
+    Args:
+        file_obj: Seekable binary file object positioned anywhere.
+        file_name: Name of the file, used only to break ties for ZIP
+            containers that do not identify themselves.
+        content_type: MIME type of the file, used the same way.
+
+    Returns:
+        One of 'pdf', 'docx', 'xlsx', 'text' (formats with an extractor)
+        or 'pptx', 'image', 'archive', 'media', 'ole', 'binary'.
+    """
+    file_obj.seek(0)
+    head = file_obj.read(SNIFF_BYTES)
+    file_obj.seek(0)
+
+    # PDF readers accept the header anywhere in the first kilobyte
+    if b"%PDF-" in head[:1024]:
+        return "pdf"
+
+    if head[:4] == b"RIFF" and head[8:12] in _RIFF_TYPES:
+        return _RIFF_TYPES[head[8:12]]
+
+    for offset, magic, format_name in _SIGNATURES:
+        if head[offset:offset + len(magic)] == magic:
+            if format_name == "zip":
+                return _sniff_zip(file_obj, file_name, content_type)
+            return format_name
+
+    return "text" if _looks_like_text(head) else "binary"
+
+
+def _sniff_zip(file_obj: BinaryIO, file_name: str, content_type: Optional[str]) -> str:
+    """Tell Office Open XML documents apart from plain ZIP archives."""
+    try:
+        with zipfile.ZipFile(file_obj) as archive:
+            names = set(archive.namelist())
+    except (zipfile.BadZipFile, OSError):
+        return "archive"
+    finally:
+        file_obj.seek(0)
+
+    for part_name, format_name in _OOXML_PARTS:
+        if part_name in names:
+            return format_name
+
+    # Non-standard package layout: trust the name or MIME type if it says OOXML
+    if "[Content_Types].xml" in names:
+        lower_name = file_name.lower()
+        lower_type = (content_type or "").lower()
+        if lower_name.endswith(".docx") or "wordprocessingml" in lower_type:
+            return "docx"
+        if lower_name.endswith(EXCEL_EXTENSIONS) or "spreadsheetml" in lower_type:
+            return "xlsx"
+    return "archive"
+
+
+def _looks_like_text(head: bytes) -> bool:
+    """Whether the leading bytes decode as text in an encoding we read."""
+    if not head:
+        return True
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return True
+    if b"\x00" in head:
+        return False
+
+    for encoding in ("utf-8", "cp949"):
+        decoder = codecs.getincrementaldecoder(encoding)()
+        try:
+            # final=False tolerates a multi-byte character cut off at the end
+            decoder.decode(head, final=False)
+            return True
+        except UnicodeDecodeError:
+            continue
+
+    # Single-byte text: allow a handful of stray control characters
+    control = sum(1 for byte in head if byte < 0x09 or 0x0E <= byte < 0x20)
+    return control / len(head) < 0.01
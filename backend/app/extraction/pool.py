@@ -0,0 +1,365 @@
+"""Process pool for CPU-bound text extraction.
+
+PDF, Word and Excel parsing holds the GIL, so running it on indexing threads
+serializes them. ``ExtractionService`` runs ``extract_text`` in a pool of
+worker processes instead. Each file gets a timeout (a hung parser's worker is
+killed), workers are recycled after a number of files to bound memory growth,
+and a worker that crashes on a malformed file only fails that file.
+
+Large PDFs and workbooks are parsed page by page with ``iter_blocks``: a
+dedicated worker process streams the blocks back through a bounded queue,
+under the same timeout and crash isolation, so memory stays flat while the
+caller consumes them.
+
+Workers use the ``spawn`` start method, so scripts that index documents must
+guard their entry point with ``if __name__ == "__main__":``.
+"""
+
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar, Union
+
+from app.config import get_settings
+from app.extraction.extractors import (
+    ExtractionError,
+    ExtractionTruncated,
+    TextBlock,
+    extract_blocks,
+    extract_text,
+    iter_text_blocks,
+)
+
+
+T = TypeVar("T")
+
+# Blocks a streaming worker may run ahead of the consumer
+_STREAM_QUEUE_BLOCKS = 16
+
+# Seconds between liveness checks of a streaming worker
+_STREAM_POLL_SECONDS = 1.0
+
+
+class ExtractionTimeout(ExtractionError):
+    """Raised when extracting a file took longer than the configured timeout."""
+
+
+class ExtractionService:
+    """Run text extraction in worker processes with timeouts and crash isolation.
+
+    At most ``max_workers`` files are submitted at a time, so every submitted
+    file starts immediately and the timeout measures parsing time rather than
+    time spent queueing.
+
+    Attributes:
+        mode: 'process' to use worker processes, 'inline' to extract in the
+            calling thread (useful for debugging).
+        max_workers: Number of worker processes.
+        timeout: Seconds a single file may take before its worker is killed.
+        max_tasks_per_child: Files a worker handles before it is replaced;
+            0 keeps workers for the lifetime of the pool.
+    """
+
+    def __init__(
+        self,
+        max_workers: int,
+        timeout: float,
+        max_tasks_per_child: int = 0,
+        mode: str = "process",
+    ) -> None:
+        self.mode = mode
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.max_tasks_per_child = max_tasks_per_child
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_workers)
+
+        self._completed = 0
+        self._timeouts = 0
+        self._crashes = 0
+        self._restarts = 0
+
+    def extract(
+        self,
+        file_source: Union[bytes, str],
+        file_name: str,
+        content_type: Optional[str] = None,
+    ) -> str:
+        """Extract the text of one file.
+
+        Args:
+            file_source: Raw file content, or the path of a file readable by
+                the worker processes.
+            file_name: Name of the file (used to infer the format).
+            content_type: MIME type of the file, if available.
+
+        Returns:
+            Extracted text content.
+
+        Raises:
+            ExtractionTimeout: If extraction exceeded ``timeout``.
+            UnsupportedFormat: If the file is not in a supported format.
+            ExtractionError: If parsing failed or the worker process crashed
+                on this file.
+        """
+        return self._run(extract_text, file_source, file_name, content_type)
+
+    def extract_blocks(
+        self,
+        file_source: Union[bytes, str],
+        file_name: str,
+        content_type: Optional[str] = None,
+    ) -> List[TextBlock]:
+        """Extract one file into text blocks with page numbers.
+
+        Takes the same arguments and raises the same errors as ``extract``,
+        plus ``ExtractionTruncated`` (carrying the blocks produced so far) if
+        parsing failed partway.
+        """
+        return self._run(extract_blocks, file_source, file_name, content_type)
+
+    def iter_blocks(
+        self,
+        file_source: Union[bytes, str],
+        file_name: str,
+        content_type: Optional[str] = None,
+    ) -> Iterator[TextBlock]:
+        """Extract one file page by page in a worker process (see ``iter_text_blocks``).
+
+        The worker parses ahead of the caller by at most
+        ``_STREAM_QUEUE_BLOCKS`` blocks. ``timeout`` bounds the total time
+        the caller spends waiting for blocks, so a slow consumer does not
+        count against the parser. A worker slot is held until the stream
+        is exhausted or closed.
+
+        Takes the same arguments as ``extract``.
+
+        Yields:
+            TextBlock objects in document order.
+
+        Raises:
+            ExtractionTimeout: If the caller waited more than ``timeout``.
+            UnsupportedFormat: If the file is not in a supported format.
+            ExtractionTruncated: If parsing failed, or the worker died,
+                after some blocks were produced.
+            ExtractionError: If parsing failed or the worker died before
+                producing any text.
+        """
+        if self.mode == "inline":
+            yield from iter_text_blocks(file_source, file_name, content_type)
+            return
+
+        with self._slots:
+            context = multiprocessing.get_context("spawn")
+            messages: "multiprocessing.Queue[Tuple[str, Any]]" = context.Queue(_STREAM_QUEUE_BLOCKS)
+            process = context.Process(
+                target=_stream_blocks,
+                args=(file_source, file_name, content_type, messages),
+                daemon=True,
+            )
+            process.start()
+            blocks_yielded = 0
+            waited = 0.0
+            try:
+                while True:
+                    started = time.monotonic()
+                    try:
+                        kind, value = messages.get(timeout=_STREAM_POLL_SECONDS)
+                    except queue.Empty:
+                        # Everything a worker sent is readable once it has exited
+                        exited = process.exitcode is not None
+                        waited += time.monotonic() - started
+                        if exited and messages.empty():
+                            with self._lock:
+                                self._crashes += 1
+                            print(f"[Extraction] Worker died while streaming {file_name}")
+                            if blocks_yielded:
+                                raise ExtractionTruncated(
+                                    f"text extraction worker for {file_name} died "
+                                    f"after {blocks_yielded} blocks"
+                                )
+                            raise ExtractionError("text extraction worker crashed")
+                        if waited > self.timeout:
+                            with self._lock:
+                                self._timeouts += 1
+                            print(f"[Extraction] {file_name} timed out after {self.timeout}s, killing worker")
+                            raise ExtractionTimeout(
+                                f"text extraction timed out after {self.timeout:g} seconds"
+                            )
+                        continue
+                    waited += time.monotonic() - started
+
+                    if kind == "block":
+                        blocks_yielded += 1
+                        yield value
+                    elif kind == "error":
+                        raise value
+                    else:
+                        with self._lock:
+                            self._completed += 1
+                        return
+            finally:
+                # Also reached when the caller stops consuming early
+                if process.is_alive():
+                    process.terminate()
+                process.join()
+                messages.close()
+
+    def _run(
+        self,
+        func: Callable[..., T],
+        file_source: Union[bytes, str],
+        file_name: str,
+        content_type: Optional[str],
+    ) -> T:
+        if self.mode == "inline":
+            return func(file_source, file_name, content_type)
+
+        with self._slots:
+            # A crash may have been caused by another file in the same pool,
+            # so a file gets a second attempt on a fresh pool before failing.
+            for _ in range(2):
+                executor, generation = self._get_executor()
+                try:
+                    future = executor.submit(func, file_source, file_name, content_type)
+                    result = future.result(timeout=self.timeout)
+                except FutureTimeoutError:
+                    with self._lock:
+                        self._timeouts += 1
+                    print(f"[Extraction] {file_name} timed out after {self.timeout}s, killing worker")
+                    self._restart(generation, kill=True)
+                    raise ExtractionTimeout(
+                        f"text extraction timed out after {self.timeout:g} seconds"
+                    )
+                except BrokenProcessPool:
+                    with self._lock:
+                        self._crashes += 1
+                    print(f"[Extraction] Worker died while extracting {file_name}")
+                    self._restart(generation)
+                    continue
+
+                with self._lock:
+                    self._completed += 1
+                return result
+
+        raise ExtractionError("text extraction worker crashed")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return pool configuration and outcome counters."""
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "workers": self.max_workers,
+                "completed": self._completed,
+                "timeouts": self._timeouts,
+                "crashes": self._crashes,
+                "restarts": self._restarts,
+            }
+
+    def shutdown(self) -> None:
+        """Stop the worker processes."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _get_executor(self) -> Tuple[ProcessPoolExecutor, int]:
+        with self._lock:
+            if self._executor is None:
+                kwargs: Dict[str, Any] = {}
+                if self.max_tasks_per_child > 0:
+                    kwargs["max_tasks_per_child"] = self.max_tasks_per_child
+                # spawn: workers must not inherit locks or clients from the server process
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    **kwargs,
+                )
+            return self._executor, self._generation
+
+    def _restart(self, generation: int, kill: bool = False) -> None:
+        """Replace the pool, unless another thread already replaced this generation.
+
+        Args:
+            generation: Generation of the pool the caller observed failing.
+            kill: Terminate the workers first (needed for a hung parser,
+                which ``shutdown`` alone would wait on forever).
+        """
+        with self._lock:
+            if generation != self._generation or self._executor is None:
+                return
+            executor, self._executor = self._executor, None
+            self._generation += 1
+            self._restarts += 1
+
+        if kill:
+            # Files in flight on the other workers fail with BrokenProcessPool
+            # and are retried on the new pool.
+            for process in list(getattr(executor, "_processes", {}).values()):
+                process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _stream_blocks(
+    file_source: Union[bytes, str],
+    file_name: str,
+    content_type: Optional[str],
+    messages: "multiprocessing.Queue[Tuple[str, Any]]",
+) -> None:
+    """Worker process body of ``ExtractionService.iter_blocks``.
+
+    Puts ``("block", TextBlock)`` messages on ``messages``, then
+    ``("done", None)`` or ``("error", exception)``.
+    """
+    try:
+        for block in iter_text_blocks(file_source, file_name, content_type):
+            messages.put(("block", block))
+    except Exception as exc:
+        if not isinstance(exc, (ExtractionError, ImportError)):
+            # Parser exceptions are not necessarily picklable
+            exc = ExtractionError(f"text extraction failed: {exc}")
+        messages.put(("error", exc))
+    else:
+        messages.put(("done", None))
+
+
+_EXTRACTION_SERVICE: Optional[ExtractionService] = None
+_extraction_service_lock = threading.Lock()
+
+
+def get_extraction_service() -> ExtractionService:
+    """Get the process-wide extraction service configured from settings.
+
+    Returns:
+        ExtractionService: Shared service instance.
+    """
+    global _EXTRACTION_SERVICE
+
+    with _extraction_service_lock:
+        if _EXTRACTION_SERVICE is None:
+            settings = get_settings()
+            _EXTRACTION_SERVICE = ExtractionService(
+                max_workers=settings.extraction_workers or os.cpu_count() or 1,
+                timeout=settings.extraction_timeout_seconds,
+                max_tasks_per_child=settings.extraction_max_tasks_per_child,
+                mode=settings.extraction_mode,
+            )
+        return _EXTRACTION_SERVICE
+
+
+def shutdown_extraction_service() -> None:
+    """Stop the shared extraction service's workers, if it was started."""
+    global _EXTRACTION_SERVICE
+
+    with _extraction_service_lock:
+        service, _EXTRACTION_SERVICE = _EXTRACTION_SERVICE, None
+    if service is not None:
+        service.shutdown()
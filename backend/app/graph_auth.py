@@ -0,0 +1,190 @@
+"""Access token management for Microsoft Graph API.
+
+This module provides a process-wide credential manager that caches the
+app-only (client credentials) token, refreshes it in the background shortly
+before it expires, and collapses concurrent refreshes into a single request.
+"""
+
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import httpx
+
+from app.config import get_settings
+from app.http_client import get_http_client
+
+
+GRAPH_SCOPE = "https://graph.microsoft.com/.default"
+
+
+class GraphCredentialManager:
+    """Cache and refresh a Microsoft Graph access token.
+
+    Tokens are reused until ``expiry_skew`` seconds before ``expires_in``.
+    Once a token enters the last ``refresh_margin`` seconds of its lifetime,
+    callers still receive the cached token while a single background thread
+    fetches its replacement. If the token has already expired, callers block
+    on one shared refresh instead of each hitting the token endpoint.
+
+    Attributes:
+        tenant_id: Azure AD tenant ID.
+        client_id: Application (client) ID.
+        refresh_margin: Seconds before expiry at which a background refresh starts.
+        expiry_skew: Seconds before expiry at which a token is considered unusable.
+    """
+
+    def __init__(
+        self,
+        tenant_id: str,
+        client_id: str,
+        client_secret: str,
+        refresh_margin: float = 300.0,
+        expiry_skew: float = 60.0,
+    ) -> None:
+        self.tenant_id = tenant_id
+        self.client_id = client_id
+        self._client_secret = client_secret
+        self.refresh_margin = refresh_margin
+        self.expiry_skew = expiry_skew
+
+        self._token: Optional[str] = None
+        self._expires_at = 0.0  # time.monotonic() deadline
+        self._state_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._background_refresh: Optional[threading.Thread] = None
+
+    @property
+    def token_url(self) -> str:
+        """OAuth2 token endpoint for the configured tenant."""
+        return f"https://login.microsoftonline.com/{self.tenant_id}/oauth2/v2.0/token"
+
+    def get_token(self) -> str:
+        """Return a valid access token, refreshing it only when needed.
+
+        Returns:
+            str: Access token for authenticating Microsoft Graph API requests.
+
+        Raises:
+            Exception: If a refresh is required and authentication fails.
+        """
+        token, expires_at = self._snapshot()
+        now = time.monotonic()
+
+        if token is not None and now < expires_at - self.expiry_skew:
+            if now >= expires_at - self.refresh_margin:
+                self._start_background_refresh()
+            return token
+
+        return self._refresh(stale_token=token)
+
+    def invalidate(self, token: Optional[str] = None) -> None:
+        """Drop the cached token so the next call fetches a new one.
+
+        Args:
+            token: If given, only invalidate when the cached token still matches.
+                This keeps a late 401 from discarding a freshly refreshed token.
+        """
+        with self._state_lock:
+            if token is None or token == self._token:
+                self._token = None
+                self._expires_at = 0.0
+
+    def _snapshot(self) -> Tuple[Optional[str], float]:
+        with self._state_lock:
+            return self._token, self._expires_at
+
+    def _refresh(self, stale_token: Optional[str]) -> str:
+        """Fetch a new token unless another thread already did (single flight)."""
+        with self._refresh_lock:
+            token, expires_at = self._snapshot()
+            if (
+                token is not None
+                and token != stale_token
+                and time.monotonic() < expires_at - self.expiry_skew
+            ):
+                return token
+
+            token, expires_in = self._request_token()
+            with self._state_lock:
+                self._token = token
+                self._expires_at = time.monotonic() + expires_in
+            return token
+
+    def _start_background_refresh(self) -> None:
+        with self._state_lock:
+            thread = self._background_refresh
+            if thread is not None and thread.is_alive():
+                return
+            stale_token = self._token
+            thread = threading.Thread(
+                target=self._background_refresh_worker,
+                args=(stale_token,),
+                name="graph-token-refresh",
+                daemon=True,
+            )
+            self._background_refresh = thread
+        thread.start()
+
+    def _background_refresh_worker(self, stale_token: Optional[str]) -> None:
+        try:
+            self._refresh(stale_token=stale_token)
+        except Exception as e:
+            # The current token is still valid; the next caller retries.
+            print(f"[WARN] Background token refresh failed: {e}")
+
+    def _request_token(self) -> Tuple[str, float]:
+        """Run the OAuth2 client credentials flow.
+
+        Returns:
+            Tuple of (access token, lifetime in seconds).
+
+        Raises:
+            Exception: If authentication fails.
+        """
+        data = {
+            "client_id": self.client_id,
+            "scope": GRAPH_SCOPE,
+            "client_secret": self._client_secret,
+            "grant_type": "client_credentials",
+        }
+
+        try:
+            response = get_http_client().post(self.token_url, data=data)
+            response.raise_for_status()
+            payload = response.json()
+            expires_in = float(payload.get("expires_in", 3599))
+            print(f"[Graph API] Access token obtained (expires in {int(expires_in)}s)")
+            return payload["access_token"], expires_in
+        except httpx.HTTPError as e:
+            print(f"[ERROR] Failed to get access token: {e}")
+            if isinstance(e, httpx.HTTPStatusError):
+                print(f"[ERROR] Response: {e.response.text}")
+            raise Exception(f"Authentication failed: {e}")
+
+
+_credential_managers: Dict[Tuple[str, str, str], GraphCredentialManager] = {}
+_credential_managers_lock = threading.Lock()
+
+
+def get_credential_manager() -> GraphCredentialManager:
+    """Get the process-wide credential manager for the configured app registration.
+
+    Returns:
+        GraphCredentialManager: Shared manager keyed by tenant, client ID and secret.
+    """
+    settings = get_settings()
+    key = (settings.tenant_id, settings.client_id, settings.client_secret)
+
+    with _credential_managers_lock:
+        manager = _credential_managers.get(key)
+        if manager is None:
+            manager = GraphCredentialManager(
+                tenant_id=settings.tenant_id,
+                client_id=settings.client_id,
+                client_secret=settings.client_secret,
+                refresh_margin=settings.graph_token_refresh_margin_seconds,
+                expiry_skew=settings.graph_token_expiry_skew_seconds,
+            )
+            _credential_managers[key] = manager
+        return manager
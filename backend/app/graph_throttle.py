@@ -0,0 +1,204 @@
+"""Adaptive concurrency control for Microsoft Graph and SharePoint requests.
+
+SharePoint Online throttles per tenant and answers with HTTP 429 or 503 plus a
+``Retry-After`` header. This module provides an AIMD (additive increase,
+multiplicative decrease) limiter: every successful request grows the number of
+concurrent requests allowed a little, every throttle response halves it and
+pauses new requests until ``Retry-After`` has passed.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from app.config import get_settings
+
+
+# Status codes SharePoint uses to signal throttling
+THROTTLE_STATUS_CODES = frozenset({429, 503})
+
+# Status codes worth retrying (throttling plus transient gateway errors)
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+
+class RequestSlot:
+    """Handle for one in-flight request, used to report its outcome."""
+
+    def __init__(self) -> None:
+        self.outcome = "error"
+        self.retry_after: Optional[float] = None
+        self.started_at = time.monotonic()
+
+    def succeeded(self) -> None:
+        self.outcome = "success"
+
+    def throttled(self, retry_after: Optional[float] = None) -> None:
+        self.outcome = "throttled"
+        self.retry_after = retry_after
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD concurrency limiter shared by all requests to one tenant.
+
+    Only throttle responses to requests sent after the last decrease shrink
+    the limit again, so a burst of 429s from requests that were already in
+    flight counts as a single congestion signal.
+
+    Attributes:
+        name: Label used in logs and stats (usually the tenant ID).
+        min_limit: Lowest concurrency the limiter will shrink to.
+        max_limit: Highest concurrency the limiter will grow to.
+        decrease_factor: Multiplier applied to the limit on throttling.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial_limit: float = 4.0,
+        min_limit: float = 1.0,
+        max_limit: float = 32.0,
+        decrease_factor: float = 0.5,
+    ) -> None:
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+
+        self._limit = max(min_limit, min(initial_limit, max_limit))
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._last_decrease = float("-inf")
+        self._condition = threading.Condition()
+
+        self._requests = 0
+        self._successes = 0
+        self._throttled = 0
+        self._errors = 0
+
+    @property
+    def limit(self) -> int:
+        """Current number of concurrent requests allowed."""
+        return max(1, int(self._limit))
+
+    @contextmanager
+    def slot(self) -> Iterator[RequestSlot]:
+        """Wait for a free slot, then hold it for the duration of a request.
+
+        The caller reports the outcome on the yielded ``RequestSlot``; a slot
+        left unreported (e.g. because the request raised) is treated as an
+        error and does not change the limit.
+        """
+        self._acquire()
+        request_slot = RequestSlot()
+        try:
+            yield request_slot
+        finally:
+            self._release(request_slot)
+
+    def record_throttle(
+        self,
+        retry_after: Optional[float] = None,
+        started_at: Optional[float] = None,
+    ) -> None:
+        """Report a throttle signal observed outside ``slot`` (e.g. inside a ``$batch`` reply).
+
+        Args:
+            retry_after: Seconds to pause new requests.
+            started_at: ``time.monotonic()`` when the throttled request was sent.
+                If None, the signal always counts as new congestion.
+        """
+        with self._condition:
+            self._on_throttle(retry_after, time.monotonic() if started_at is None else started_at)
+            self._condition.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return current concurrency and throttle counters.
+
+        Returns:
+            Dictionary with the current limit, in-flight requests, remaining
+            pause and cumulative request/throttle counts.
+        """
+        with self._condition:
+            return {
+                "name": self.name,
+                "concurrency_limit": self.limit,
+                "concurrency_limit_exact": round(self._limit, 2),
+                "in_flight": self._in_flight,
+                "min_limit": self.min_limit,
+                "max_limit": self.max_limit,
+                "paused_for_seconds": round(max(0.0, self._paused_until - time.monotonic()), 2),
+                "requests": self._requests,
+                "successes": self._successes,
+                "throttled": self._throttled,
+                "errors": self._errors,
+            }
+
+    def _acquire(self) -> None:
+        with self._condition:
+            while True:
+                wait = self._paused_until - time.monotonic()
+                if wait <= 0 and self._in_flight < self.limit:
+                    break
+                self._condition.wait(timeout=wait if wait > 0 else None)
+            self._in_flight += 1
+            self._requests += 1
+
+    def _release(self, request_slot: RequestSlot) -> None:
+        with self._condition:
+            self._in_flight -= 1
+            if request_slot.outcome == "success":
+                self._successes += 1
+                # Additive increase: roughly +1 per limit's worth of successes
+                self._limit = min(self.max_limit, self._limit + 1.0 / self._limit)
+            elif request_slot.outcome == "throttled":
+                self._on_throttle(request_slot.retry_after, request_slot.started_at)
+            else:
+                self._errors += 1
+            self._condition.notify_all()
+
+    def _on_throttle(self, retry_after: Optional[float], started_at: float) -> None:
+        """Multiplicative decrease plus a pause for ``retry_after`` seconds (lock held)."""
+        now = time.monotonic()
+        self._throttled += 1
+
+        if started_at >= self._last_decrease:
+            previous = self.limit
+            self._limit = max(self.min_limit, self._limit * self.decrease_factor)
+            self._last_decrease = now
+            print(f"[Throttle] {self.name}: throttled, concurrency {previous} -> {self.limit}")
+
+        if retry_after:
+            self._paused_until = max(self._paused_until, now + retry_after)
+
+
+_limiters: Dict[str, AdaptiveConcurrencyLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_graph_limiter() -> AdaptiveConcurrencyLimiter:
+    """Get the process-wide limiter for the configured tenant.
+
+    Returns:
+        AdaptiveConcurrencyLimiter: Limiter shared by all Graph and download requests.
+    """
+    settings = get_settings()
+
+    with _limiters_lock:
+        limiter = _limiters.get(settings.tenant_id)
+        if limiter is None:
+            limiter = AdaptiveConcurrencyLimiter(
+                name=settings.tenant_id,
+                initial_limit=settings.graph_concurrency_initial,
+                min_limit=settings.graph_concurrency_min,
+                max_limit=settings.graph_concurrency_max,
+            )
+            _limiters[settings.tenant_id] = limiter
+        return limiter
+
+
+def get_throttle_stats() -> Dict[str, Dict[str, Any]]:
+    """Return stats for every limiter created in this process, keyed by tenant."""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.name: limiter.stats() for limiter in limiters}
@@ -0,0 +1,130 @@
+"""Shared HTTP transport for Microsoft Graph and SharePoint download requests.
+
+This module owns the process-wide ``httpx.Client`` and ``httpx.AsyncClient``
+instances. Both keep connections alive between requests, apply per-host
+connection limits and share the timeout configuration from settings, so
+callers never pay a fresh TCP+TLS handshake per request.
+"""
+
+import threading
+from typing import Dict, Optional
+
+import httpx
+
+from app.config import Settings, get_settings
+
+
+# Hosts that get their own connection pool (and therefore their own limits).
+GRAPH_HOST_PATTERN = "https://graph.microsoft.com"
+LOGIN_HOST_PATTERN = "https://login.microsoftonline.com"
+DOWNLOAD_HOST_PATTERN = "all://*.sharepoint.com"
+
+_client: Optional[httpx.Client] = None
+_async_client: Optional[httpx.AsyncClient] = None
+_client_lock = threading.Lock()
+
+
+def _http2_enabled(settings: Settings) -> bool:
+    """Return whether HTTP/2 can be used, warning if ``h2`` is missing."""
+    if not settings.http2_enabled:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        print("[Warning] HTTP2_ENABLED is set but 'h2' is not installed. Falling back to HTTP/1.1.")
+        return False
+    return True
+
+
+def _build_timeout(settings: Settings) -> httpx.Timeout:
+    return httpx.Timeout(
+        settings.http_timeout_seconds,
+        connect=settings.http_connect_timeout_seconds,
+    )
+
+
+def _build_limits(settings: Settings, max_connections: int) -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=min(max_connections, settings.http_max_keepalive_connections),
+        keepalive_expiry=settings.http_keepalive_expiry_seconds,
+    )
+
+
+def _per_host_limits(settings: Settings) -> Dict[str, httpx.Limits]:
+    return {
+        GRAPH_HOST_PATTERN: _build_limits(settings, settings.http_graph_max_connections),
+        LOGIN_HOST_PATTERN: _build_limits(settings, 4),
+        DOWNLOAD_HOST_PATTERN: _build_limits(settings, settings.http_download_max_connections),
+    }
+
+
+def get_http_client() -> httpx.Client:
+    """Get the shared synchronous HTTP client.
+
+    Returns:
+        httpx.Client: Pooled client used for all blocking Graph and download calls.
+    """
+    global _client
+
+    with _client_lock:
+        if _client is None:
+            settings = get_settings()
+            http2 = _http2_enabled(settings)
+            mounts = {
+                pattern: httpx.HTTPTransport(limits=limits, http2=http2)
+                for pattern, limits in _per_host_limits(settings).items()
+            }
+            _client = httpx.Client(
+                timeout=_build_timeout(settings),
+                limits=_build_limits(settings, settings.http_max_connections),
+                http2=http2,
+                mounts=mounts,
+                follow_redirects=True,
+            )
+            print(f"[HTTP] Initialized shared client (http2={http2})")
+        return _client
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """Get the shared asynchronous HTTP client.
+
+    The client is bound to the event loop it is first used on, which for the
+    API server is the single uvicorn loop.
+
+    Returns:
+        httpx.AsyncClient: Pooled client used by async routes.
+    """
+    global _async_client
+
+    with _client_lock:
+        if _async_client is None:
+            settings = get_settings()
+            http2 = _http2_enabled(settings)
+            mounts = {
+                pattern: httpx.AsyncHTTPTransport(limits=limits, http2=http2)
+                for pattern, limits in _per_host_limits(settings).items()
+            }
+            _async_client = httpx.AsyncClient(
+                timeout=_build_timeout(settings),
+                limits=_build_limits(settings, settings.http_max_connections),
+                http2=http2,
+                mounts=mounts,
+                follow_redirects=True,
+            )
+            print(f"[HTTP] Initialized shared async client (http2={http2})")
+        return _async_client
+
+
+async def close_http_clients() -> None:
+    """Close the shared clients and release their pooled connections."""
+    global _client, _async_client
+
+    with _client_lock:
+        client, _client = _client, None
+        async_client, _async_client = _async_client, None
+
+    if client is not None:
+        client.close()
+    if async_client is not None:
+        await async_client.aclose()
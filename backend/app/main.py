@@ -80,6 +80,12 @@ async def shutdown_event() -> None:
     This function runs when the application shuts down.
     """
     print("Shutting down RAG-SPO API...")
+    
+    from app.http_client import close_http_clients
+    await close_http_clients()
+    
+    from app.extraction import shutdown_extraction_service
+    shutdown_extraction_service()
 
 
 if __name__ == "__main__":
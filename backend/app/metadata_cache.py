@@ -0,0 +1,163 @@
+"""In-process cache for SharePoint document metadata.
+
+Entries are evicted least-recently-used once the cache is full. An entry is
+served as-is while it is younger than the metadata TTL; after that it is
+revalidated against Graph with ``If-None-Match`` on the item's eTag, which
+costs a round trip but no payload when the item is unchanged. Pre-signed
+download URLs expire on the SharePoint side, so an entry whose download URL
+is older than its own (shorter) TTL is always refetched in full.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from app.config import get_settings
+
+
+CacheKey = Tuple[str, str]  # (site_id, document_id)
+
+
+@dataclass
+class MetadataCacheEntry:
+    """Cached metadata of one document.
+
+    Attributes:
+        metadata: Normalized metadata dict (see ``get_document_metadata``).
+        etag: Item eTag used for conditional revalidation.
+        validated_at: ``time.monotonic()`` of the last fetch or 304 revalidation.
+        fetched_at: ``time.monotonic()`` of the last full fetch (when the
+            download URL was issued).
+    """
+
+    metadata: Dict[str, Any]
+    etag: str
+    validated_at: float
+    fetched_at: float
+
+
+class MetadataCache:
+    """Thread-safe LRU cache of document metadata with TTL-based revalidation.
+
+    Attributes:
+        max_entries: Maximum number of documents kept.
+        ttl: Seconds an entry is served without revalidation.
+        download_url_ttl: Seconds after which the cached download URL is
+            considered expired and the entry must be refetched.
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl: float = 60.0, download_url_ttl: float = 600.0) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.download_url_ttl = download_url_ttl
+        self._entries: "OrderedDict[CacheKey, MetadataCacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._revalidations = 0
+        self._not_modified = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def lookup(self, key: CacheKey) -> Tuple[str, Optional[MetadataCacheEntry]]:
+        """Look up an entry and classify how it may be used.
+
+        Args:
+            key: ``(site_id, document_id)``.
+
+        Returns:
+            Tuple of (state, entry) where state is one of:
+            - 'fresh': serve ``entry.metadata`` directly
+            - 'stale': revalidate with ``If-None-Match: entry.etag``
+            - 'miss': no usable entry; fetch in full (entry is None)
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or now - entry.fetched_at >= self.download_url_ttl:
+                self._misses += 1
+                return "miss", None
+
+            self._entries.move_to_end(key)
+            if now - entry.validated_at < self.ttl:
+                self._hits += 1
+                return "fresh", entry
+
+            if not entry.etag:
+                self._misses += 1
+                return "miss", None
+
+            self._revalidations += 1
+            return "stale", entry
+
+    def put(self, key: CacheKey, metadata: Dict[str, Any]) -> None:
+        """Store freshly fetched metadata (including a newly issued download URL)."""
+        now = time.monotonic()
+        with self._lock:
+            self._entries[key] = MetadataCacheEntry(
+                metadata=dict(metadata),
+                etag=metadata.get("etag", ""),
+                validated_at=now,
+                fetched_at=now,
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def mark_not_modified(self, key: CacheKey) -> None:
+        """Record a 304 revalidation, restarting the entry's metadata TTL."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.validated_at = time.monotonic()
+                self._not_modified += 1
+
+    def invalidate(self, document_id: Optional[str] = None) -> None:
+        """Drop cached metadata of a document (any site), or of all documents."""
+        with self._lock:
+            if document_id is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if key[1] == document_id]:
+                del self._entries[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return size and hit/miss counters."""
+        with self._lock:
+            lookups = self._hits + self._revalidations + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "revalidations": self._revalidations,
+                "not_modified": self._not_modified,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+_METADATA_CACHE: Optional[MetadataCache] = None
+_metadata_cache_lock = threading.Lock()
+
+
+def get_metadata_cache() -> MetadataCache:
+    """Get the process-wide metadata cache configured from settings.
+
+    Returns:
+        MetadataCache: Shared cache instance.
+    """
+    global _METADATA_CACHE
+
+    with _metadata_cache_lock:
+        if _METADATA_CACHE is None:
+            settings = get_settings()
+            _METADATA_CACHE = MetadataCache(
+                max_entries=settings.metadata_cache_max_entries,
+                ttl=settings.metadata_cache_ttl_seconds,
+                download_url_ttl=settings.download_url_ttl_seconds,
+            )
+        return _METADATA_CACHE
@@ -3,12 +3,79 @@
 This module provides functions to interact with Qdrant vector database.
 """
 
-from typing import Optional
+import functools
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 
 from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams
+from qdrant_client.models import (
+    Datatype,
+    Distance,
+    FieldCondition,
+    Filter,
+    IsEmptyCondition,
+    MatchValue,
+    PayloadField,
+    PointIdsList,
+    Record,
+    VectorParams,
+)
 
 from app.config import get_settings
+from app.dedup_index import get_dedup_index
+from app.embeddings import get_embedding_dimension
+from app.query_cache import bump_collection_generation
+
+
+_QDRANT_CLIENT: Optional[QdrantClient] = None
+_qdrant_client_lock = threading.Lock()
+
+# Client methods that change points; they invalidate cached search hits
+_WRITE_METHODS = frozenset({
+    "upsert",
+    "upload_points",
+    "delete",
+    "set_payload",
+    "overwrite_payload",
+    "delete_payload",
+    "clear_payload",
+    "update_vectors",
+    "delete_vectors",
+    "batch_update_points",
+    "delete_collection",
+})
+
+
+class _SerializedClient:
+    """Proxy running every client call under one lock.
+    
+    The local (file-based) client keeps collections in plain Python
+    structures without any locking, while documents are indexed from
+    several threads at once. Completed writes bump the collection
+    generation (see ``app.query_cache``).
+    """
+    
+    def __init__(self, client: QdrantClient) -> None:
+        self._client = client
+        self._lock = threading.RLock()
+    
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._client, name)
+        if not callable(attribute):
+            return attribute
+        
+        writes = name in _WRITE_METHODS
+        
+        @functools.wraps(attribute)
+        def serialized(*args: Any, **kwargs: Any) -> Any:
+            with self._lock:
+                try:
+                    return attribute(*args, **kwargs)
+                finally:
+                    if writes:
+                        bump_collection_generation()
+        
+        return serialized
 
 
 def get_qdrant_client() -> QdrantClient:
@@ -21,19 +88,36 @@ def get_qdrant_client() -> QdrantClient:
         Supports two modes:
         - "local": Stores data in local filesystem (no Docker required)
         - "server": Connects to Qdrant server (requires Docker or remote server)
+        
+        The client is created once per process. Local mode locks its storage
+        folder, so a second instance in the same process would fail to open.
+        Calls to the local client are serialized so it can be shared by
+        indexing threads.
     """
+    global _QDRANT_CLIENT
+    
+    if _QDRANT_CLIENT is not None:
+        return _QDRANT_CLIENT
+    
+    with _qdrant_client_lock:
+        if _QDRANT_CLIENT is None:
+            _QDRANT_CLIENT = _create_qdrant_client()
+        return _QDRANT_CLIENT
+
+
+def _create_qdrant_client() -> QdrantClient:
     settings = get_settings()
     
     # if settings.qdrant_mode == "local":
     # Local mode: stores data in filesystem (no Docker needed!)
     print(f"[Qdrant] Using LOCAL mode: {settings.qdrant_path}")
-    client = QdrantClient(path=settings.qdrant_path)
+    client = _SerializedClient(QdrantClient(path=settings.qdrant_path))
     # else:
     #     # Server mode: connects to Qdrant server
     #     print(f"[Qdrant] Using SERVER mode: {settings.qdrant_host}:{settings.qdrant_port}")
     #     client = QdrantClient(host=settings.qdrant_host, port=settings.qdrant_port)
     
-    return client
+    return client  # type: ignore[return-value]
 
 
 def create_collection(
@@ -45,11 +129,17 @@ def create_collection(
     
     Args:
         collection_name: Name of the collection to create. If None, uses default from settings.
-        vector_size: Size of the embedding vectors. If None, uses default from settings.
+        vector_size: Size of the embedding vectors. If None, uses the
+            dimension produced by the embedding model (after truncation).
         distance: Distance metric for vector similarity (COSINE, EUCLID, DOT).
         
+    Raises:
+        ValueError: If the existing collection stores vectors of a different
+            size, or ``vector_datatype`` is unknown.
+        
     Note:
-        If the collection already exists, this function will not raise an error.
+        If the collection already exists, this function will not raise an error
+        as long as its vector size matches.
     """
     settings = get_settings()
     client = get_qdrant_client()
@@ -58,7 +148,11 @@ def create_collection(
         collection_name = settings.qdrant_collection_name
     
     if vector_size is None:
-        vector_size = settings.embedding_dimension
+        vector_size = get_embedding_dimension()
+    
+    if settings.vector_datatype not in ("float32", "float16"):
+        raise ValueError(f"Unknown vector_datatype: {settings.vector_datatype!r}")
+    datatype = Datatype.FLOAT16 if settings.vector_datatype == "float16" else Datatype.FLOAT32
     
     # Check if collection exists
     collections = client.get_collections().collections
@@ -67,17 +161,473 @@ def create_collection(
     if collection_name not in collection_names:
         client.create_collection(
             collection_name=collection_name,
-            vectors_config=VectorParams(size=vector_size, distance=distance),
+            vectors_config=VectorParams(size=vector_size, distance=distance, datatype=datatype),
         )
-        print(f"Created collection: {collection_name}")
+        print(f"Created collection: {collection_name} ({vector_size} dims, {settings.vector_datatype})")
     else:
+        _validate_collection(collection_name, vector_size, datatype)
         print(f"Collection {collection_name} already exists")
+        if get_dedup_index().created:
+            _rebuild_dedup_index(collection_name)
+
+
+def _validate_collection(collection_name: str, vector_size: int, datatype: Datatype) -> None:
+    """Check that an existing collection stores vectors the embedding model produces."""
+    params = get_qdrant_client().get_collection(collection_name).config.params.vectors
+    if not isinstance(params, VectorParams):
+        raise ValueError(f"Collection {collection_name} uses named vectors; expected a single vector")
+    
+    if params.size != vector_size:
+        raise ValueError(
+            f"Collection {collection_name} stores {params.size}-dimensional vectors but the "
+            f"embedding model produces {vector_size}; delete the collection and re-index, or "
+            f"set EMBEDDING_TRUNCATE_DIMENSION to match"
+        )
+    stored_datatype = params.datatype or Datatype.FLOAT32
+    if stored_datatype != datatype:
+        # Only affects memory use; the collection keeps its datatype until re-created
+        print(
+            f"[Qdrant] Collection {collection_name} stores {stored_datatype.value} vectors, "
+            f"VECTOR_DATATYPE is {datatype.value}; re-create the collection to change it"
+        )
+
+
+def _rebuild_dedup_index(collection_name: str) -> None:
+    """Fill a newly created dedup index from the payloads of the collection.
+    
+    Runs once, when the index database is missing but the collection is not
+    (first start after upgrading, or the file was deleted).
+    """
+    client = get_qdrant_client()
+    index = get_dedup_index()
+    points_filter = Filter(should=[
+        Filter(must_not=[IsEmptyCondition(is_empty=PayloadField(key="lsh_bands"))]),
+        Filter(must_not=[IsEmptyCondition(is_empty=PayloadField(key="duplicate_sources"))]),
+    ])
+    rebuilt = 0
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            scroll_filter=points_filter,
+            limit=256,
+            offset=offset,
+            with_payload=["lsh_bands", "duplicate_sources"],
+            with_vectors=False,
+        )
+        index.add_bands(
+            (str(point.id), (point.payload or {}).get("lsh_bands") or [])
+            for point in points
+        )
+        for point in points:
+            for entry in (point.payload or {}).get("duplicate_sources") or []:
+                index.add_duplicate(str(point.id), entry.get("document_id", ""))
+        rebuilt += len(points)
+        if offset is None:
+            break
+    index.created = False
+    print(f"[Qdrant] Rebuilt dedup index from {rebuilt} points")
 
 
 def ensure_collection_exists() -> None:
     """Ensure the default SPO documents collection exists in Qdrant.
     
-    This is a convenience function that creates the collection with default settings.
+    This is a convenience function that creates the collection with default settings,
+    or checks that the existing one matches the embedding dimension.
     """
     create_collection()
 
+
+
+def _document_filter(document_id: str) -> Filter:
+    return Filter(
+        must=[FieldCondition(key="document_id", match=MatchValue(value=document_id))]
+    )
+
+
+def _promote_duplicates(point_ids: List[str], collection_name: str) -> Set[str]:
+    """Hand points about to be deleted over to a document deduplicated into them.
+    
+    A chunk that other documents' near-duplicates point to must outlive its
+    own document: the first duplicate source becomes the owner of the point
+    (and keeps its vector), the remaining sources stay listed.
+    
+    Returns:
+        IDs of the promoted points, which must not be deleted.
+    """
+    index = get_dedup_index()
+    duplicated = index.points_with_duplicates(point_ids)
+    if not duplicated:
+        return set()
+    
+    client = get_qdrant_client()
+    promoted: Set[str] = set()
+    points = retrieve_points(duplicated, payload_keys=["duplicate_sources"], collection_name=collection_name)
+    for point_id, point in points.items():
+        sources = (point.payload or {}).get("duplicate_sources") or []
+        if not sources:
+            continue
+        owner, rest = sources[0], sources[1:]
+        client.set_payload(
+            collection_name=collection_name,
+            payload={**owner, "duplicate_sources": rest},
+            points=[point.id],
+        )
+        index.remove_duplicate(point_id, owner.get("document_id", ""))
+        promoted.add(point_id)
+    return promoted
+
+
+def delete_document_points(document_id: str, collection_name: Optional[str] = None) -> None:
+    """Delete every chunk of a document from Qdrant.
+    
+    The document is also removed from the ``duplicate_sources`` of other
+    documents' chunks, and chunks that other documents were deduplicated
+    into are handed over to one of them instead of being deleted.
+    
+    Args:
+        document_id: SharePoint document ID stored in the chunk payloads.
+        collection_name: Name of the collection. If None, uses default from settings.
+    """
+    settings = get_settings()
+    
+    if collection_name is None:
+        collection_name = settings.qdrant_collection_name
+    
+    remove_duplicate_sources(document_id, collection_name)
+    delete_points(get_document_point_ids(document_id, collection_name), collection_name)
+
+
+def set_document_payload(
+    document_id: str,
+    payload: dict,
+    collection_name: Optional[str] = None,
+) -> None:
+    """Overwrite top-level payload keys on every chunk of a document.
+    
+    Args:
+        document_id: SharePoint document ID stored in the chunk payloads.
+        payload: Payload keys and values to set.
+        collection_name: Name of the collection. If None, uses default from settings.
+    """
+    settings = get_settings()
+    client = get_qdrant_client()
+    
+    if collection_name is None:
+        collection_name = settings.qdrant_collection_name
+    
+    client.set_payload(
+        collection_name=collection_name,
+        payload=payload,
+        points=_document_filter(document_id),
+    )
+
+
+def get_indexed_ctag(document_id: str, collection_name: Optional[str] = None) -> Optional[str]:
+    """Get the SharePoint cTag a document was last indexed with.
+    
+    Args:
+        document_id: SharePoint document ID stored in the chunk payloads.
+        collection_name: Name of the collection. If None, uses default from settings.
+        
+    Returns:
+        The stored cTag, or None if the document is not indexed or predates cTag tracking.
+    """
+    settings = get_settings()
+    client = get_qdrant_client()
+    
+    if collection_name is None:
+        collection_name = settings.qdrant_collection_name
+    
+    points, _ = client.scroll(
+        collection_name=collection_name,
+        scroll_filter=_document_filter(document_id),
+        limit=1,
+        with_payload=["sharepoint"],
+        with_vectors=False,
+    )
+    if points:
+        return (points[0].payload or {}).get("sharepoint", {}).get("ctag") or None
+    
+    # Every chunk of the document may have been deduplicated into other documents
+    duplicated = get_dedup_index().duplicated_points(document_id)[:8]
+    points = retrieve_points(duplicated, payload_keys=["duplicate_sources"], collection_name=collection_name)
+    for point in points.values():
+        for entry in (point.payload or {}).get("duplicate_sources") or []:
+            if entry.get("document_id") == document_id:
+                return entry.get("sharepoint", {}).get("ctag") or None
+    return None
+
+
+def get_document_point_ids(document_id: str, collection_name: Optional[str] = None) -> Set[str]:
+    """Get the IDs of every chunk of a document stored in Qdrant.
+    
+    Args:
+        document_id: SharePoint document ID stored in the chunk payloads.
+        collection_name: Name of the collection. If None, uses default from settings.
+        
+    Returns:
+        Set of point IDs (as strings).
+    """
+    settings = get_settings()
+    client = get_qdrant_client()
+    
+    if collection_name is None:
+        collection_name = settings.qdrant_collection_name
+    
+    point_ids: Set[str] = set()
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            scroll_filter=_document_filter(document_id),
+            limit=256,
+            offset=offset,
+            with_payload=False,
+            with_vectors=False,
+        )
+        point_ids.update(str(point.id) for point in points)
+        if offset is None:
+            return point_ids
+
+
+def get_indexed_document_ids(collection_name: Optional[str] = None) -> Set[str]:
+    """Get the IDs of every document with indexed content.
+    
+    Includes documents whose chunks were all deduplicated into other
+    documents' chunks. Scans the whole collection.
+    
+    Args:
+        collection_name: Name of the collection. If None, uses default from settings.
+        
+    Returns:
+        Set of SharePoint document IDs.
+    """
+    settings = get_settings()
+    client = get_qdrant_client()
+    
+    if collection_name is None:
+        collection_name = settings.qdrant_collection_name
+    
+    document_ids = get_dedup_index().duplicate_document_ids()
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            limit=1024,
+            offset=offset,
+            with_payload=["document_id"],
+            with_vectors=False,
+        )
+        document_ids.update((point.payload or {}).get("document_id", "") for point in points)
+        if offset is None:
+            document_ids.discard("")
+            return document_ids
+
+
+def retrieve_points(
+    point_ids: Iterable[str],
+    with_vectors: bool = False,
+    payload_keys: Optional[List[str]] = None,
+    collection_name: Optional[str] = None,
+) -> Dict[str, Record]:
+    """Fetch points by ID.
+    
+    Args:
+        point_ids: IDs of the points to fetch.
+        with_vectors: Whether to include the stored vectors.
+        payload_keys: Payload keys to include; None for no payload.
+        collection_name: Name of the collection. If None, uses default from settings.
+        
+    Returns:
+        Mapping of point ID to record; IDs that do not exist are omitted.
+    """
+    point_ids = list(point_ids)
+    if not point_ids:
+        return {}
+    
+    settings = get_settings()
+    client = get_qdrant_client()
+    
+    if collection_name is None:
+        collection_name = settings.qdrant_collection_name
+    
+    points = client.retrieve(
+        collection_name=collection_name,
+        ids=point_ids,
+        with_payload=payload_keys if payload_keys else False,
+        with_vectors=with_vectors,
+    )
+    return {str(point.id): point for point in points}
+
+
+def delete_points(point_ids: Iterable[str], collection_name: Optional[str] = None) -> None:
+    """Delete points by ID.
+    
+    Points that other documents' chunks were deduplicated into are handed
+    over to one of those documents instead (see ``delete_document_points``).
+    
+    Args:
+        point_ids: IDs of the points to delete.
+        collection_name: Name of the collection. If None, uses default from settings.
+    """
+    point_ids = list(point_ids)
+    if not point_ids:
+        return
+    
+    settings = get_settings()
+    client = get_qdrant_client()
+    
+    if collection_name is None:
+        collection_name = settings.qdrant_collection_name
+    
+    promoted = _promote_duplicates(point_ids, collection_name)
+    point_ids = [point_id for point_id in point_ids if point_id not in promoted]
+    if point_ids:
+        client.delete(
+            collection_name=collection_name,
+            points_selector=PointIdsList(points=point_ids),
+        )
+        get_dedup_index().remove_points(point_ids)
+
+
+def find_lsh_candidates(
+    band_keys: List[List[str]],
+    exclude_document_id: Optional[str] = None,
+    limit: int = 8,
+    collection_name: Optional[str] = None,
+) -> List[List[Dict[str, Any]]]:
+    """Find stored chunks sharing LSH band keys with each of several chunks.
+    
+    Band keys are looked up in the local dedup index in one query for all
+    chunks, and the candidates are fetched from Qdrant in one request.
+    
+    Args:
+        band_keys: Band keys of each chunk being indexed (see ``app.rag.dedup``).
+        exclude_document_id: Document whose chunks are ignored.
+        limit: Maximum number of candidates per chunk.
+        collection_name: Name of the collection. If None, uses default from settings.
+        
+    Returns:
+        List of ``{'id', 'document_id', 'text'}`` dictionaries per chunk,
+        most shared band keys first.
+    """
+    index = get_dedup_index()
+    # Over-fetch: the document's own chunks are dropped below
+    candidate_ids = index.find_candidates(band_keys, limit=2 * limit)
+    wanted = {point_id for ids in candidate_ids for point_id in ids}
+    points = retrieve_points(wanted, payload_keys=["document_id", "text"], collection_name=collection_name)
+    
+    # Points deleted without going through delete_points
+    missing = wanted - set(points)
+    if missing:
+        index.remove_points(list(missing))
+    
+    candidates: List[List[Dict[str, Any]]] = []
+    for ids in candidate_ids:
+        found = []
+        for point_id in ids:
+            point = points.get(point_id)
+            if point is None:
+                continue
+            payload = point.payload or {}
+            if payload.get("document_id") == exclude_document_id:
+                continue
+            found.append({
+                "id": point_id,
+                "document_id": payload.get("document_id", ""),
+                "text": payload.get("text", ""),
+            })
+            if len(found) >= limit:
+                break
+        candidates.append(found)
+    return candidates
+
+
+def add_duplicate_source(
+    point_id: str,
+    source: Dict[str, Any],
+    collection_name: Optional[str] = None,
+) -> None:
+    """Record a near-duplicate chunk of another document on a stored chunk.
+    
+    Args:
+        point_id: ID of the stored chunk the duplicate matched.
+        source: Payload identifying the duplicate (``document_id``,
+            ``document_name``, ``chunk_index``, ``sharepoint``). An entry
+            for the same document and chunk index is replaced.
+        collection_name: Name of the collection. If None, uses default from settings.
+    """
+    settings = get_settings()
+    client = get_qdrant_client()
+    
+    if collection_name is None:
+        collection_name = settings.qdrant_collection_name
+    
+    points = client.retrieve(
+        collection_name=collection_name,
+        ids=[point_id],
+        with_payload=["duplicate_sources"],
+    )
+    if not points:
+        return
+    sources = [
+        entry
+        for entry in (points[0].payload or {}).get("duplicate_sources") or []
+        if (entry.get("document_id"), entry.get("chunk_index"))
+        != (source["document_id"], source["chunk_index"])
+    ]
+    sources.append(source)
+    client.set_payload(
+        collection_name=collection_name,
+        payload={"duplicate_sources": sources},
+        points=[point_id],
+    )
+    get_dedup_index().add_duplicate(point_id, source["document_id"])
+
+
+def remove_duplicate_sources(
+    document_id: str,
+    collection_name: Optional[str] = None,
+    keep: Optional[Set[Tuple[str, int]]] = None,
+) -> None:
+    """Remove a document from the ``duplicate_sources`` of stored chunks.
+    
+    Args:
+        document_id: SharePoint document ID to remove.
+        collection_name: Name of the collection. If None, uses default from settings.
+        keep: ``(point_id, chunk_index)`` pairs of the document's entries to
+            keep (the duplicates recorded by the latest indexing run); None
+            removes every entry.
+    """
+    settings = get_settings()
+    client = get_qdrant_client()
+    index = get_dedup_index()
+    
+    if collection_name is None:
+        collection_name = settings.qdrant_collection_name
+    
+    keep = keep or set()
+    points = retrieve_points(
+        index.duplicated_points(document_id),
+        payload_keys=["duplicate_sources"],
+        collection_name=collection_name,
+    )
+    for point_id, point in points.items():
+        entries = (point.payload or {}).get("duplicate_sources") or []
+        sources = [
+            entry
+            for entry in entries
+            if entry.get("document_id") != document_id
+            or (point_id, entry.get("chunk_index")) in keep
+        ]
+        if len(sources) != len(entries):
+            client.set_payload(
+                collection_name=collection_name,
+                payload={"duplicate_sources": sources},
+                points=[point.id],
+            )
+        if not any(entry.get("document_id") == document_id for entry in sources):
+            index.remove_duplicate(point_id, document_id)
+    if not keep:
+        index.remove_document(document_id)
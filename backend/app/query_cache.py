@@ -0,0 +1,182 @@
+"""In-process cache of query embeddings and search hits.
+
+Intranet users repeat the same questions constantly, and every repeat used
+to cost a query embedding and a Qdrant search. Both are cached here, keyed by
+the query text normalized to Unicode NFC, lower case and single spaces, so
+"휴가 신청 방법" and " 휴가  신청 방법" share one entry. Entries expire after a
+TTL and the least recently used ones are evicted beyond a size cap.
+
+Query vectors only depend on the embedding model and stay valid. Search
+hits depend on the collection: every write to it bumps a generation counter,
+and hits cached under an older generation are treated as misses. Writes from
+another process (e.g. ``scripts/run_indexing.py``) are not seen; the TTL
+bounds how long such hits stay stale.
+"""
+
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from app.config import get_settings
+
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+_collection_generation = 0
+_generation_lock = threading.Lock()
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a query for use as cache key (NFC, case, whitespace)."""
+    normalized = unicodedata.normalize("NFC", query).casefold()
+    return _WHITESPACE_RE.sub(" ", normalized).strip()
+
+
+def get_collection_generation() -> int:
+    """Return the number of writes made to the collection by this process."""
+    return _collection_generation
+
+
+def bump_collection_generation() -> None:
+    """Record a write to the collection, invalidating cached search hits."""
+    global _collection_generation
+
+    with _generation_lock:
+        _collection_generation += 1
+
+
+class QueryCache:
+    """Size-bounded LRU cache with TTL and generation-based invalidation.
+
+    Attributes:
+        max_entries: Maximum number of entries kept.
+        ttl: Seconds an entry stays valid.
+    """
+
+    def __init__(self, max_entries: int, ttl: float) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._expired = 0
+        self._invalidated = 0
+        self._evictions = 0
+
+    def get(self, key: Hashable, generation: int = 0) -> Optional[Any]:
+        """Look up a value.
+
+        Args:
+            key: Cache key.
+            generation: Current collection generation; entries stored under
+                another generation are discarded.
+
+        Returns:
+            The cached value, or None on a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at, entry_generation = entry
+                if entry_generation != generation:
+                    self._invalidated += 1
+                elif expires_at <= time.monotonic():
+                    self._expired += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return value
+                del self._entries[key]
+            self._misses += 1
+            return None
+
+    def put(self, key: Hashable, value: Any, generation: int = 0) -> None:
+        """Store a value.
+
+        Args:
+            key: Cache key.
+            value: Value to store; must not be modified afterwards.
+            generation: Collection generation the value was computed under
+                (read before computing it, so a write in between makes the
+                value stale instead of fresh).
+        """
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl, generation)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return size and hit/miss counters."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "expired": self._expired,
+                "invalidated": self._invalidated,
+                "evictions": self._evictions,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+_QUERY_VECTOR_CACHE: Optional[QueryCache] = None
+_SEARCH_RESULT_CACHE: Optional[QueryCache] = None
+_query_cache_lock = threading.Lock()
+
+
+def _create_caches() -> None:
+    global _QUERY_VECTOR_CACHE, _SEARCH_RESULT_CACHE
+
+    with _query_cache_lock:
+        if _QUERY_VECTOR_CACHE is None:
+            settings = get_settings()
+            _QUERY_VECTOR_CACHE = QueryCache(settings.query_cache_max_entries, settings.query_cache_ttl_seconds)
+            _SEARCH_RESULT_CACHE = QueryCache(settings.query_cache_max_entries, settings.query_cache_ttl_seconds)
+
+
+def get_query_vector_cache() -> Optional[QueryCache]:
+    """Get the process-wide cache of query embeddings.
+
+    Returns:
+        QueryCache: Shared cache instance, or None if the query cache is
+        disabled (``query_cache_max_entries`` is 0).
+    """
+    if get_settings().query_cache_max_entries <= 0:
+        return None
+    if _QUERY_VECTOR_CACHE is None:
+        _create_caches()
+    return _QUERY_VECTOR_CACHE
+
+
+def get_search_result_cache() -> Optional[QueryCache]:
+    """Get the process-wide cache of search hits keyed by ``(query, top_k)``.
+
+    Returns:
+        QueryCache: Shared cache instance, or None if the query cache is
+        disabled (``query_cache_max_entries`` is 0).
+    """
+    if get_settings().query_cache_max_entries <= 0:
+        return None
+    if _SEARCH_RESULT_CACHE is None:
+        _create_caches()
+    return _SEARCH_RESULT_CACHE
+
+
+def get_query_cache_stats() -> Dict[str, Any]:
+    """Return the counters of both caches (empty before first use)."""
+    if _QUERY_VECTOR_CACHE is None or _SEARCH_RESULT_CACHE is None:
+        return {}
+    return {
+        "vectors": _QUERY_VECTOR_CACHE.stats(),
+        "results": _SEARCH_RESULT_CACHE.stats(),
+        "collection_generation": get_collection_generation(),
+    }
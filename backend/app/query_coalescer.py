@@ -0,0 +1,147 @@
+"""Coalescing of concurrent query embeddings into batched requests.
+
+Every search needs the embedding of its query, one HTTP round trip to the
+embedding API each. Queries arriving within a few milliseconds of each
+other are collected and sent as one batched request instead, and identical
+queries already waiting for a result share it. Under load, dozens of
+concurrent searches then cost a handful of embedding calls.
+"""
+
+import asyncio
+from typing import Any, Callable, Dict, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app.config import get_settings
+
+
+EmbedBatchFunction = Callable[[List[str]], List[List[float]]]
+
+
+class QueryEmbeddingCoalescer:
+    """Micro-batches query embeddings requested from one event loop.
+
+    A batch is sent ``window`` seconds after its first query arrives, or
+    as soon as it holds ``max_batch`` distinct queries.
+
+    Attributes:
+        window: Seconds to wait for more queries before sending a batch.
+        max_batch: Maximum number of distinct queries per request.
+    """
+
+    def __init__(self, embed_batch: EmbedBatchFunction, window: float = 0.005, max_batch: int = 32) -> None:
+        self.window = window
+        self.max_batch = max_batch
+        self._embed_batch = embed_batch
+
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+        self._requests = 0
+        self._shared = 0
+        self._batches = 0
+        self._failed_batches = 0
+
+    async def embed(self, query: str) -> List[float]:
+        """Embed a query, sharing the request with concurrent queries.
+
+        Args:
+            query: Query text.
+
+        Returns:
+            Embedding vector of the query.
+        """
+        self._requests += 1
+        future = self._pending.get(query) or self._in_flight.get(query)
+        if future is not None:
+            self._shared += 1
+            return await asyncio.shield(future)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending[query] = future
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        # Shielded so a cancelled search does not cancel the shared result
+        return await asyncio.shield(future)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return request and batching counters."""
+        sent = self._requests - self._shared
+        return {
+            "requests": self._requests,
+            "shared": self._shared,
+            "batches": self._batches,
+            "failed_batches": self._failed_batches,
+            "avg_batch_size": round(sent / self._batches, 2) if self._batches else 0.0,
+        }
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        if batch:
+            self._batches += 1
+            self._in_flight.update(batch)
+            asyncio.ensure_future(self._send(batch))
+
+    async def _send(self, batch: Dict[str, asyncio.Future]) -> None:
+        queries = list(batch)
+        try:
+            vectors = await run_in_threadpool(self._embed_batch, queries)
+        except Exception as exc:
+            self._failed_batches += 1
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        else:
+            for query, vector in zip(queries, vectors):
+                future = batch[query]
+                if not future.done():
+                    future.set_result(vector)
+        finally:
+            for query, future in batch.items():
+                if self._in_flight.get(query) is future:
+                    del self._in_flight[query]
+
+
+_QUERY_COALESCER: Optional[QueryEmbeddingCoalescer] = None
+_query_coalescer_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_query_coalescer(embed_batch: EmbedBatchFunction) -> QueryEmbeddingCoalescer:
+    """Get the query embedding coalescer of the running event loop.
+
+    Must be called from a coroutine. Only one event loop serves requests,
+    so a single instance is kept; it is recreated if the loop changes.
+
+    Args:
+        embed_batch: Function embedding a list of queries in one request;
+            used when the coalescer is created.
+
+    Returns:
+        QueryEmbeddingCoalescer: Shared coalescer instance.
+    """
+    global _QUERY_COALESCER, _query_coalescer_loop
+
+    loop = asyncio.get_running_loop()
+    if _QUERY_COALESCER is None or _query_coalescer_loop is not loop:
+        settings = get_settings()
+        _QUERY_COALESCER = QueryEmbeddingCoalescer(
+            embed_batch,
+            window=settings.query_embed_window_ms / 1000,
+            max_batch=settings.query_embed_max_batch,
+        )
+        _query_coalescer_loop = loop
+    return _QUERY_COALESCER
+
+
+def get_query_coalescer_stats() -> Dict[str, Any]:
+    """Return the coalescer's counters (empty before the first search)."""
+    coalescer = _QUERY_COALESCER
+    return coalescer.stats() if coalescer is not None else {}
@@ -1,10 +1,59 @@
 """Text chunking module for splitting documents into smaller pieces.
 
 This module provides functions to split text documents into overlapping chunks
-for better embedding and retrieval performance.
+for better embedding and retrieval performance, and a structure-aware splitter
+that cuts at headings, paragraphs and sentences without overlap.
 """
 
-from typing import List
+import hashlib
+import re
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, List, Optional, Tuple
+
+from app.extraction import TextBlock
+from app.rag.tokenizer import get_tokenizer, token_offsets
+
+if TYPE_CHECKING:
+    import tiktoken
+
+
+# Number of blocks tokenized per batched encode call in token mode
+TOKENIZE_BATCH_BLOCKS = 16
+
+# Structure-aware chunks are cut no earlier than this fraction of chunk_size
+MIN_CHUNK_FRACTION = 0.5
+
+# Boundaries a structure-aware chunk may end at; alternatives sharing a
+# position are tried in order, so a heading wins over a plain line break
+_BOUNDARY_RE = re.compile(
+    r"(?P<heading>\n(?=[ \t]*(?:#{1,6}\s|제\s*\d+\s*[장절조관]|\d+(?:\.\d+)+\.?[ \t]|\d+\.[ \t]|[IVX]+\.[ \t])))"
+    r"|(?P<paragraph>\n[ \t]*\n)"
+    r"|(?P<line>\n)"
+    r"|(?P<sentence>[.!?。！？…]+[\"'”’)\]]*(?=\s))"
+    r"|(?P<korean>(?:니다|어요|아요|에요|예요|해요|세요|지요|죠|네요|군요)(?=\s))"
+)
+
+# Preference of each boundary kind; among equals the latest one is used
+_BOUNDARY_SCORES = {
+    "heading": 5,
+    "paragraph": 4,
+    "line": 3,
+    "sentence": 2,
+    "korean": 1,
+}
+
+# Content-defined chunks are cut no earlier than this fraction of chunk_size
+CDC_MIN_FRACTION = 0.25
+
+# Gear table of the content-defined chunker. Derived from SHA-256 so chunk
+# boundaries (and therefore reusable vectors) never change between releases.
+_GEAR = [
+    int.from_bytes(hashlib.sha256(bytes([i])).digest()[:4], "little")
+    for i in range(256)
+]
+
+# A 32-bit gear hash shifts left once per character, so it depends on the
+# last 32 characters only
+_GEAR_WINDOW = 32
 
 
 def split_into_chunks(
@@ -65,6 +114,61 @@ def split_into_chunks(
     return chunks
 
 
+def split_into_spans(
+    text: str,
+    chunk_size: int = 1000,
+) -> List[Tuple[int, int]]:
+    """Split text into chunks that end at structural boundaries.
+    
+    Each chunk is cut at the strongest boundary found in the second half
+    of its ``chunk_size`` window: before a heading, then a paragraph break,
+    a line break (table rows), a sentence end (including Korean endings
+    such as ``~니다`` and ``~요``), and finally whitespace. Chunks do not
+    overlap, and the text is scanned once, so the cost is linear in its
+    length.
+    
+    Args:
+        text: The text content to split into chunks.
+        chunk_size: Maximum size of each chunk in characters.
+        
+    Returns:
+        List of ``(start, end)`` offsets into ``text``; ``text[start:end]``
+        is the chunk, without leading or trailing whitespace.
+        
+    Examples:
+        >>> text = "첫 문장입니다. 두 번째 문장입니다."
+        >>> [text[start:end] for start, end in split_into_spans(text, chunk_size=12)]
+        ['첫 문장입니다.', '두 번째 문장입니다.']
+    """
+    return _split_spans(text, chunk_size, _find_boundary)
+
+
+def split_into_content_spans(
+    text: str,
+    chunk_size: int = 1000,
+) -> List[Tuple[int, int]]:
+    """Split text into chunks whose boundaries are defined by their content.
+    
+    A gear rolling hash runs over the text and a chunk ends at the first
+    whitespace after a position where the hash matches a bit mask, once
+    the chunk holds at least a quarter of ``chunk_size`` characters. The
+    hash only depends on the last 32 characters, so inserting or deleting
+    text moves the boundaries around the edit while the chunks before and
+    after it stay byte-identical. Chunks average about half of
+    ``chunk_size``; a chunk without a hash match by ``chunk_size`` is cut
+    at the best structural boundary like ``split_into_spans``.
+    
+    Args:
+        text: The text content to split into chunks.
+        chunk_size: Maximum size of each chunk in characters.
+        
+    Returns:
+        List of ``(start, end)`` offsets into ``text``, without leading or
+        trailing whitespace.
+    """
+    return _split_spans(text, chunk_size, _find_content_boundary)
+
+
 def split_document_with_metadata(
     text: str,
     document_id: str,
@@ -72,18 +176,20 @@ def split_document_with_metadata(
     chunk_size: int = 1000,
     chunk_overlap: int = 200,
 ) -> List[dict]:
-    """Split document into chunks with metadata.
+    """Split document into structure-aware chunks with metadata.
     
     Args:
         text: The text content to split.
         document_id: Unique identifier for the document.
         document_name: Name of the document.
         chunk_size: Maximum size of each chunk in characters.
-        chunk_overlap: Number of overlapping characters between consecutive chunks.
+        chunk_overlap: Accepted for compatibility and ignored: chunks end at
+            structural boundaries and do not overlap.
         
     Returns:
         List of dictionaries containing chunk text and metadata.
-        Each dictionary has keys: 'text', 'document_id', 'document_name', 'chunk_index'.
+        Each dictionary has keys: 'text', 'document_id', 'document_name',
+        'chunk_index', and 'start'/'end' (offsets of the chunk in ``text``).
         
     Examples:
         >>> chunks = split_document_with_metadata(
@@ -94,16 +200,333 @@ def split_document_with_metadata(
         >>> chunks[0]['chunk_index']
         0
     """
-    text_chunks = split_into_chunks(text, chunk_size, chunk_overlap)
+    return [
+        {
+            "text": text[start:end],
+            "document_id": document_id,
+            "document_name": document_name,
+            "chunk_index": idx,
+            "start": start,
+            "end": end,
+        }
+        for idx, (start, end) in enumerate(split_into_spans(text, chunk_size))
+    ]
+
+
+def split_into_token_chunks(
+    text: str,
+    chunk_size: int = 512,
+    chunk_overlap: int = 64,
+    tokenizer: Optional["tiktoken.Encoding"] = None,
+) -> List[Tuple[str, int]]:
+    """Split text into overlapping chunks measured in tokens.
     
-    chunks_with_metadata = []
-    for idx, chunk_text in enumerate(text_chunks):
-        chunks_with_metadata.append({
+    Chunks are cut at token boundaries of the embedding model's tokenizer,
+    so each chunk holds about ``chunk_size`` tokens regardless of the
+    language of the text (see ``split_blocks_with_metadata`` for how the
+    reported token counts can exceed it slightly).
+    
+    Args:
+        text: The text content to split into chunks.
+        chunk_size: Maximum size of each chunk in tokens.
+        chunk_overlap: Number of overlapping tokens between consecutive chunks.
+        tokenizer: tiktoken encoding to use; defaults to ``get_tokenizer()``.
+        
+    Returns:
+        List of ``(chunk_text, token_count)`` tuples.
+    """
+    block = TextBlock(text=text)
+    return [
+        (chunk["text"], chunk["token_count"])
+        for chunk in split_blocks_with_metadata(
+            [block], "", "", chunk_size, chunk_overlap, tokenizer=tokenizer or get_tokenizer()
+        )
+    ]
+
+
+def split_blocks_with_metadata(
+    blocks: Iterable[TextBlock],
+    document_id: str,
+    document_name: str,
+    chunk_size: int = 1000,
+    chunk_overlap: int = 200,
+    tokenizer: Optional["tiktoken.Encoding"] = None,
+    boundaries: str = "fixed",
+) -> Iterator[dict]:
+    """Split a stream of text blocks into chunks with location provenance.
+    
+    Blocks are joined with blank lines exactly as ``fetch_document`` joins
+    them, and chunk boundaries match ``split_into_chunks`` on the joined
+    text. Only the text of the chunk being built is kept in memory, so
+    chunks of early pages are emitted before later pages are extracted.
+    
+    With a ``tokenizer``, chunk size and overlap are measured in tokens
+    instead of characters and chunks are cut at token boundaries. Blocks
+    are then tokenized in batches of ``TOKENIZE_BATCH_BLOCKS``.
+    
+    With ``boundaries="structure"``, chunks end at headings, paragraphs,
+    lines and sentences like ``split_into_spans`` instead of at fixed
+    offsets. With ``boundaries="content"``, they end where a rolling hash
+    of the preceding characters matches (see ``split_into_content_spans``),
+    so an edit only moves the boundaries next to it. Both ignore
+    ``chunk_overlap``.
+    
+    Args:
+        blocks: Text blocks in document order (see ``iter_text_blocks``).
+        document_id: Unique identifier for the document.
+        document_name: Name of the document.
+        chunk_size: Maximum size of each chunk in characters (or tokens).
+        chunk_overlap: Number of overlapping characters (or tokens) between
+            consecutive chunks.
+        tokenizer: tiktoken encoding for token-based chunking (see
+            ``app.rag.tokenizer.get_tokenizer``); None for characters.
+        boundaries: 'fixed', 'structure' or 'content' (the last two are
+            measured in characters only).
+        
+    Yields:
+        Dictionaries with the same keys as ``split_document_with_metadata``,
+        plus 'page_start' and 'page_end' when the blocks carry page numbers,
+        'sheet', 'row_start' and 'row_end' for spreadsheet row groups,
+        'token_count' when chunking by tokens (tokens of the chunk text
+        encoded on its own, which can exceed ``chunk_size`` by a token or
+        two where a cut falls inside a multi-byte character), and
+        'chunk_hash' (hex SHA-256 of the chunk text).
+    """
+    if chunk_size <= 0:
+        return
+    find_boundary = _BOUNDARY_FINDERS.get(boundaries)
+    if boundaries != "fixed" and find_boundary is None:
+        raise ValueError(f"Unknown chunk boundaries: {boundaries}")
+    if find_boundary is not None:
+        if tokenizer is not None:
+            raise ValueError(f"{boundaries} chunk boundaries are measured in characters")
+        chunk_overlap = 0
+    if chunk_overlap >= chunk_size:
+        raise ValueError("chunk_overlap must be smaller than chunk_size")
+    
+    buffer = ""
+    buffer_offset = 0  # Offset of buffer[0] in the joined text
+    block_starts: List[Tuple[int, TextBlock]] = []  # (offset, block) of buffered blocks
+    # Window positions are in units: characters, or tokens with a tokenizer
+    token_starts: List[int] = []  # Text offset of each buffered token
+    token_base = 0  # Index of token_starts[0] among all tokens
+    units_seen = 0
+    start = 0
+    chunk_index = 0
+    
+    def text_offset(unit: int) -> int:
+        """Offset in the joined text where window position ``unit`` starts."""
+        if tokenizer is None:
+            return unit
+        if unit - token_base < len(token_starts):
+            return token_starts[unit - token_base]
+        return buffer_offset + len(buffer)
+    
+    def blocks_between(chunk_start: int, chunk_end: int) -> List[TextBlock]:
+        """Buffered blocks overlapping the text range [chunk_start, chunk_end)."""
+        covered = []
+        for i, (block_offset, block) in enumerate(block_starts):
+            next_offset = block_starts[i + 1][0] if i + 1 < len(block_starts) else None
+            if block_offset < chunk_end and (next_offset is None or next_offset > chunk_start):
+                covered.append(block)
+        return covered
+    
+    def make_chunk(end: int) -> Optional[dict]:
+        nonlocal chunk_index
+        chunk_start = text_offset(start)
+        chunk_end = min(text_offset(end), buffer_offset + len(buffer))
+        chunk_text = buffer[chunk_start - buffer_offset:chunk_end - buffer_offset]
+        if chunk_end <= chunk_start or not chunk_text.strip():
+            return None
+        chunk = {
             "text": chunk_text,
             "document_id": document_id,
             "document_name": document_name,
-            "chunk_index": idx,
-        })
+            "chunk_index": chunk_index,
+            "chunk_hash": hashlib.sha256(chunk_text.encode("utf-8")).hexdigest(),
+        }
+        if tokenizer is not None:
+            # Counted on the chunk text itself: a cut inside a multi-byte
+            # character or a different BPE merge at the edges can make this
+            # differ from the window length by a token or two
+            chunk["token_count"] = len(tokenizer.encode_ordinary(chunk_text))
+        covered = blocks_between(chunk_start, chunk_end)
+        first = covered[0]
+        if first.page is not None:
+            chunk["page_start"] = first.page
+            chunk["page_end"] = max(block.page for block in covered if block.page is not None)
+        if first.sheet is not None:
+            # A chunk spanning two sheets is attributed to the first one
+            same_sheet = [block for block in covered if block.sheet == first.sheet]
+            chunk["sheet"] = first.sheet
+            chunk["row_start"] = first.row_start
+            chunk["row_end"] = same_sheet[-1].row_end
+        chunk_index += 1
+        return chunk
     
-    return chunks_with_metadata
+    group_size = 1 if tokenizer is None else TOKENIZE_BATCH_BLOCKS
+    for group in _grouped((block for block in blocks if block.text), group_size):
+        pieces = []
+        for block in group:
+            # The separator goes in front of the block so it is tokenized with it
+            separator = "\n\n" if block_starts or buffer else ""
+            pieces.append(separator + block.text)
+            block_starts.append((buffer_offset + len(buffer) + len(separator), block))
+            buffer += separator + block.text
+        
+        if tokenizer is None:
+            units_seen = buffer_offset + len(buffer)
+        else:
+            piece_offset = buffer_offset + len(buffer) - sum(len(piece) for piece in pieces)
+            for piece, offsets in zip(pieces, token_offsets(pieces, tokenizer)):
+                token_starts.extend(piece_offset + offset for offset in offsets)
+                piece_offset += len(piece)
+            units_seen = token_base + len(token_starts)
+        
+        if find_boundary is not None:
+            start = buffer_offset + _skip_whitespace(buffer, start - buffer_offset)
+        
+        # Emit every chunk that is followed by more text; the last chunk
+        # has to wait until the stream ends
+        while start + chunk_size < units_seen:
+            if find_boundary is not None:
+                end, next_start = find_boundary(buffer, start - buffer_offset, chunk_size)
+                end += buffer_offset
+                next_start += buffer_offset
+            else:
+                end = start + chunk_size
+                next_start = end - chunk_overlap
+            chunk = make_chunk(end)
+            if chunk is not None:
+                yield chunk
+            start = next_start
+        
+        # Drop text, tokens and block offsets no longer needed
+        keep_from = text_offset(start)
+        if tokenizer is not None and start > token_base:
+            del token_starts[:start - token_base]
+            token_base = start
+        drop = keep_from - buffer_offset
+        if drop > 0:
+            buffer = buffer[drop:]
+            buffer_offset = keep_from
+        while len(block_starts) > 1 and block_starts[1][0] <= keep_from:
+            block_starts.pop(0)
+    
+    if units_seen > start:
+        end = units_seen
+        if find_boundary is not None:
+            end = buffer_offset + _trim_whitespace(buffer, start - buffer_offset, len(buffer))
+        chunk = make_chunk(end)
+        if chunk is not None:
+            yield chunk
+
+
+def _grouped(items: Iterable[TextBlock], size: int) -> Iterator[List[TextBlock]]:
+    """Group ``items`` into lists of at most ``size``."""
+    group: List[TextBlock] = []
+    for item in items:
+        group.append(item)
+        if len(group) >= size:
+            yield group
+            group = []
+    if group:
+        yield group
+
+
+def _split_spans(
+    text: str,
+    chunk_size: int,
+    find_boundary: Callable[[str, int, int], Tuple[int, int]],
+) -> List[Tuple[int, int]]:
+    if chunk_size <= 0:
+        return []
+    
+    spans = []
+    start = _skip_whitespace(text, 0)
+    while start < len(text):
+        if len(text) - start <= chunk_size:
+            end = _trim_whitespace(text, start, len(text))
+            if end > start:
+                spans.append((start, end))
+            break
+        end, next_start = find_boundary(text, start, chunk_size)
+        if end > start:
+            spans.append((start, end))
+        start = next_start
+    return spans
+
+
+def _find_boundary(text: str, start: int, chunk_size: int) -> Tuple[int, int]:
+    """Pick where the chunk starting at ``start`` ends (see ``split_into_spans``).
+    
+    ``text`` must extend beyond ``start + chunk_size``. Returns the end of
+    the chunk with trailing whitespace trimmed and the start of the next
+    chunk with leading whitespace skipped.
+    """
+    limit = start + chunk_size
+    low = start + max(1, int(chunk_size * MIN_CHUNK_FRACTION))
+    
+    cut = -1
+    best = -1
+    for match in _BOUNDARY_RE.finditer(text, low, limit):
+        score = _BOUNDARY_SCORES[match.lastgroup]
+        if score >= best:
+            best = score
+            cut = match.end()
+    
+    if cut < 0:
+        # No structural boundary: break between words, or mid-word as a last resort
+        space = max(text.rfind(" ", low, limit), text.rfind("\t", low, limit))
+        cut = space + 1 if space >= 0 else limit
+    
+    return _trim_whitespace(text, start, cut), _skip_whitespace(text, cut)
+
+
+def _skip_whitespace(text: str, pos: int) -> int:
+    while pos < len(text) and text[pos].isspace():
+        pos += 1
+    return pos
+
+
+def _trim_whitespace(text: str, start: int, end: int) -> int:
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return end
+
+
+def _find_content_boundary(text: str, start: int, chunk_size: int) -> Tuple[int, int]:
+    """Pick where a content-defined chunk ends (see ``split_into_content_spans``)."""
+    limit = start + chunk_size
+    low = start + max(1, int(chunk_size * CDC_MIN_FRACTION))
+    # About one match per (chunk_size - min size) / 2 characters, rounded
+    # down to a power of two. The mask takes the high bits: the low bits of
+    # a gear hash only depend on the last few characters.
+    bits = max(1, ((chunk_size - (low - start)) // 2).bit_length() - 1)
+    mask = ((1 << bits) - 1) << (32 - bits)
+    
+    # Warm the hash up over the window preceding the first allowed cut
+    position = max(start, low - _GEAR_WINDOW)
+    digest = 0
+    gear = _GEAR
+    while position < limit:
+        code = ord(text[position])
+        digest = ((digest << 1) + gear[(code ^ (code >> 8)) & 0xFF]) & 0xFFFFFFFF
+        position += 1
+        if position >= low and not digest & mask:
+            # Snap to the next whitespace so words are not split
+            cut = position
+            while cut < limit and not text[cut].isspace():
+                cut += 1
+            if cut < limit:
+                return _trim_whitespace(text, start, cut), _skip_whitespace(text, cut)
+            break
+    
+    return _find_boundary(text, start, chunk_size)
+
 
+# Boundary finders selectable in split_blocks_with_metadata
+_BOUNDARY_FINDERS = {
+    "structure": _find_boundary,
+    "content": _find_content_boundary,
+}
@@ -0,0 +1,153 @@
+"""Near-duplicate chunk detection with MinHash and locality-sensitive hashing.
+
+SharePoint libraries contain many copies of the same content (renamed
+versions, templates copied into project folders, shared boilerplate). Before
+a chunk is embedded it is compared against the chunks already stored in
+Qdrant: a near-duplicate is not embedded or stored as a point of its own,
+but recorded in the ``duplicate_sources`` payload of the existing chunk.
+
+Every stored chunk carries its LSH band keys in the ``lsh_bands`` payload
+field and in the local dedup index (``app.dedup_index``), where the band
+keys of a whole batch of chunks are looked up at once across the corpus.
+Candidates are confirmed by comparing MinHash signatures recomputed from
+their text.
+
+``NUM_PERM``, ``BANDS`` and ``SHINGLE_SIZE`` determine the stored band keys;
+changing them requires re-indexing.
+"""
+
+import hashlib
+import re
+import zlib
+from typing import Any, Dict, List
+
+import numpy as np
+
+from app.qdrant_client import find_lsh_candidates
+
+
+# MinHash permutations per signature
+NUM_PERM = 128
+
+# LSH bands; with 8 rows per band, chunks with Jaccard similarity above
+# about (1/16) ** (1/8) ~= 0.7 become candidates
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+# Character n-gram size used as shingle
+SHINGLE_SIZE = 5
+
+# Shorter chunks (page headers, single table cells) are never deduplicated
+MIN_CHARS = 50
+
+# Candidates compared per chunk
+MAX_CANDIDATES = 8
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+# Fixed seed: signatures must be identical across processes and releases
+_rng = np.random.RandomState(0x5D0C5)
+_PERM_A = _rng.randint(1, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def _shingle_hashes(text: str) -> np.ndarray:
+    """32-bit hashes of the character shingles of normalized text."""
+    normalized = _WHITESPACE_RE.sub(" ", text.lower()).strip()
+    if len(normalized) <= SHINGLE_SIZE:
+        shingles = {normalized}
+    else:
+        shingles = {
+            normalized[i:i + SHINGLE_SIZE]
+            for i in range(len(normalized) - SHINGLE_SIZE + 1)
+        }
+    return np.fromiter(
+        (zlib.crc32(shingle.encode("utf-8")) for shingle in shingles),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+
+
+def minhash_signatures(texts: List[str]) -> np.ndarray:
+    """Compute MinHash signatures.
+
+    Args:
+        texts: Texts to sign.
+
+    Returns:
+        Array of shape ``(len(texts), NUM_PERM)``.
+    """
+    signatures = np.empty((len(texts), NUM_PERM), dtype=np.uint64)
+    for row, text in enumerate(texts):
+        hashes = _shingle_hashes(text)
+        # Operands stay below 2**32, so the product cannot overflow uint64
+        permuted = ((hashes[:, None] * _PERM_A + _PERM_B) % _MERSENNE_PRIME) & _MAX_HASH
+        signatures[row] = permuted.min(axis=0)
+    return signatures
+
+
+def band_keys(signature: np.ndarray) -> List[str]:
+    """LSH band keys of a signature, as stored in the ``lsh_bands`` payload."""
+    return [
+        f"{band}:{hashlib.blake2b(signature[band * ROWS:(band + 1) * ROWS].tobytes(), digest_size=8).hexdigest()}"
+        for band in range(BANDS)
+    ]
+
+
+def find_duplicates(
+    chunks: List[Dict[str, Any]],
+    document_id: str,
+    threshold: float,
+) -> Dict[int, Dict[str, Any]]:
+    """Find stored near-duplicates of chunks about to be indexed.
+
+    Sets ``lsh_bands`` on every chunk long enough to be deduplicated, so the
+    keys end up in the payload of the chunks that do get stored.
+
+    Args:
+        chunks: Chunk dictionaries (see ``split_blocks_with_metadata``).
+        document_id: Document the chunks belong to; its own stored chunks
+            are not considered duplicates.
+        threshold: Minimum estimated Jaccard similarity of the shingle sets.
+
+    Returns:
+        Mapping of chunk position in ``chunks`` to the matching stored point
+        (``{'id', 'document_id', 'score'}``).
+    """
+    positions = [i for i, chunk in enumerate(chunks) if len(chunk["text"].strip()) >= MIN_CHARS]
+    if not positions:
+        return {}
+
+    signatures = minhash_signatures([chunks[i]["text"] for i in positions])
+    keys = [band_keys(signature) for signature in signatures]
+    for position, chunk_keys in zip(positions, keys):
+        chunks[position]["lsh_bands"] = chunk_keys
+
+    # One lookup for the candidates of every chunk
+    candidates = find_lsh_candidates(keys, exclude_document_id=document_id, limit=MAX_CANDIDATES)
+    texts = list({candidate["id"]: candidate["text"] for found in candidates for candidate in found}.items())
+    if not texts:
+        return {}
+    candidate_signatures = dict(zip(
+        (point_id for point_id, _ in texts),
+        minhash_signatures([text for _, text in texts]),
+    ))
+
+    duplicates: Dict[int, Dict[str, Any]] = {}
+    for position, signature, found in zip(positions, signatures, candidates):
+        if not found:
+            continue
+        similarities = np.array([
+            (candidate_signatures[candidate["id"]] == signature).mean() for candidate in found
+        ])
+        best = int(similarities.argmax())
+        if similarities[best] >= threshold:
+            duplicates[position] = {
+                "id": found[best]["id"],
+                "document_id": found[best]["document_id"],
+                "score": float(similarities[best]),
+            }
+    return duplicates
@@ -4,22 +4,176 @@ This module handles the full indexing pipeline: document retrieval, chunking,
 embedding, and storage in the vector database.
 """
 
-from typing import Dict, List, Optional
-from uuid import uuid4
+import queue
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple, TypeVar
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from uuid import NAMESPACE_URL, uuid5
 
 from app.config import get_settings
-from app.embeddings import embed_texts
-from app.qdrant_client import get_qdrant_client
-from app.rag.chunking import split_document_with_metadata
+from app.dedup_index import get_dedup_index
+from app.embeddings import embed_texts, get_embedding_model_key
+from app.metadata_cache import get_metadata_cache
+from app.qdrant_client import (
+    add_duplicate_source,
+    delete_document_points,
+    delete_points,
+    get_document_point_ids,
+    get_indexed_ctag,
+    get_indexed_document_ids,
+    get_qdrant_client,
+    remove_duplicate_sources,
+    retrieve_points,
+    set_document_payload,
+)
+from app.rag.chunking import split_blocks_with_metadata
+from app.rag.dedup import find_duplicates
+from app.rag.sync_state import load_delta_link, save_delta_link
+from app.rag.tokenizer import get_tokenizer
 from app.sharepoint_client import (
-    get_document_content,
-    get_document_metadata,
-    list_sharepoint_documents,
+    GRAPH_BATCH_LIMIT,
+    DocumentSkipped,
+    get_documents_metadata,
+    get_drive_changes,
+    iter_sharepoint_documents,
+    open_document,
 )
 from qdrant_client.models import PointStruct
 
 
-def index_sharepoint_document(document_id: str, site_id: Optional[str] = None) -> Dict[str, int]:
+T = TypeVar("T")
+
+
+def _with_metadata(
+    documents: Iterable[Dict[str, Any]],
+    site_id: Optional[str],
+) -> Iterator[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]]:
+    """Pair enumerated documents with metadata usable by ``open_document``.
+    
+    Enumeration and delta items normally carry every metadata field already
+    and are passed through as-is. Items without a download URL are looked
+    up 20 at a time via Graph ``$batch``. Yields ``(document, metadata)``;
+    metadata is None if the batched lookup did not return the document.
+    """
+    batch: List[Dict[str, Any]] = []
+    
+    def flush() -> Iterator[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]]:
+        metadata = get_documents_metadata([d["id"] for d in batch], site_id=site_id)
+        for item in batch:
+            yield item, metadata.get(item["id"])
+        batch.clear()
+    
+    for doc in documents:
+        if doc.get("download_url"):
+            yield doc, doc
+            continue
+        batch.append(doc)
+        if len(batch) >= GRAPH_BATCH_LIMIT:
+            yield from flush()
+    if batch:
+        yield from flush()
+
+
+def _prefetch(items: Iterable[T], max_buffered: int) -> Iterator[T]:
+    """Iterate ``items`` in a background thread, buffering up to ``max_buffered``.
+    
+    Lets the producer (PDF parsing and chunking) run ahead while the consumer
+    waits on the embedding API. Exceptions from the producer are re-raised
+    in the consumer.
+    """
+    buffer: "queue.Queue[Tuple[str, Any]]" = queue.Queue(maxsize=max_buffered)
+    stop = threading.Event()
+    
+    def produce() -> None:
+        try:
+            for item in items:
+                if stop.is_set():
+                    return
+                buffer.put(("item", item))
+            buffer.put(("done", None))
+        except BaseException as exc:  # pragma: no cover - re-raised below
+            buffer.put(("error", exc))
+    
+    producer = threading.Thread(target=produce, name="index-prefetch", daemon=True)
+    producer.start()
+    try:
+        while True:
+            kind, value = buffer.get()
+            if kind == "done":
+                return
+            if kind == "error":
+                raise value
+            yield value
+    finally:
+        stop.set()
+        # Unblock a producer waiting on a full queue so it can exit
+        while producer.is_alive():
+            try:
+                buffer.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+
+def _batched(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    """Group ``items`` into lists of at most ``size``."""
+    batch: List[T] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _chunk_payload(
+    document_id: str,
+    document_metadata: Dict[str, Any],
+    chunk: Dict[str, Any],
+) -> Dict[str, Any]:
+    """Build the Qdrant payload stored with one chunk."""
+    payload = {
+        "document_id": document_id,
+        "document_name": document_metadata.get("name", "Unknown"),
+        "chunk_index": chunk["chunk_index"],
+        "chunk_hash": chunk["chunk_hash"],
+        "text": chunk["text"],
+        "sharepoint": {
+            "web_url": document_metadata.get("web_url", ""),
+            "download_url": document_metadata.get("download_url", ""),
+            "modified_date": document_metadata.get("modified_date", ""),
+            "author": document_metadata.get("author", ""),
+            "ctag": document_metadata.get("ctag", ""),
+        },
+    }
+    for key in ("page_start", "page_end", "sheet", "row_start", "row_end", "token_count", "lsh_bands"):
+        if key in chunk:
+            payload[key] = chunk[key]
+    return payload
+
+
+def _duplicate_source(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Entry recorded in ``duplicate_sources`` for a chunk that was deduplicated."""
+    return {key: payload[key] for key in ("document_id", "document_name", "chunk_index", "sharepoint")}
+
+
+def _chunk_point_id(document_id: str, chunk_hash: str, occurrence: int, model_key: str) -> str:
+    """Deterministic point ID of a chunk.
+    
+    A chunk whose text (and the embedding model and dimension, see
+    ``get_embedding_model_key``) did not change keeps its ID across
+    re-indexing runs, so its stored vector can be reused.
+    ``occurrence`` tells identical chunks of the same document apart.
+    """
+    return str(uuid5(NAMESPACE_URL, f"{model_key}/{document_id}/{chunk_hash}/{occurrence}"))
+
+
+def index_sharepoint_document(
+    document_id: str,
+    site_id: Optional[str] = None,
+    metadata: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
     """Index a SharePoint document into Qdrant vector database.
     
     This function:
@@ -28,85 +182,224 @@ def index_sharepoint_document(document_id: str, site_id: Optional[str] = None) -
     3. Generates embeddings for each chunk
     4. Stores chunks and embeddings in Qdrant
     
+    Steps 2-4 run as a pipeline over batches of ``INDEX_EMBED_BATCH_SIZE``
+    chunks: while one batch is being embedded, the next pages of the
+    document are already being extracted and chunked.
+    
+    Point IDs are derived from the chunk text, so chunks that are unchanged
+    since the last run reuse their stored vector instead of being embedded
+    again. Combined with ``CHUNKING_STRATEGY=content``, whose boundaries do
+    not shift after an edit, re-indexing a modified document only embeds
+    the chunks around the edit.
+    
+    New chunks that are near-duplicates of a chunk of another document
+    (see ``app.rag.dedup``) are not embedded or stored; the document is
+    added to the ``duplicate_sources`` of the existing chunk instead.
+    
     Args:
         document_id: Unique identifier of the SharePoint document.
         site_id: Optional SharePoint site identifier. If provided,
             this site ID will be used instead of the default configuration.
+        metadata: Document metadata obtained beforehand (e.g. during
+            enumeration). If None, it is fetched together with the content.
         
     Returns:
         Dictionary containing indexing statistics:
         - 'chunks_indexed': Number of chunks successfully indexed
+        - 'chunks_reused': Number of those whose stored vector was reused
+        - 'chunks_deduplicated': Number of chunks recorded as duplicates of
+          another document's chunk instead of being stored
         - 'document_id': The document ID that was indexed
+        - 'skipped_reason': Present only if the document was skipped
+          (e.g. it exceeds ``INDEX_MAX_FILE_SIZE_MB``); existing chunks are kept
         
     Raises:
         Exception: If document retrieval or indexing fails.
         
+    Note:
+        Chunks from a previous indexing run of the same document that are
+        no longer produced are deleted once the new chunks are stored, so
+        re-indexing a modified document never leaves stale chunks.
+        
     TODO:
         - Add error handling for failed document retrieval
-        - Implement incremental indexing (check if document already exists)
         - Add document versioning support
-        - Handle large documents with batch processing
     """
     settings = get_settings()
+    client = get_qdrant_client()
+    chunks_indexed = 0
+    chunks_reused = 0
+    chunks_deduplicated = 0
 
     # Step 1: Get document content and metadata from SharePoint
     print(f"Retrieving document {document_id} from SharePoint...")
-    document_content = get_document_content(document_id)
-    document_metadata = get_document_metadata(document_id)
-    
-    # Step 2: Split document into chunks
-    print(f"Splitting document into chunks...")
-    chunks_with_metadata = split_document_with_metadata(
-        text=document_content,
-        document_id=document_id,
-        document_name=document_metadata.get("name", "Unknown"),
-        chunk_size=settings.chunk_size,
-        chunk_overlap=settings.chunk_overlap,
-    )
+    try:
+        with open_document(document_id, site_id=site_id, metadata=metadata) as document:
+            document_metadata = document["metadata"]
+            
+            # Step 2: Split document into chunks as the text is extracted
+            if settings.chunking_strategy == "tokens":
+                chunk_options = {
+                    "chunk_size": settings.chunk_size_tokens,
+                    "chunk_overlap": settings.chunk_overlap_tokens,
+                    "tokenizer": get_tokenizer(),
+                }
+            else:
+                chunk_options = {
+                    "chunk_size": settings.chunk_size,
+                    "chunk_overlap": settings.chunk_overlap,
+                    "boundaries": (
+                        settings.chunking_strategy
+                        if settings.chunking_strategy in ("structure", "content")
+                        else "fixed"
+                    ),
+                }
+            model_key = get_embedding_model_key()
+            existing_ids = get_document_point_ids(document_id)
+            indexed_ids = set()
+            duplicated_into: Set[Tuple[str, int]] = set()
+            occurrences: Counter = Counter()
+            
+            chunks = split_blocks_with_metadata(
+                blocks=document["blocks"],
+                document_id=document_id,
+                document_name=document_metadata.get("name", "Unknown"),
+                **chunk_options,
+            )
+            
+            batch_size = settings.index_embed_batch_size
+            prefetched = _prefetch(chunks, max_buffered=2 * batch_size)
+            try:
+                for batch in _batched(prefetched, batch_size):
+                    point_ids = []
+                    for chunk in batch:
+                        occurrence = occurrences[chunk["chunk_hash"]]
+                        occurrences[chunk["chunk_hash"]] += 1
+                        point_ids.append(_chunk_point_id(
+                            document_id, chunk["chunk_hash"], occurrence, model_key
+                        ))
+                    
+                    # Step 3: Generate embeddings for the chunks not embedded before,
+                    # unless another document already has a near-duplicate
+                    stored = retrieve_points(
+                        [pid for pid in point_ids if pid in existing_ids],
+                        with_vectors=True,
+                        payload_keys=["duplicate_sources", "lsh_bands"],
+                    )
+                    new_positions = [i for i, pid in enumerate(point_ids) if pid not in stored]
+                    duplicates: Dict[int, Dict[str, Any]] = {}
+                    if settings.dedup_threshold > 0 and new_positions:
+                        new_chunks = [batch[i] for i in new_positions]
+                        found = find_duplicates(new_chunks, document_id, settings.dedup_threshold)
+                        duplicates = {new_positions[i]: match for i, match in found.items()}
+                    to_embed = [i for i in new_positions if i not in duplicates]
+                    if to_embed:
+                        print(
+                            f"Generating embeddings for chunks {chunks_indexed}-{chunks_indexed + len(batch) - 1} "
+                            f"({len(stored)} unchanged, {len(duplicates)} duplicates)..."
+                        )
+                    embeddings = dict(zip(to_embed, embed_texts([batch[i]["text"] for i in to_embed])))
+                
+                    # Step 4: Prepare points and upload to Qdrant
+                    points = []
+                    for i, (chunk, pid) in enumerate(zip(batch, point_ids)):
+                        payload = _chunk_payload(document_id, document_metadata, chunk)
+                        if i in duplicates:
+                            add_duplicate_source(duplicates[i]["id"], _duplicate_source(payload))
+                            duplicated_into.add((duplicates[i]["id"], chunk["chunk_index"]))
+                            continue
+                        if pid in stored:
+                            # Keep the duplicates recorded on this chunk by other documents
+                            previous = stored[pid].payload or {}
+                            for key in ("duplicate_sources", "lsh_bands"):
+                                if previous.get(key):
+                                    payload[key] = previous[key]
+                            vector = stored[pid].vector
+                        else:
+                            vector = embeddings[i]
+                        points.append(PointStruct(id=pid, vector=vector, payload=payload))
+                    if points:
+                        client.upsert(
+                            collection_name=settings.qdrant_collection_name,
+                            points=points,
+                        )
+                        get_dedup_index().add_bands(
+                            (point.id, point.payload["lsh_bands"])
+                            for point in points
+                            if point.payload.get("lsh_bands")
+                        )
+                    indexed_ids.update(point.id for point in points)
+                    chunks_indexed += len(points)
+                    chunks_reused += len(stored)
+                    chunks_deduplicated += len(duplicates)
+            finally:
+                # Stop the prefetch thread before the download is released
+                prefetched.close()
+    except DocumentSkipped as e:
+        print(f"Skipping document {document_id}: {e.reason}")
+        return {"chunks_indexed": 0, "document_id": document_id, "skipped_reason": e.reason}
     
-    if not chunks_with_metadata:
+    result = {
+        "chunks_indexed": chunks_indexed,
+        "chunks_reused": chunks_reused,
+        "chunks_deduplicated": chunks_deduplicated,
+        "document_id": document_id,
+    }
+    if chunks_indexed + chunks_deduplicated == 0:
         print(f"No chunks created for document {document_id}")
-        return {"chunks_indexed": 0, "document_id": document_id}
-    
-    # Step 3: Generate embeddings for all chunks
-    print(f"Generating embeddings for {len(chunks_with_metadata)} chunks...")
-    chunk_texts = [chunk["text"] for chunk in chunks_with_metadata]
-    embeddings = embed_texts(chunk_texts)
-    
-    # Step 4: Prepare points for Qdrant
-    points = []
-    for chunk, embedding in zip(chunks_with_metadata, embeddings):
-        point = PointStruct(
-            id=str(uuid4()),  # Generate unique ID for each chunk
-            vector=embedding,
-            payload={
-                "document_id": document_id,
-                "document_name": document_metadata.get("name", "Unknown"),
-                "chunk_index": chunk["chunk_index"],
-                "text": chunk["text"],
-                "sharepoint": {
-                    "web_url": document_metadata.get("web_url", ""),
-                    "download_url": document_metadata.get("download_url", ""),
-                    "modified_date": document_metadata.get("modified_date", ""),
-                    "author": document_metadata.get("author", ""),
-                },
-            },
-        )
-        points.append(point)
-    
-    # Step 5: Upload to Qdrant
-    print(f"Uploading {len(points)} chunks to Qdrant...")
-    client = get_qdrant_client()
-    client.upsert(
-        collection_name=settings.qdrant_collection_name,
-        points=points,
+        delete_document_points(document_id)
+        return result
+    
+    # Only now that the new chunks are stored: drop the previous run's chunks
+    # and the duplicates it recorded that this run no longer produced
+    delete_points(existing_ids - indexed_ids)
+    remove_duplicate_sources(document_id, keep=duplicated_into)
+    print(
+        f"Successfully indexed {chunks_indexed} chunks for document {document_id} "
+        f"({chunks_reused} reused, {chunks_deduplicated} duplicates, "
+        f"{len(existing_ids - indexed_ids)} removed)"
     )
+    return result
+
+
+def _index_documents(
+    documents: Iterable[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]],
+    site_id: Optional[str],
+) -> Iterator[Tuple[Dict[str, Any], Optional[Dict[str, Any]], Optional[Exception]]]:
+    """Index ``(document, metadata)`` pairs on ``INDEX_DOCUMENT_WORKERS`` threads.
     
-    print(f"Successfully indexed {len(points)} chunks for document {document_id}")
-    return {"chunks_indexed": len(points), "document_id": document_id}
+    While one document waits on its download or embeddings, others are
+    extracted and chunked, and the chunks of all of them share embedding
+    requests. At most two documents per worker are taken from ``documents``
+    ahead of time, so enumeration still streams.
+    
+    Yields:
+        ``(document, result, error)`` in completion order; ``result`` is the
+        return value of ``index_sharepoint_document`` or None if it raised
+        ``error``.
+    """
+    settings = get_settings()
+    workers = max(1, settings.index_document_workers)
+    
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="index-doc") as executor:
+        running: Dict[Future, Dict[str, Any]] = {}
+        
+        def drain(limit: int) -> Iterator[Tuple[Dict[str, Any], Optional[Dict[str, Any]], Optional[Exception]]]:
+            while len(running) > limit:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    doc = running.pop(future)
+                    error = future.exception()
+                    yield doc, (None if error else future.result()), error
+        
+        for doc, metadata in documents:
+            future = executor.submit(index_sharepoint_document, doc["id"], site_id=site_id, metadata=metadata)
+            running[future] = doc
+            yield from drain(2 * workers - 1)
+        yield from drain(0)
 
 
-def index_all_sharepoint_documents(site_id: Optional[str] = None) -> Dict[str, int]:
+def index_all_sharepoint_documents(site_id: Optional[str] = None) -> Dict[str, Any]:
     """Index all documents from SharePoint into Qdrant.
     
     Args:
@@ -118,32 +411,161 @@ def index_all_sharepoint_documents(site_id: Optional[str] = None) -> Dict[str, i
         Dictionary containing indexing statistics:
         - 'total_documents': Total number of documents processed
         - 'total_chunks': Total number of chunks indexed
+        - 'skipped_documents': List of ``{'document_id', 'name', 'reason'}``
+          for documents that were deliberately not indexed
+
+    Note:
+        Documents are indexed while the library is still being crawled,
+        so the first document is processed before enumeration finishes.
+        ``INDEX_DOCUMENT_WORKERS`` documents are indexed in parallel.
 
     TODO:
-        - Implement parallel processing for multiple documents
         - Add progress tracking
-        - Handle failures gracefully (continue with other documents)
     """
 
-    print("Listing all SharePoint documents...")
-    documents = list_sharepoint_documents(site_id=site_id)
+    print("Crawling SharePoint documents...")
     
     total_chunks = 0
     successful_documents = 0
+    documents_seen = 0
+    skipped_documents: List[Dict[str, str]] = []
     
-    for doc in documents:
-        try:
-            result = index_sharepoint_document(doc["id"])
-            total_chunks += result["chunks_indexed"]
-            successful_documents += 1
-        except Exception as e:
-            print(f"Error indexing document {doc['id']}: {e}")
+    documents = iter_sharepoint_documents(site_id=site_id)
+    for doc, result, error in _index_documents(_with_metadata(documents, site_id), site_id):
+        documents_seen += 1
+        if error is not None:
+            print(f"Error indexing document {doc['id']}: {error}")
+            continue
+        
+        if "skipped_reason" in result:
+            skipped_documents.append({
+                "document_id": doc["id"],
+                "name": doc.get("name", ""),
+                "reason": result["skipped_reason"],
+            })
             continue
+        
+        total_chunks += result["chunks_indexed"]
+        successful_documents += 1
     
-    print(f"Indexing complete: {successful_documents}/{len(documents)} documents, {total_chunks} total chunks")
+    print(
+        f"Indexing complete: {successful_documents}/{documents_seen} documents, "
+        f"{len(skipped_documents)} skipped, {total_chunks} total chunks"
+    )
     
     return {
         "total_documents": successful_documents,
         "total_chunks": total_chunks,
+        "skipped_documents": skipped_documents,
     }
 
+
+def sync_sharepoint_documents(
+    site_id: Optional[str] = None,
+    full_resync: bool = False,
+) -> Dict[str, int]:
+    """Incrementally synchronize a SharePoint site with Qdrant.
+    
+    Uses the Graph delta query to find files created, modified or deleted
+    since the last sync of the site. Only changed files are re-indexed and
+    the chunks of deleted files, and of files that no longer pass the
+    extension and size filters, are removed. The delta link is saved only
+    after every change has been applied, so an interrupted sync is retried
+    from the same point next time.
+    
+    The first sync of a site, a ``full_resync`` and a sync whose saved delta
+    link has expired all enumerate every file without reporting deletions;
+    indexed documents missing from such a listing are then purged.
+    
+    Args:
+        site_id: Optional SharePoint site identifier. If None, the default
+            site from configuration is used.
+        full_resync: Ignore the saved delta link and enumerate every file.
+            Files whose cTag matches the indexed version are still skipped.
+        
+    Returns:
+        Dictionary containing sync statistics:
+        - 'documents_indexed': Number of changed documents re-indexed
+        - 'documents_skipped': Number of reported documents whose content was
+          unchanged, or that were skipped (e.g. too large)
+        - 'documents_deleted': Number of removed documents purged from Qdrant
+        - 'documents_failed': Number of documents that failed to index
+        - 'total_chunks': Total number of chunks indexed
+    """
+    settings = get_settings()
+    
+    if site_id is None:
+        site_id = settings.sharepoint_site_id
+    
+    delta_link = None if full_resync else load_delta_link(site_id)
+    print(f"Syncing SharePoint site {site_id} ({'incremental' if delta_link else 'full'})...")
+    changes = get_drive_changes(site_id=site_id, delta_link=delta_link)
+    
+    documents_indexed = 0
+    documents_skipped = 0
+    documents_failed = 0
+    total_chunks = 0
+    
+    metadata_cache = get_metadata_cache()
+    for document_id in changes["deleted"]:
+        metadata_cache.invalidate(document_id)
+    
+    # Without a usable delta link the changes are a listing of every file
+    full_listing = delta_link is None or changes["resync_required"]
+    deleted: List[str] = []
+    if changes["deleted"] or full_listing:
+        # One scan of the collection instead of one per reported removal;
+        # a full enumeration reports every filtered-out file as removed
+        indexed = get_indexed_document_ids()
+        deleted = [document_id for document_id in changes["deleted"] if document_id in indexed]
+        if full_listing:
+            # Files deleted before the first sync, or while the delta link
+            # was expired, are not reported as deletions
+            enumerated = {doc["id"] for doc in changes["changed"]}
+            gone = indexed - enumerated - set(changes["deleted"])
+            if gone:
+                print(f"Purging {len(gone)} indexed documents missing from the full enumeration")
+            deleted.extend(gone)
+    for document_id in deleted:
+        delete_document_points(document_id)
+    for doc in changes["changed"]:
+        metadata_cache.invalidate(doc["id"])
+    
+    # Renames and moves are reported too; the cTag only changes when the
+    # file content does, so those just get their name refreshed.
+    changed_documents = []
+    for doc in changes["changed"]:
+        if doc.get("ctag") and doc["ctag"] == get_indexed_ctag(doc["id"]):
+            set_document_payload(doc["id"], {"document_name": doc["name"]})
+            documents_skipped += 1
+        else:
+            changed_documents.append(doc)
+    
+    for doc, result, error in _index_documents(_with_metadata(changed_documents, site_id), site_id):
+        if error is not None:
+            print(f"Error indexing document {doc['id']}: {error}")
+            documents_failed += 1
+            continue
+        if "skipped_reason" in result:
+            documents_skipped += 1
+            continue
+        total_chunks += result["chunks_indexed"]
+        documents_indexed += 1
+    
+    if changes["delta_link"] and documents_failed == 0:
+        save_delta_link(site_id, changes["delta_link"])
+    elif documents_failed:
+        print(f"{documents_failed} documents failed; keeping previous delta link for retry")
+    
+    print(
+        f"Sync complete: {documents_indexed} indexed, {documents_skipped} unchanged, "
+        f"{len(deleted)} deleted, {documents_failed} failed, {total_chunks} chunks"
+    )
+    
+    return {
+        "documents_indexed": documents_indexed,
+        "documents_skipped": documents_skipped,
+        "documents_deleted": len(deleted),
+        "documents_failed": documents_failed,
+        "total_chunks": total_chunks,
+    }
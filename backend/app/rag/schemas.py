@@ -17,6 +17,20 @@ class SearchRequest(BaseModel):
     top_k: int = Field(default=5, description="Number of results to return", ge=1, le=50)
 
 
+class DuplicateSource(BaseModel):
+    """Another document containing a near-duplicate of a source chunk.
+    
+    Attributes:
+        file_title: Title or name of the file.
+        download_url: URL to access the document.
+        document_id: Unique identifier of the document.
+    """
+
+    file_title: str = Field(..., description="Name of the file")
+    download_url: str = Field(default="", description="URL to access the document")
+    document_id: str = Field(default="", description="Unique document identifier")
+
+
 class Source(BaseModel):
     """Source document information for a search result.
     
@@ -27,6 +41,7 @@ class Source(BaseModel):
         download_url: URL to download or access the source document.
         document_id: Unique identifier of the document.
         score: Relevance score of the source (optional).
+        duplicates: Other documents containing a near-duplicate of the chunk.
     """
 
     file_title: str = Field(..., description="Name of the source file")
@@ -35,6 +50,9 @@ class Source(BaseModel):
     download_url: str = Field(..., description="URL to access the source document")
     document_id: str = Field(default="", description="Unique document identifier")
     score: float = Field(default=0.0, description="Relevance score", ge=0.0, le=1.0)
+    duplicates: List[DuplicateSource] = Field(
+        default_factory=list, description="Other documents containing the same content"
+    )
 
 
 class SearchResponse(BaseModel):
@@ -69,11 +87,16 @@ class IndexResponse(BaseModel):
     Attributes:
         document_id: ID of the indexed document.
         chunks_indexed: Number of chunks indexed.
+        chunks_reused: Number of indexed chunks whose stored vector was reused.
+        chunks_deduplicated: Number of chunks recorded as near-duplicates of
+            another document's chunk instead of being stored.
         status: Status message.
     """
 
     document_id: str = Field(..., description="Indexed document ID")
     chunks_indexed: int = Field(..., description="Number of chunks indexed", ge=0)
+    chunks_reused: int = Field(0, description="Number of unchanged chunks not re-embedded", ge=0)
+    chunks_deduplicated: int = Field(0, description="Number of near-duplicate chunks not stored", ge=0)
     status: str = Field(..., description="Indexing status message")
 
 
@@ -91,18 +114,90 @@ class IndexAllRequest(BaseModel):
     )
 
 
+class SkippedDocument(BaseModel):
+    """A document that was deliberately not indexed.
+
+    Attributes:
+        document_id: Unique identifier of the document.
+        name: File name of the document.
+        reason: Why the document was skipped.
+    """
+
+    document_id: str = Field(..., description="Skipped document ID")
+    name: str = Field(default="", description="File name")
+    reason: str = Field(..., description="Reason the document was skipped")
+
+
 class IndexAllResponse(BaseModel):
     """Response model for bulk indexing operation.
 
     Attributes:
         total_documents: Total number of documents processed.
         total_chunks: Total number of chunks indexed.
+        skipped_documents: Documents that were deliberately not indexed.
         site_id: SharePoint site identifier used for indexing.
         status: Status message.
     """
 
     total_documents: int = Field(..., description="Total number of documents indexed", ge=0)
     total_chunks: int = Field(..., description="Total number of chunks indexed", ge=0)
+    skipped_documents: List[SkippedDocument] = Field(
+        default_factory=list,
+        description="Documents skipped during indexing (e.g. too large)",
+    )
     site_id: str | None = Field(default=None, description="SharePoint site ID used for indexing")
     status: str = Field(..., description="Indexing status message")
 
+
+
+class SyncRequest(BaseModel):
+    """Request model for incremental synchronization of a SharePoint site.
+
+    Attributes:
+        site_id: Optional SharePoint site identifier. If not provided,
+            the default site from configuration is used.
+        full_resync: Ignore the saved delta link and enumerate every file.
+    """
+
+    site_id: str | None = Field(
+        default=None,
+        description="Optional SharePoint site ID (if omitted, uses backend configuration)",
+    )
+    full_resync: bool = Field(default=False, description="Ignore saved delta link")
+
+
+class SyncResponse(BaseModel):
+    """Response model for incremental synchronization.
+
+    Attributes:
+        documents_indexed: Number of changed documents re-indexed.
+        documents_skipped: Number of reported documents that were unchanged or skipped.
+        documents_deleted: Number of removed documents purged from the index.
+        documents_failed: Number of documents that failed to index.
+        total_chunks: Total number of chunks indexed.
+        site_id: SharePoint site identifier that was synced.
+        status: Status message.
+    """
+
+    documents_indexed: int = Field(..., description="Number of documents re-indexed", ge=0)
+    documents_skipped: int = Field(..., description="Number of unchanged or skipped documents", ge=0)
+    documents_deleted: int = Field(..., description="Number of documents removed", ge=0)
+    documents_failed: int = Field(..., description="Number of documents that failed", ge=0)
+    total_chunks: int = Field(..., description="Total number of chunks indexed", ge=0)
+    site_id: str | None = Field(default=None, description="SharePoint site ID that was synced")
+    status: str = Field(..., description="Sync status message")
+
+
+class DocumentInfoBatchRequest(BaseModel):
+    """Request model for looking up metadata of several documents at once.
+
+    Attributes:
+        document_ids: Unique identifiers of the documents.
+    """
+
+    document_ids: List[str] = Field(
+        ...,
+        description="Document IDs to look up",
+        min_length=1,
+        max_length=500,
+    )
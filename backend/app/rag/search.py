@@ -4,9 +4,10 @@ This module provides functions to search the vector database and generate
 answers based on retrieved documents.
 """
 
+import copy
 import sys
 from pathlib import Path
-from typing import List
+from typing import Any, Dict, List, Optional
 
 # Add backend directory to path for llm_utils import
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
@@ -14,7 +15,8 @@ sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 from app.config import get_settings
 from app.embeddings import embed_query
 from app.qdrant_client import get_qdrant_client
-from app.rag.schemas import SearchResponse, Source
+from app.query_cache import get_collection_generation, get_search_result_cache, normalize_query
+from app.rag.schemas import DuplicateSource, SearchResponse, Source
 
 try:
     from llm_utils import load_llm_model
@@ -24,12 +26,18 @@ except ImportError:
     LLM_AVAILABLE = False
 
 
-def search_spo_docs(query: str, top_k: int = 5) -> List[dict]:
+def search_spo_docs(query: str, top_k: int = 5, query_vector: Optional[List[float]] = None) -> List[dict]:
     """Search for relevant document chunks in Qdrant.
     
     Args:
         query: The search query string.
         top_k: Number of top results to return.
+        query_vector: Embedding of ``query`` if already computed (e.g. by
+            ``aembed_query``); otherwise it is embedded here.
+        
+    Note:
+        Hits of repeated queries are served from the query cache until the
+        collection is written to or the entry expires.
         
     Returns:
         List of dictionaries containing search results with scores and payloads.
@@ -48,9 +56,21 @@ def search_spo_docs(query: str, top_k: int = 5) -> List[dict]:
     settings = get_settings()
     client = get_qdrant_client()
     
+    cache = get_search_result_cache()
+    cache_key = (normalize_query(query), top_k)
+    # Read before searching: a write during the search makes the result stale
+    generation = get_collection_generation()
+    if cache is not None:
+        cached = cache.get(cache_key, generation)
+        if cached is not None:
+            print(f"[QueryCache] Serving cached hits for query: {query}")
+            # Hits are mutable dicts; callers must not alter the cached entry
+            return copy.deepcopy(cached)
+    
     # Generate embedding for the query
-    print(f"Embedding query: {query}")
-    query_vector = embed_query(query)
+    if query_vector is None:
+        print(f"Embedding query: {query}")
+        query_vector = embed_query(query)
     
     # Search in Qdrant
     print(f"Searching in collection: {settings.qdrant_collection_name}")
@@ -70,10 +90,37 @@ def search_spo_docs(query: str, top_k: int = 5) -> List[dict]:
             "payload": result.payload,
         })
     
+    if cache is not None:
+        cache.put(cache_key, copy.deepcopy(results), generation)
     return results
 
 
-def build_answer_with_sources(query: str, top_k: int = 5) -> SearchResponse:
+def _section_title(payload: Dict[str, Any]) -> str:
+    """Describe where a chunk sits in its document (e.g. "p. 12-13").
+    
+    Args:
+        payload: Qdrant payload of the chunk.
+        
+    Returns:
+        Page range for PDF chunks, sheet and row range for spreadsheet
+        chunks (e.g. "Budget (rows 2-51)"), otherwise an empty string.
+    """
+    sheet = payload.get("sheet")
+    if sheet is not None:
+        return f"{sheet} (rows {payload.get('row_start')}-{payload.get('row_end')})"
+    
+    page_start = payload.get("page_start")
+    if page_start is None:
+        return ""
+    page_end = payload.get("page_end", page_start)
+    return f"p. {page_start}" if page_end == page_start else f"p. {page_start}-{page_end}"
+
+
+def build_answer_with_sources(
+    query: str,
+    top_k: int = 5,
+    query_vector: Optional[List[float]] = None,
+) -> SearchResponse:
     """Build an answer with source citations based on search results.
     
     This function:
@@ -84,6 +131,7 @@ def build_answer_with_sources(query: str, top_k: int = 5) -> SearchResponse:
     Args:
         query: The search query string.
         top_k: Number of top results to retrieve.
+        query_vector: Embedding of ``query`` if already computed.
         
     Returns:
         SearchResponse containing the answer and source citations.
@@ -96,7 +144,7 @@ def build_answer_with_sources(query: str, top_k: int = 5) -> SearchResponse:
         - Consider streaming responses for better UX
     """
     # Step 1: Search for relevant chunks
-    search_results = search_spo_docs(query, top_k)
+    search_results = search_spo_docs(query, top_k, query_vector=query_vector)
     
     # Step 2: Extract sources from search results
     sources: List[Source] = []
@@ -109,11 +157,19 @@ def build_answer_with_sources(query: str, top_k: int = 5) -> SearchResponse:
         document_id = payload.get("document_id", "")
         source = Source(
             file_title=payload.get("document_name", "Unknown"),
-            section_title="",  # Could be enhanced with section detection
+            section_title=_section_title(payload),
             chunk_index=payload.get("chunk_index", 0),
             download_url=payload.get("sharepoint", {}).get("web_url", ""),
             document_id=document_id,
             score=result["score"],
+            duplicates=[
+                DuplicateSource(
+                    file_title=entry.get("document_name", "Unknown"),
+                    download_url=entry.get("sharepoint", {}).get("web_url", ""),
+                    document_id=entry.get("document_id", ""),
+                )
+                for entry in payload.get("duplicate_sources") or []
+            ],
         )
         sources.append(source)
         
@@ -0,0 +1,81 @@
+"""Persistent state for incremental SharePoint synchronization.
+
+This module stores the Graph ``@odata.deltaLink`` of each site in a small JSON
+file so that the next sync only has to process the changes since the last run.
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+from app.config import get_settings
+
+
+_state_lock = threading.Lock()
+
+
+def _state_path() -> Path:
+    return Path(get_settings().sync_state_path)
+
+
+def _read_state(path: Path) -> Dict[str, Dict[str, str]]:
+    if not path.exists():
+        return {}
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"[WARN] Could not read sync state {path}: {e}")
+        return {}
+
+
+def _write_state(path: Path, state: Dict[str, Dict[str, str]]) -> None:
+    """Write the state file atomically so an interrupted write never corrupts it."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def load_delta_link(site_id: str) -> Optional[str]:
+    """Load the saved delta link for a site.
+
+    Args:
+        site_id: SharePoint site identifier.
+
+    Returns:
+        The saved delta link, or None if the site has never been synced.
+    """
+    with _state_lock:
+        state = _read_state(_state_path())
+    return state.get(site_id, {}).get("delta_link") or None
+
+
+def save_delta_link(site_id: str, delta_link: str) -> None:
+    """Save the delta link for a site.
+
+    Args:
+        site_id: SharePoint site identifier.
+        delta_link: ``@odata.deltaLink`` returned by the last delta query.
+    """
+    path = _state_path()
+    with _state_lock:
+        state = _read_state(path)
+        state[site_id] = {"delta_link": delta_link}
+        _write_state(path, state)
+
+
+def clear_delta_link(site_id: str) -> None:
+    """Forget the delta link for a site so the next sync starts from scratch.
+
+    Args:
+        site_id: SharePoint site identifier.
+    """
+    path = _state_path()
+    with _state_lock:
+        state = _read_state(path)
+        if state.pop(site_id, None) is not None:
+            _write_state(path, state)
@@ -0,0 +1,92 @@
+"""Tokenizer matching the embedding model, for token-based chunking.
+
+Chunk sizes measured in characters translate very differently into tokens
+for Korean and English text. This module exposes the tiktoken encoding of
+the configured embedding model so chunks can be sized (and counted) in the
+same tokens the embedding API and the LLM context budget are measured in.
+
+tiktoken downloads its BPE files on first use; set ``TIKTOKEN_CACHE_DIR`` to
+a pre-populated directory on hosts without internet access.
+"""
+
+import threading
+from typing import Dict, List, Optional
+
+import tiktoken
+
+from app.config import get_settings
+
+
+# Encoding used when the embedding model is unknown to tiktoken
+DEFAULT_ENCODING = "cl100k_base"
+
+_encodings: Dict[str, tiktoken.Encoding] = {}
+_encodings_lock = threading.Lock()
+
+
+def _encoding_name(embedding_model: str) -> str:
+    """Resolve the tiktoken encoding name for an embedding model name."""
+    # Gateway model names carry a provider prefix, e.g. "azure.text-embedding-3-large"
+    model = embedding_model.split(".", 1)[-1]
+    try:
+        return tiktoken.encoding_name_for_model(model)
+    except KeyError:
+        return DEFAULT_ENCODING
+
+
+def get_tokenizer(encoding_name: Optional[str] = None) -> tiktoken.Encoding:
+    """Get the (cached) tiktoken encoding used for chunking.
+
+    Args:
+        encoding_name: Explicit encoding name. If None, ``TOKENIZER_ENCODING``
+            is used, or the encoding of ``EMBEDDING_MODEL`` if that is empty.
+
+    Returns:
+        tiktoken.Encoding instance.
+    """
+    if encoding_name is None:
+        settings = get_settings()
+        encoding_name = settings.tokenizer_encoding or _encoding_name(settings.embedding_model)
+
+    with _encodings_lock:
+        encoding = _encodings.get(encoding_name)
+        if encoding is None:
+            print(f"[Tokenizer] Loading tiktoken encoding {encoding_name}")
+            encoding = tiktoken.get_encoding(encoding_name)
+            _encodings[encoding_name] = encoding
+        return encoding
+
+
+def count_tokens(texts: List[str], encoding: Optional[tiktoken.Encoding] = None) -> List[int]:
+    """Count the tokens of several texts with one batched encode call.
+
+    Args:
+        texts: Texts to count.
+        encoding: Encoding to use; defaults to ``get_tokenizer()``.
+
+    Returns:
+        Token count of each text, in order.
+    """
+    encoding = encoding or get_tokenizer()
+    return [len(tokens) for tokens in encoding.encode_ordinary_batch(texts)]
+
+
+def token_offsets(texts: List[str], encoding: Optional[tiktoken.Encoding] = None) -> List[List[int]]:
+    """Tokenize several texts and return the character offset of every token.
+
+    A token that starts in the middle of a multi-byte character (common
+    for Hangul) is assigned the offset of that character, so cutting a text
+    at these offsets never splits a character.
+
+    Args:
+        texts: Texts to tokenize.
+        encoding: Encoding to use; defaults to ``get_tokenizer()``.
+
+    Returns:
+        For each text, the list of token start offsets (one per token).
+    """
+    encoding = encoding or get_tokenizer()
+    return [
+        encoding.decode_with_offsets(tokens)[1]
+        for tokens in encoding.encode_ordinary_batch(texts)
+    ]
@@ -3,26 +3,48 @@
 This module defines the FastAPI routes for RAG operations.
 """
 
-from typing import Dict
+from typing import Dict, Optional
 from urllib.parse import quote
 
-from fastapi import APIRouter, HTTPException, status
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
 import io
 
-from app.rag.indexer import index_sharepoint_document, index_all_sharepoint_documents
+from app.rag.indexer import (
+    index_all_sharepoint_documents,
+    index_sharepoint_document,
+    sync_sharepoint_documents,
+)
 from app.rag.schemas import (
+    DocumentInfoBatchRequest,
     IndexRequest,
     IndexResponse,
     SearchRequest,
     SearchResponse,
     IndexAllRequest,
     IndexAllResponse,
+    SyncRequest,
+    SyncResponse,
 )
 from app.rag.search import build_answer_with_sources
-from app.sharepoint_client import get_document_metadata, get_access_token
+from app.sharepoint_client import (
+    get_access_token,
+    get_document_metadata,
+    get_documents_metadata,
+)
 from app.config import get_settings
-import requests
+from app.graph_throttle import get_throttle_stats
+from app.metadata_cache import get_metadata_cache
+from app.http_client import get_async_http_client
+from app.blob_cache import get_blob_cache
+from app.extraction import get_extraction_cache, get_extraction_service
+from app.embedding_batcher import get_embedding_batcher_stats
+from app.embedding_cache import get_embedding_cache
+from app.embeddings import aembed_query
+from app.query_cache import get_query_cache_stats
+from app.query_coalescer import get_query_coalescer_stats
 
 router = APIRouter(prefix="/api/rag", tags=["RAG"])
 
@@ -39,11 +61,19 @@ async def search_documents(request: SearchRequest) -> SearchResponse:
         
     Raises:
         HTTPException: If search fails.
+        
+    Note:
+        The query embedding is awaited on the event loop so concurrent
+        searches can share embedding requests; the Qdrant search and LLM
+        call run in the threadpool.
     """
     try:
-        response = build_answer_with_sources(
+        query_vector = await aembed_query(request.query)
+        response = await run_in_threadpool(
+            build_answer_with_sources,
             query=request.query,
             top_k=request.top_k,
+            query_vector=query_vector,
         )
         return response
     except Exception as e:
@@ -72,7 +102,9 @@ async def index_document(request: IndexRequest) -> IndexResponse:
         return IndexResponse(
             document_id=result["document_id"],
             chunks_indexed=result["chunks_indexed"],
-            status="success",
+            chunks_reused=result.get("chunks_reused", 0),
+            chunks_deduplicated=result.get("chunks_deduplicated", 0),
+            status=f"skipped: {result['skipped_reason']}" if "skipped_reason" in result else "success",
         )
     except Exception as e:
         raise HTTPException(
@@ -91,6 +123,47 @@ async def health_check() -> Dict[str, str]:
     return {"status": "healthy", "service": "rag"}
 
 
+@router.get("/metrics")
+async def get_metrics() -> Dict[str, Dict]:
+    """Report runtime metrics used to tune the backend.
+    
+    Returns:
+        Dictionary with:
+        - 'graph_throttle': Current concurrency limit, in-flight requests and
+          throttle counts per tenant
+        - 'metadata_cache': Document metadata cache size and hit rate
+        - 'download_cache': Download proxy file cache size and hit rate
+          (empty if disabled)
+        - 'extraction': Extraction worker pool timeouts, crashes and restarts
+        - 'extraction_cache': Extracted-text cache size and hit rate
+          (empty if disabled)
+        - 'embedding_cache': Embedding vector cache size and hit rate
+          (empty if disabled)
+        - 'embedding_batcher': Embedding requests sent, retried and failed,
+          and texts per request (empty before the first embedding)
+        - 'query_embedding': Search queries embedded, shared with an
+          identical in-flight query, and batches sent (empty before the
+          first search)
+        - 'query_cache': Size and hit rate of the query embedding and search
+          hit caches, and the collection generation (empty before the first
+          search or if disabled)
+    """
+    blob_cache = get_blob_cache()
+    extraction_cache = get_extraction_cache()
+    embedding_cache = get_embedding_cache()
+    return {
+        "graph_throttle": get_throttle_stats(),
+        "metadata_cache": get_metadata_cache().stats(),
+        "download_cache": blob_cache.stats() if blob_cache is not None else {},
+        "extraction": get_extraction_service().stats(),
+        "extraction_cache": extraction_cache.stats() if extraction_cache is not None else {},
+        "embedding_cache": embedding_cache.stats() if embedding_cache is not None else {},
+        "embedding_batcher": get_embedding_batcher_stats(),
+        "query_embedding": get_query_coalescer_stats(),
+        "query_cache": get_query_cache_stats(),
+    }
+
+
 @router.post("/index-all", response_model=IndexAllResponse)
 async def index_all_documents(request: IndexAllRequest) -> IndexAllResponse:
     """Index all SharePoint documents into the vector database.
@@ -131,6 +204,7 @@ async def index_all_documents(request: IndexAllRequest) -> IndexAllResponse:
         return IndexAllResponse(
             total_documents=result["total_documents"],
             total_chunks=result["total_chunks"],
+            skipped_documents=result["skipped_documents"],
             site_id=effective_site_id,
             status="success",
         )
@@ -141,15 +215,96 @@ async def index_all_documents(request: IndexAllRequest) -> IndexAllResponse:
         )
 
 
+@router.post("/sync", response_model=SyncResponse)
+async def sync_documents(request: SyncRequest) -> SyncResponse:
+    """Incrementally synchronize a SharePoint site with the vector database.
+
+    Only files created or modified since the last sync of the site are
+    re-indexed, and chunks of deleted files are removed. The first sync
+    of a site (or ``full_resync=True``) enumerates every file.
+
+    Args:
+        request: SyncRequest containing an optional site ID.
+
+    Returns:
+        SyncResponse with sync statistics.
+
+    Raises:
+        HTTPException: If the sync fails.
+    """
+    from app.qdrant_client import ensure_collection_exists
+
+    settings = get_settings()
+
+    try:
+        # Paging, downloads and embedding block for minutes to hours, so the
+        # sync runs in the threadpool and searches keep being served
+        await run_in_threadpool(ensure_collection_exists)
+
+        effective_site_id = request.site_id or settings.sharepoint_site_id
+        result = await run_in_threadpool(
+            sync_sharepoint_documents,
+            site_id=effective_site_id,
+            full_resync=request.full_resync,
+        )
+
+        return SyncResponse(
+            **result,
+            site_id=effective_site_id,
+            status="success" if result["documents_failed"] == 0 else "partial",
+        )
+    except Exception as e:  # pragma: no cover - defensive
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Sync failed: {str(e)}",
+        )
+
+
+def _content_disposition(file_name: str) -> str:
+    """Build an attachment Content-Disposition header for ``file_name``."""
+    # UTF-8 인코딩된 파일명 (RFC 5987)
+    # 한글 파일명 지원을 위해 URL 인코딩
+    encoded_filename = quote(file_name, safe='')
+    return f"attachment; filename*=UTF-8''{encoded_filename}"
+
+
+def _etag_from_ctag(ctag: str) -> str:
+    """Turn a SharePoint cTag into a strong HTTP ETag."""
+    return ctag if ctag.startswith('"') else f'"{ctag}"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header value matches ``etag`` (weak comparison)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+# Upstream response headers passed through to the client
+_PROXIED_HEADERS = ("content-length", "content-range", "last-modified")
+
+
 @router.get("/download/{document_id}")
-async def download_document(document_id: str):
+async def download_document(document_id: str, request: Request):
     """Download a SharePoint document.
     
+    The file is streamed from SharePoint to the client as it arrives, so
+    memory use does not grow with the file size and the event loop is never
+    blocked. ``Range`` requests are forwarded upstream (206 responses are
+    passed through), and ``If-None-Match`` against the item's cTag-based
+    ETag answers 304 without contacting SharePoint for the content. Files
+    requested repeatedly are kept in an on-disk cache keyed by cTag and
+    served from there.
+    
     Args:
         document_id: The unique identifier of the document to download.
+        request: Incoming request (for Range and If-None-Match headers).
         
     Returns:
-        StreamingResponse: The file content as a streaming response.
+        StreamingResponse or FileResponse with the file content.
         
     Raises:
         HTTPException: If download fails.
@@ -165,51 +320,112 @@ async def download_document(document_id: str):
             demo_content = f"[데모 모드]\n\n이것은 '{document_id}' 문서의 데모 다운로드입니다.\n\n실제 다운로드를 위해서는:\n1. DEMO_MODE=False\n2. SharePoint 연동 필요"
             demo_filename = f"demo_{document_id}.txt"
             
-            # UTF-8 인코딩된 파일명 (RFC 5987)
-            encoded_filename = quote(demo_filename, safe='')
-            
             return StreamingResponse(
                 io.BytesIO(demo_content.encode('utf-8')),
                 media_type="text/plain; charset=utf-8",
-                headers={
-                    "Content-Disposition": f"attachment; filename*=UTF-8''{encoded_filename}"
-                }
+                headers={"Content-Disposition": _content_disposition(demo_filename)},
             )
         
-        # Get document metadata
-        metadata = get_document_metadata(document_id)
-        download_url = metadata.get("download_url")
-        file_name = metadata.get("name", f"{document_id}.bin")
+        # Get document metadata (blocking Graph call, keep it off the event loop)
+        metadata = await run_in_threadpool(get_document_metadata, document_id)
+        file_name = metadata.get("name") or f"{document_id}.bin"
+        ctag = metadata.get("ctag") or ""
+        etag = _etag_from_ctag(ctag) if ctag else None
         
-        if not download_url:
+        if not metadata.get("download_url"):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Download URL not found for document {document_id}"
             )
         
-        # Download file from SharePoint
-        print(f"[Download] Downloading {file_name} from SharePoint...")
-        response = requests.get(download_url, stream=True)
-        response.raise_for_status()
+        if etag and _etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+        
+        headers = {
+            "Content-Disposition": _content_disposition(file_name),
+            "Accept-Ranges": "bytes",
+        }
+        if etag:
+            headers["ETag"] = etag
+        
+        # Serve popular files from the local cache (FileResponse handles Range itself)
+        blob_cache = get_blob_cache() if ctag else None
+        if blob_cache is not None:
+            cached_path = blob_cache.get(ctag)
+            if cached_path:
+                print(f"[Download] Serving {file_name} from cache")
+                return FileResponse(
+                    cached_path,
+                    media_type=metadata.get("mime_type") or "application/octet-stream",
+                    headers=headers,
+                )
+        
+        # Stream the file from SharePoint
+        print(f"[Download] Streaming {file_name} from SharePoint...")
+        range_header = request.headers.get("range")
+        upstream_headers = {"Range": range_header} if range_header else {}
+        client = get_async_http_client()
+        
+        upstream = await client.send(
+            client.build_request("GET", metadata["download_url"], headers=upstream_headers),
+            stream=True,
+        )
+        if upstream.status_code in (401, 403):
+            # The pre-signed download URL has expired; fetch a fresh one once
+            await upstream.aclose()
+            metadata = await run_in_threadpool(get_document_metadata, document_id, None, True)
+            upstream = await client.send(
+                client.build_request("GET", metadata["download_url"], headers=upstream_headers),
+                stream=True,
+            )
+        
+        if upstream.status_code == 416:
+            await upstream.aclose()
+            raise HTTPException(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                detail="Requested range not satisfiable",
+            )
+        if upstream.status_code not in (200, 206):
+            await upstream.aclose()
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail=f"SharePoint download failed with status {upstream.status_code}",
+            )
+        
+        for name in _PROXIED_HEADERS:
+            if name in upstream.headers:
+                headers[name] = upstream.headers[name]
+        if "content-encoding" in upstream.headers:
+            # Bytes are decoded while streaming, so the upstream length no longer applies
+            headers.pop("content-length", None)
+        
+        # Tee complete (non-range) downloads of popular files into the cache
+        writer = None
+        if blob_cache is not None and upstream.status_code == 200:
+            content_length = headers.get("content-length")
+            writer = blob_cache.writer(ctag, int(content_length) if content_length else None)
         
-        # Determine content type
-        content_type = response.headers.get('content-type', 'application/octet-stream')
+        chunk_size = settings.download_chunk_size_kb * 1024
         
-        # UTF-8 인코딩된 파일명 (RFC 5987)
-        # 한글 파일명 지원을 위해 URL 인코딩
-        encoded_filename = quote(file_name, safe='')
+        async def body():
+            try:
+                async for chunk in upstream.aiter_bytes(chunk_size):
+                    if writer is not None:
+                        writer.write(chunk)
+                    yield chunk
+                if writer is not None:
+                    writer.commit()
+            finally:
+                if writer is not None:
+                    writer.abort()
+                await upstream.aclose()
         
-        # Return as streaming response
         return StreamingResponse(
-            io.BytesIO(response.content),
-            media_type=content_type,
-            headers={
-                # RFC 5987: UTF-8 파일명 인코딩
-                # filename*=UTF-8''encoded_filename 형식
-                "Content-Disposition": f"attachment; filename*=UTF-8''{encoded_filename}",
-                # 레거시 브라우저를 위한 ASCII 파일명 (선택적)
-                # "Content-Disposition": f"attachment; filename=\"{file_name}\"; filename*=UTF-8''{encoded_filename}"
-            }
+            body(),
+            status_code=upstream.status_code,
+            media_type=upstream.headers.get("content-type", "application/octet-stream"),
+            headers=headers,
+            background=BackgroundTask(upstream.aclose),
         )
         
     except HTTPException:
@@ -253,8 +469,8 @@ async def get_document_info(document_id: str) -> Dict:
                 "mode": "demo"
             }
         
-        # Get real metadata
-        metadata = get_document_metadata(document_id)
+        # Get real metadata (cache revalidation may call Graph with retries)
+        metadata = await run_in_threadpool(get_document_metadata, document_id)
         
         # Add internal download endpoint
         metadata["internal_download_url"] = f"/api/rag/download/{document_id}"
@@ -267,3 +483,37 @@ async def get_document_info(document_id: str) -> Dict:
             detail=f"Failed to get document info: {str(e)}"
         )
 
+
+
+@router.post("/documents/info")
+async def get_documents_info(request: DocumentInfoBatchRequest) -> Dict[str, Dict]:
+    """Get metadata information for several SharePoint documents at once.
+    
+    Lookups are sent to Microsoft Graph as JSON batches of up to 20 items,
+    so a page of search results costs one or two round trips instead of one
+    per source card.
+    
+    Args:
+        request: DocumentInfoBatchRequest containing the document IDs.
+        
+    Returns:
+        Dictionary mapping document ID to its metadata. Documents that could
+        not be retrieved are omitted.
+        
+    Raises:
+        HTTPException: If retrieval fails.
+    """
+    try:
+        # Graph $batch with retry back-off blocks; keep it off the event loop
+        results = await run_in_threadpool(get_documents_metadata, request.document_ids)
+        
+        for document_id, metadata in results.items():
+            metadata["internal_download_url"] = f"/api/rag/download/{document_id}"
+        
+        return results
+        
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get document info: {str(e)}"
+        )
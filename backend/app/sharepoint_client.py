@@ -3,13 +3,45 @@
 This module provides functions to interact with SharePoint Online via Microsoft Graph API.
 """
 
-from typing import Any, Dict, List, Optional
+import hashlib
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
-import io
-
-import requests
+import httpx
 
 from app.config import get_settings
+from app.download_spool import DownloadSpool
+from app.extraction import (
+    STREAMABLE_FORMATS,
+    ExtractionError,
+    ExtractionTruncated,
+    TextBlock,
+    UnsupportedFormat,
+    get_extraction_cache,
+    get_extraction_service,
+    get_extractor,
+    sniff_format,
+)
+from app.graph_auth import get_credential_manager
+from app.graph_throttle import RETRYABLE_STATUS_CODES, THROTTLE_STATUS_CODES, get_graph_limiter
+from app.http_client import get_http_client
+from app.metadata_cache import get_metadata_cache
+
+
+class DocumentSkipped(Exception):
+    """Raised when a document is deliberately not processed (e.g. it is too large).
+    
+    Attributes:
+        document_id: Unique identifier of the skipped document.
+        reason: Human-readable reason recorded in indexing results.
+    """
+
+    def __init__(self, document_id: str, reason: str) -> None:
+        super().__init__(f"Skipped document {document_id}: {reason}")
+        self.document_id = document_id
+        self.reason = reason
 
 
 def get_access_token() -> str:
@@ -23,7 +55,8 @@ def get_access_token() -> str:
         
     Note:
         Uses OAuth2 client credentials flow for app-only authentication.
-        Token should be cached for better performance (TODO: implement caching).
+        Tokens are cached process-wide by ``GraphCredentialManager`` and
+        refreshed in the background shortly before they expire.
     """
     settings = get_settings()
     
@@ -32,46 +65,219 @@ def get_access_token() -> str:
         print("[DEMO MODE] Using dummy access token")
         return "dummy_access_token"
     
-    # Real implementation: OAuth2 client credentials flow
-    token_url = f"https://login.microsoftonline.com/{settings.tenant_id}/oauth2/v2.0/token"
+    return get_credential_manager().get_token()
+
+
+def _retry_after_seconds(headers: Any, attempt: int) -> float:
+    """Delay before retrying a throttled request: ``Retry-After`` or exponential backoff."""
+    for key, value in (headers or {}).items():
+        if key.lower() == "retry-after":
+            try:
+                return max(0.0, float(value))
+            except (TypeError, ValueError):
+                break
+    return min(2.0 ** attempt, 30.0)
+
+
+def _graph_request(
+    method: str,
+    url: str,
+    authenticated: bool = True,
+    headers: Optional[Dict[str, str]] = None,
+    stream: bool = False,
+    **kwargs: Any,
+) -> httpx.Response:
+    """Send a Graph (or SharePoint download) request through the tenant's throttle limiter.
     
-    data = {
-        "client_id": settings.client_id,
-        "scope": "https://graph.microsoft.com/.default",
-        "client_secret": settings.client_secret,
-        "grant_type": "client_credentials",
-    }
+    The request waits for a slot in the adaptive concurrency limiter, is
+    retried on 429/5xx honoring ``Retry-After``, and is retried once with a
+    fresh token on 401. The final response is returned without raising, so
+    callers keep their own ``raise_for_status`` handling.
     
+    Args:
+        method: HTTP method.
+        url: Absolute request URL.
+        authenticated: Add a Graph bearer token. Pre-signed download URLs
+            must be fetched without one.
+        headers: Extra request headers.
+        stream: Return as soon as the headers arrive without reading the
+            body. The caller must close the response.
+        **kwargs: Passed through to ``httpx.Client.build_request``.
+        
+    Returns:
+        httpx.Response: The last response received.
+    """
+    settings = get_settings()
+    limiter = get_graph_limiter()
+    client = get_http_client()
+    attempt = 0
+    token_refreshed = False
+    
+    while True:
+        request_headers = dict(headers or {})
+        token = None
+        if authenticated:
+            token = get_access_token()
+            request_headers["Authorization"] = f"Bearer {token}"
+        
+        with limiter.slot() as slot:
+            request = client.build_request(method, url, headers=request_headers, **kwargs)
+            response = client.send(request, stream=stream)
+            if response.status_code in THROTTLE_STATUS_CODES:
+                slot.throttled(_retry_after_seconds(response.headers, attempt))
+            elif response.status_code < 500:
+                slot.succeeded()
+        
+        retry = (
+            (response.status_code in RETRYABLE_STATUS_CODES and attempt < settings.graph_max_retries)
+            or (response.status_code == 401 and authenticated and not token_refreshed)
+        )
+        if retry and stream:
+            response.close()
+        
+        if response.status_code in RETRYABLE_STATUS_CODES and attempt < settings.graph_max_retries:
+            delay = _retry_after_seconds(response.headers, attempt)
+            attempt += 1
+            print(f"[Graph API] {response.status_code} from {method} {url.split('?')[0]}, retry {attempt} in {delay:.1f}s")
+            # Throttle responses already paused the limiter for ``delay``
+            if response.status_code not in THROTTLE_STATUS_CODES:
+                time.sleep(delay)
+            continue
+        
+        if response.status_code == 401 and authenticated and not token_refreshed:
+            get_credential_manager().invalidate(token)
+            token_refreshed = True
+            continue
+        
+        return response
+
+
+def _get_drive_id(site_id: str) -> str:
+    """Look up the default document library (drive) ID of a site."""
+    drive_url = f"https://graph.microsoft.com/v1.0/sites/{site_id}/drive"
+    drive_response = _graph_request("GET", drive_url, headers={"Accept": "application/json"})
+    drive_response.raise_for_status()
+    return drive_response.json()["id"]
+
+
+def _metadata_from_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a Graph driveItem into the normalized document metadata dict."""
+    return {
+        "id": item["id"],
+        "name": item["name"],
+        "web_url": item.get("webUrl", ""),
+        "download_url": item.get("@microsoft.graph.downloadUrl", ""),
+        "modified_date": item.get("lastModifiedDateTime", ""),
+        "author": item.get("createdBy", {}).get("user", {}).get("displayName", "Unknown"),
+        "size": item.get("size", 0),
+        "ctag": item.get("cTag", ""),
+        "etag": item.get("eTag", ""),
+        "mime_type": item.get("file", {}).get("mimeType", ""),
+    }
+
+
+# driveItem fields needed by the indexer; keeps enumeration pages small
+_DRIVE_ITEM_SELECT = ",".join([
+    "id",
+    "name",
+    "webUrl",
+    "size",
+    "file",
+    "folder",
+    "cTag",
+    "eTag",
+    "lastModifiedDateTime",
+    "createdBy",
+    "@microsoft.graph.downloadUrl",
+])
+
+# Maximum page size accepted by the driveItem children endpoint
+_DRIVE_PAGE_SIZE = 999
+
+
+def _parse_graph_datetime(value: str) -> Optional[datetime]:
+    """Parse an ISO 8601 timestamp as returned by Graph (e.g. ``2025-01-15T09:30:00Z``)."""
+    if not value:
+        return None
     try:
-        response = requests.post(token_url, data=data)
-        response.raise_for_status()
-        token = response.json()["access_token"]
-        print("[Graph API] Access token obtained successfully")
-        return token
-    except requests.exceptions.RequestException as e:
-        print(f"[ERROR] Failed to get access token: {e}")
-        if hasattr(e, 'response') and e.response is not None:
-            print(f"[ERROR] Response: {e.response.text}")
-        raise Exception(f"Authentication failed: {e}")
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
 
 
-def list_sharepoint_documents(site_id: Optional[str] = None) -> List[Dict[str, Any]]:
-    """List all documents from a SharePoint site.
+def _resolve_document_filters(
+    extensions: Optional[Iterable[str]],
+    max_size_bytes: Optional[int],
+) -> Tuple[Optional[Tuple[str, ...]], Optional[int]]:
+    """Fill in document filters from settings when not given explicitly."""
+    settings = get_settings()
+    
+    if extensions is None and settings.index_file_extensions:
+        extensions = settings.index_file_extensions.split(",")
+    if extensions is not None:
+        extensions = tuple(
+            ext.strip().lower() if ext.strip().startswith(".") else f".{ext.strip().lower()}"
+            for ext in extensions
+            if ext.strip()
+        ) or None
+    
+    if max_size_bytes is None and settings.index_max_file_size_mb > 0:
+        max_size_bytes = int(settings.index_max_file_size_mb * 1024 * 1024)
+    
+    return extensions, max_size_bytes
+
+
+def _matches_document_filters(
+    item: Dict[str, Any],
+    extensions: Optional[Tuple[str, ...]],
+    max_size_bytes: Optional[int],
+    modified_since: Optional[datetime],
+) -> bool:
+    """Check a file driveItem against the extension, size and date filters."""
+    if extensions and not item.get("name", "").lower().endswith(extensions):
+        return False
+    if max_size_bytes and item.get("size", 0) > max_size_bytes:
+        return False
+    if modified_since is not None:
+        modified = _parse_graph_datetime(item.get("lastModifiedDateTime", ""))
+        if modified is not None and modified < modified_since:
+            return False
+    return True
+
+
+def iter_sharepoint_documents(
+    site_id: Optional[str] = None,
+    extensions: Optional[Iterable[str]] = None,
+    max_size_bytes: Optional[int] = None,
+    modified_since: Optional[datetime] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Yield every document of a SharePoint site's document library.
+    
+    Folders are walked recursively and ``@odata.nextLink`` paging is
+    followed, so documents are yielded while the crawl is still running
+    and callers can start processing the first file immediately.
     
     Args:
         site_id: SharePoint site identifier. If None, uses default from settings.
+        extensions: File extensions to include (e.g. ``[".pdf", ".docx"]``).
+            If None, uses ``INDEX_FILE_EXTENSIONS``; empty means all files.
+        max_size_bytes: Skip files larger than this. If None, uses
+            ``INDEX_MAX_FILE_SIZE_MB``; 0 means no limit.
+        modified_since: Skip files last modified before this time
+            (timezone-aware datetime).
         
-    Returns:
-        List of document metadata dictionaries containing file information.
+    Yields:
+        Document metadata dictionaries containing file information.
         
-    TODO:
-        - Implement Microsoft Graph API call to list documents
-        - Handle pagination for large document libraries
-        - Add filtering options (by date, file type, etc.)
-        - Include document metadata (title, author, modified date, etc.)
+    Raises:
+        Exception: If a Graph API request fails.
+        
+    Note:
+        The driveItem children endpoint of SharePoint libraries does not
+        support ``$filter``, so only field selection and page size are
+        applied on the server; the filters above are evaluated per page.
     """
     settings = get_settings()
-    token = get_access_token()
     
     if site_id is None:
         site_id = settings.sharepoint_site_id
@@ -79,188 +285,184 @@ def list_sharepoint_documents(site_id: Optional[str] = None) -> List[Dict[str, A
     # Demo mode: return rich dummy data
     if settings.demo_mode:
         print("[DEMO MODE] Returning sample documents")
-        return [
-
-        ]
+        return
+    
+    extensions, max_size_bytes = _resolve_document_filters(extensions, max_size_bytes)
     
     # Real implementation: Graph API call to list documents
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Accept": "application/json",
-    }
+    headers = {"Accept": "application/json"}
     
     try:
         # Get the default document library (drive) for the site
-        drive_url = f"https://graph.microsoft.com/v1.0/sites/{site_id}/drive"
-        drive_response = requests.get(drive_url, headers=headers)
-        drive_response.raise_for_status()
-        drive_id = drive_response.json()["id"]
+        drive_id = _get_drive_id(site_id)
         
         print(f"[Graph API] Found drive: {drive_id}")
         
-        # List all items in the root of the document library
-        items_url = f"https://graph.microsoft.com/v1.0/drives/{drive_id}/root/children"
-        items_response = requests.get(items_url, headers=headers)
-        items_response.raise_for_status()
-        
-        items = items_response.json().get("value", [])
-        
-        # Filter only files (not folders)
-        documents = []
-        for item in items:
-            if "file" in item:  # It's a file, not a folder
-                documents.append({
-                    "id": item["id"],
-                    "name": item["name"],
-                    "web_url": item.get("webUrl", ""),
-                    "size": item.get("size", 0),
-                    "download_url": item.get("@microsoft.graph.downloadUrl", ""),
-                })
-        
-        print(f"[Graph API] Found {len(documents)} documents")
-        return documents
-        
-    except requests.exceptions.RequestException as e:
+        params = {"$select": _DRIVE_ITEM_SELECT, "$top": str(_DRIVE_PAGE_SIZE)}
+        pending_folders = [f"https://graph.microsoft.com/v1.0/drives/{drive_id}/root/children"]
+        folders_visited = 0
+        documents_found = 0
+        
+        while pending_folders:
+            url: Optional[str] = pending_folders.pop()
+            folders_visited += 1
+            page_params: Optional[Dict[str, str]] = params
+            
+            while url:
+                items_response = _graph_request("GET", url, headers=headers, params=page_params)
+                items_response.raise_for_status()
+                page = items_response.json()
+                
+                for item in page.get("value", []):
+                    if "folder" in item:
+                        pending_folders.append(
+                            f"https://graph.microsoft.com/v1.0/drives/{drive_id}/items/{item['id']}/children"
+                        )
+                    elif "file" in item and _matches_document_filters(
+                        item, extensions, max_size_bytes, modified_since
+                    ):
+                        documents_found += 1
+                        yield _metadata_from_item(item)
+                
+                # nextLink already carries the query parameters
+                url = page.get("@odata.nextLink")
+                page_params = None
+        
+        print(f"[Graph API] Found {documents_found} documents in {folders_visited} folders")
+        
+    except httpx.HTTPError as e:
         print(f"[ERROR] Failed to list documents: {e}")
-        if hasattr(e, 'response') and e.response is not None:
+        if isinstance(e, httpx.HTTPStatusError):
             print(f"[ERROR] Response: {e.response.text}")
         raise Exception(f"Failed to list SharePoint documents: {e}")
 
 
-def _extract_text_from_file(
-    file_bytes: bytes,
-    file_name: str,
-    content_type: Optional[str] = None,
-) -> str:
-    """Extract text content from a file.
-
-    This helper function supports multiple file formats:
-
-    - Plain text files (e.g., .txt)
-    - Microsoft Word documents (.docx)
-    - PDF documents (.pdf, text-based)
-    - Excel workbooks (.xlsx, .xlsm, .xltx, .xltm)
-
+def list_sharepoint_documents(site_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """List all documents from a SharePoint site.
+    
     Args:
-        file_bytes: Raw file content as bytes.
-        file_name: Name of the file (used to infer extension).
-        content_type: MIME type of the file, if available.
-
+        site_id: SharePoint site identifier. If None, uses default from settings.
+        
     Returns:
-        Extracted text content as a string.
+        List of document metadata dictionaries containing file information.
+        Use ``iter_sharepoint_documents`` to process large libraries as they
+        are crawled.
     """
-    # Normalize helpers
-    lower_name = file_name.lower()
-    content_type = (content_type or "").lower()
+    return list(iter_sharepoint_documents(site_id=site_id))
 
-    # PDF files
-    if lower_name.endswith(".pdf") or "pdf" in content_type:
-        try:
-            from PyPDF2 import PdfReader
-
-            pdf_reader = PdfReader(io.BytesIO(file_bytes))
-            texts: List[str] = []
-            for page in pdf_reader.pages:
-                page_text = page.extract_text() or ""
-                if page_text.strip():
-                    texts.append(page_text)
-            return "\n\n".join(texts).strip()
-        except ImportError as exc:
-            raise ImportError(
-                "PyPDF2 is required for PDF text extraction. "
-                "Install it with 'pip install PyPDF2'."
-            ) from exc
-        except Exception as exc:  # pragma: no cover - fallback path
-            print(f"[WARN] PDF text extraction failed, falling back to raw text: {exc}")
-
-    # Word documents (.docx)
-    if lower_name.endswith(".docx") or "wordprocessingml.document" in content_type:
-        try:
-            from docx import Document
-
-            document = Document(io.BytesIO(file_bytes))
-            paragraphs: List[str] = []
-            for paragraph in document.paragraphs:
-                text = paragraph.text.strip()
-                if text:
-                    paragraphs.append(text)
-            return "\n\n".join(paragraphs).strip()
-        except ImportError as exc:
-            raise ImportError(
-                "python-docx is required for DOCX text extraction. "
-                "Install it with 'pip install python-docx'."
-            ) from exc
-        except Exception as exc:  # pragma: no cover - fallback path
-            print(f"[WARN] DOCX text extraction failed, falling back to raw text: {exc}")
-
-    # Excel workbooks (.xlsx, .xlsm, .xltx, .xltm)
-    if lower_name.endswith((".xlsx", ".xlsm", ".xltx", ".xltm")) or "spreadsheetml" in content_type:
-        try:
-            from openpyxl import load_workbook
-
-            workbook = load_workbook(io.BytesIO(file_bytes), data_only=True)
-            texts = []
-
-            for sheet in workbook.worksheets:
-                texts.append(f"# 시트: {sheet.title}")
-                for row in sheet.iter_rows(values_only=True):
-                    row_values = [
-                        str(value).strip()
-                        for value in row
-                        if value not in (None, "")
-                    ]
-                    if row_values:
-                        texts.append(" \t ".join(row_values))
-
-            return "\n".join(texts).strip()
-        except ImportError as exc:
-            raise ImportError(
-                "openpyxl is required for Excel text extraction. "
-                "Install it with 'pip install openpyxl'."
-            ) from exc
-        except Exception as exc:  # pragma: no cover - fallback path
-            print(f"[WARN] Excel text extraction failed, falling back to raw text: {exc}")
-
-    # Fallback: treat as UTF-8 text (e.g., .txt)
-    try:
-        return file_bytes.decode("utf-8")
-    except UnicodeDecodeError:
-        # Fallback to Latin-1 with replacement to avoid errors
-        return file_bytes.decode("latin-1", errors="replace")
 
+def get_drive_changes(
+    site_id: Optional[str] = None,
+    delta_link: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Collect changes to a site's document library using a Graph delta query.
 
-def get_document_content(document_id: str) -> str:
-    """Retrieve the text content of a SharePoint document.
-    
     Args:
-        document_id: Unique identifier of the document.
-        
-    Returns:
-        str: Text content extracted from the document.
-        
-    Note:
-        This function now supports basic text extraction for:
-
-        - Plain text files (.txt)
-        - Microsoft Word documents (.docx)
-        - PDF documents (.pdf, text-based)
+        site_id: SharePoint site identifier. If None, uses default from settings.
+        delta_link: ``@odata.deltaLink`` saved by a previous call. If None,
+            the delta query starts from scratch and reports every file.
 
-        For image-based or scanned PDFs, additional OCR processing
-        would be required (not implemented here).
+    Returns:
+        Dictionary with keys:
+        - 'changed': Document dicts for files created or modified since ``delta_link``
+        - 'deleted': IDs of items removed since ``delta_link``, and of files
+          that no longer pass the extension and size filters
+        - 'delta_link': Link to pass to the next call
+        - 'resync_required': True if ``delta_link`` had expired and a full
+          enumeration was returned instead
 
-    TODO:
-        - Handle very large documents more efficiently (streaming)
-        - Add OCR support for scanned PDFs
-        - Improve error handling and logging
+    Raises:
+        Exception: If the Graph API request fails.
     """
     settings = get_settings()
-    token = get_access_token()
     
-    # Demo mode: return realistic sample content
+    if site_id is None:
+        site_id = settings.sharepoint_site_id
+    
+    # Demo mode: nothing ever changes
     if settings.demo_mode:
-        print(f"[DEMO MODE] Returning sample content for {document_id}")
-        demo_contents = {
-            "doc_demo_1": """
+        print("[DEMO MODE] Returning empty delta")
+        return {"changed": [], "deleted": [], "delta_link": "", "resync_required": False}
+    
+    headers = {"Accept": "application/json"}
+    resync_required = False
+    extensions, max_size_bytes = _resolve_document_filters(None, None)
+    
+    try:
+        if delta_link:
+            url = delta_link
+        else:
+            drive_id = _get_drive_id(site_id)
+            url = f"https://graph.microsoft.com/v1.0/drives/{drive_id}/root/delta?$select={_DRIVE_ITEM_SELECT},deleted"
+        
+        changed: Dict[str, Dict[str, Any]] = {}
+        deleted: Dict[str, None] = {}
+        
+        while True:
+            response = _graph_request("GET", url, headers=headers)
+            
+            # 410 Gone: the delta token expired, start over with a full enumeration
+            if response.status_code == 410 and delta_link and not resync_required:
+                print("[Graph API] Delta link expired, restarting full enumeration")
+                resync_required = True
+                drive_id = _get_drive_id(site_id)
+                url = f"https://graph.microsoft.com/v1.0/drives/{drive_id}/root/delta?$select={_DRIVE_ITEM_SELECT},deleted"
+                changed.clear()
+                deleted.clear()
+                continue
+            
+            response.raise_for_status()
+            page = response.json()
+            
+            # An item can appear more than once; the last occurrence wins
+            for item in page.get("value", []):
+                item_id = item["id"]
+                if "deleted" in item:
+                    changed.pop(item_id, None)
+                    deleted[item_id] = None
+                elif "file" in item:
+                    deleted.pop(item_id, None)
+                    if _matches_document_filters(item, extensions, max_size_bytes, None):
+                        changed[item_id] = _metadata_from_item(item)
+                    else:
+                        # E.g. grew past the size limit: its old chunks must go
+                        changed.pop(item_id, None)
+                        deleted[item_id] = None
+            
+            if "@odata.nextLink" in page:
+                url = page["@odata.nextLink"]
+                continue
+            
+            new_delta_link = page.get("@odata.deltaLink", "")
+            break
+        
+        print(f"[Graph API] Delta: {len(changed)} changed, {len(deleted)} deleted")
+        return {
+            "changed": list(changed.values()),
+            "deleted": list(deleted),
+            "delta_link": new_delta_link,
+            "resync_required": resync_required,
+        }
+        
+    except httpx.HTTPError as e:
+        print(f"[ERROR] Failed to query drive delta: {e}")
+        if isinstance(e, httpx.HTTPStatusError):
+            print(f"[ERROR] Response: {e.response.text}")
+        raise Exception(f"Failed to query SharePoint changes: {e}")
+
+
+def _check_document_size(document_id: str, size: int, max_size_bytes: Optional[int]) -> None:
+    """Raise ``DocumentSkipped`` if ``size`` exceeds the configured maximum."""
+    if max_size_bytes and size > max_size_bytes:
+        raise DocumentSkipped(
+            document_id,
+            f"file size {size} bytes exceeds limit of {max_size_bytes} bytes",
+        )
+
+
+# Demo mode: realistic sample content per demo document
+_DEMO_CONTENTS = {
+    "doc_demo_1": """
 프로젝트 계획서
 
 1. 프로젝트 개요
@@ -278,8 +480,8 @@ def get_document_content(document_id: str) -> str:
 
 4. 기대 효과
 직원들이 필요한 정보를 빠르게 찾을 수 있어 업무 효율성이 30% 향상될 것으로 예상됩니다.
-            """,
-            "doc_demo_2": """
+    """,
+    "doc_demo_2": """
 기술 문서
 
 시스템 아키텍처
@@ -299,8 +501,8 @@ def get_document_content(document_id: str) -> str:
 - OAuth 2.0 인증
 - 역할 기반 접근 제어(RBAC)
 - 데이터 암호화
-            """,
-            "doc_demo_3": """
+    """,
+    "doc_demo_3": """
 회의록 2025-01-15
 
 참석자: 김철수, 이영희, 박민수
@@ -321,69 +523,269 @@ def get_document_content(document_id: str) -> str:
    - 토큰 만료 처리 → 캐싱 및 자동 갱신 로직 추가
 
 다음 회의: 2025-01-22
-            """,
-        }
+    """,
+}
+
+
+def _skip_on_extraction_error(document_id: str, blocks: Iterator[TextBlock]) -> Iterator[TextBlock]:
+    """Re-raise extraction failures of a lazily parsed document as ``DocumentSkipped``.
+
+    A failure after some blocks were produced ends the stream early instead,
+    so the text extracted so far is still indexed.
+    """
+    try:
+        yield from blocks
+    except ExtractionTruncated as e:
+        print(f"[WARN] {e}")
+    except ExtractionError as e:
+        raise DocumentSkipped(document_id, str(e))
+
+
+@contextmanager
+def open_document(
+    document_id: str,
+    site_id: Optional[str] = None,
+    metadata: Optional[Dict[str, Any]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Download a SharePoint document and expose its text as a stream of blocks.
+    
+    The download stays on disk (or in memory) until the ``with`` block
+    exits, so the text blocks can be consumed lazily: PDFs and Excel
+    workbooks of at least ``EXTRACTION_STREAM_MIN_MB`` are parsed page by
+    page or row group by row group in an extraction worker process as the
+    caller iterates, keeping memory flat for very large documents. Smaller
+    files are extracted up front in the extraction worker pool.
+    
+    Args:
+        document_id: Unique identifier of the document.
+        site_id: SharePoint site identifier. If None, uses default from settings.
+        metadata: Metadata already obtained for the document, e.g. from
+            ``iter_sharepoint_documents`` or ``get_documents_metadata``. If it
+            contains a download URL, no Graph item lookup is made at all.
+        
+    Yields:
+        Dictionary with keys:
+        - 'metadata': Normalized document metadata (see ``get_document_metadata``)
+        - 'size': Downloaded file size in bytes
+        - 'content_hash': Hex SHA-256 of the downloaded bytes
+        - 'blocks': Iterator of ``TextBlock`` with the document text in order
         
-        return demo_contents.get(document_id, f"[DEMO] 샘플 콘텐츠 for {document_id}")
+    Raises:
+        DocumentSkipped: If the file exceeds ``INDEX_MAX_FILE_SIZE_MB``, is
+            in a format without an extractor (images, archives, ...), or its
+            text extraction failed, timed out or crashed the extraction worker.
+        Exception: If the metadata lookup or download fails.
+        
+    Note:
+        The file is streamed into a ``DownloadSpool`` that keeps at most
+        ``DOWNLOAD_SPOOL_MAX_MEMORY_MB`` in memory and spills the rest to
+        disk; parsers read from that file instead of one in-memory copy.
+        Streamed files are parsed in the calling thread, without the worker
+        pool's timeout. Extraction results are cached by content hash (see
+        ``app.extraction.cache``), so unchanged files are never parsed twice.
+    """
+    settings = get_settings()
     
-    # Real implementation: Download and extract text from document
-    headers = {
-        "Authorization": f"Bearer {token}",
-    }
+    # Demo mode: return realistic sample content
+    if settings.demo_mode:
+        print(f"[DEMO MODE] Returning sample content for {document_id}")
+        text = _DEMO_CONTENTS.get(document_id, f"[DEMO] 샘플 콘텐츠 for {document_id}")
+        yield {
+            "metadata": metadata or get_document_metadata(document_id),
+            "size": len(text.encode("utf-8")),
+            "content_hash": hashlib.sha256(text.encode("utf-8")).hexdigest(),
+            "blocks": iter([TextBlock(text=text)]),
+        }
+        return
     
     try:
-        # Get document metadata including download URL
-        metadata_url = (
-            f"https://graph.microsoft.com/v1.0/sites/"
-            f"{settings.sharepoint_site_id}/drive/items/{document_id}"
-        )
-        metadata_response = requests.get(metadata_url, headers=headers)
-        metadata_response.raise_for_status()
-
-        item = metadata_response.json()
-        download_url = item.get("@microsoft.graph.downloadUrl")
-        file_name = item.get("name", f"{document_id}.bin")
-        content_type = item.get("file", {}).get("mimeType", "")
+        looked_up = False
+        if not metadata or not metadata.get("download_url"):
+            metadata = get_document_metadata(document_id, site_id=site_id)
+            looked_up = True
         
-        if not download_url:
+        if not metadata.get("download_url"):
             raise Exception(f"No download URL available for document {document_id}")
         
+        _, max_size_bytes = _resolve_document_filters(None, None)
+        _check_document_size(document_id, metadata.get("size", 0), max_size_bytes)
+        
         # Download the file content
         print(f"[Graph API] Downloading document {document_id}...")
-        file_response = requests.get(download_url)
-        file_response.raise_for_status()
-
-        # Extract text based on file type
-        file_bytes = file_response.content
-        text_content = _extract_text_from_file(
-            file_bytes=file_bytes,
-            file_name=file_name,
-            content_type=content_type or file_response.headers.get("Content-Type"),
+        file_response = _graph_request("GET", metadata["download_url"], authenticated=False, stream=True)
+        
+        # Pre-signed download URLs from enumeration expire after about an hour
+        if file_response.status_code in (401, 403, 404) and not looked_up:
+            file_response.close()
+            print(f"[Graph API] Download URL for {document_id} expired, refreshing metadata")
+            metadata = get_document_metadata(document_id, site_id=site_id, refresh=True)
+            file_response = _graph_request("GET", metadata["download_url"], authenticated=False, stream=True)
+        
+        spool = DownloadSpool(
+            max_memory_bytes=int(settings.download_spool_max_memory_mb * 1024 * 1024),
+            directory=settings.download_spool_dir,
         )
-
-        print(f"[Graph API] Downloaded {len(file_bytes)} bytes, extracted {len(text_content)} characters")
-        return text_content
+        try:
+            file_response.raise_for_status()
+            _check_document_size(
+                document_id,
+                int(file_response.headers.get("Content-Length") or 0),
+                max_size_bytes,
+            )
+            content_hash = hashlib.sha256()
+            for chunk in file_response.iter_bytes(chunk_size=settings.download_chunk_size_kb * 1024):
+                spool.write(chunk)
+                content_hash.update(chunk)
+                _check_document_size(document_id, spool.size, max_size_bytes)
+        except BaseException:
+            spool.close()
+            raise
+        finally:
+            file_response.close()
         
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"[ERROR] Failed to get document content: {e}")
         raise Exception(f"Failed to download document {document_id}: {e}")
+    
+    with spool:
+        file_name = metadata.get("name", f"{document_id}.bin")
+        content_type = metadata.get("mime_type") or file_response.headers.get("Content-Type")
+        location = "memory" if spool.in_memory else "disk"
+        print(f"[Graph API] Downloaded {spool.size} bytes ({location})")
+        
+        # Skip images, archives, media etc. before spending any parsing or embedding work
+        format_name = sniff_format(spool.open(), file_name, content_type)
+        if get_extractor(format_name) is None:
+            raise DocumentSkipped(document_id, str(UnsupportedFormat(format_name)))
+        
+        stream_min_bytes = settings.extraction_stream_min_mb * 1024 * 1024
+        digest = content_hash.hexdigest()
+        cache = get_extraction_cache()
+        cached_blocks = cache.get(digest) if cache is not None else None
+        if cached_blocks is not None:
+            # Same bytes already extracted by this extractor version: skip parsing
+            print(f"[Extraction] Using cached text for {file_name}")
+            blocks: Iterator[TextBlock] = cached_blocks
+        elif format_name in STREAMABLE_FORMATS and spool.size >= stream_min_bytes:
+            # Parse page by page (or row group by row group) in a worker process while
+            # the caller consumes the blocks. The cache wraps the extractor directly, so a truncated
+            # extraction reaches it as an error and is never published.
+            spool.open()
+            blocks = get_extraction_service().iter_blocks(
+                spool.getvalue() if spool.in_memory else spool.path,
+                file_name=file_name,
+                content_type=content_type,
+            )
+            if cache is not None:
+                blocks = cache.store(digest, blocks)
+            blocks = _skip_on_extraction_error(document_id, blocks)
+        else:
+            # Extract in a worker process: small files are sent as bytes,
+            # spilled ones by path (flushed first so the worker sees every byte)
+            spool.open()
+            try:
+                extracted = get_extraction_service().extract_blocks(
+                    spool.getvalue() if spool.in_memory else spool.path,
+                    file_name=file_name,
+                    content_type=content_type,
+                )
+                truncated = False
+            except ExtractionTruncated as e:
+                # Index what was extracted, but do not cache a partial result
+                print(f"[WARN] {e}")
+                extracted = e.blocks
+                truncated = True
+            except ExtractionError as e:
+                raise DocumentSkipped(document_id, str(e))
+            if cache is not None and not truncated:
+                for _ in cache.store(digest, extracted):
+                    pass
+            blocks = iter(extracted)
+        
+        yield {"metadata": metadata, "size": spool.size, "content_hash": digest, "blocks": blocks}
 
 
-def get_document_metadata(document_id: str) -> Dict[str, Any]:
+def fetch_document(
+    document_id: str,
+    site_id: Optional[str] = None,
+    metadata: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Download a SharePoint document and extract its text with one item lookup.
+    
+    Args:
+        document_id: Unique identifier of the document.
+        site_id: SharePoint site identifier. If None, uses default from settings.
+        metadata: Metadata already obtained for the document (see ``open_document``).
+        
+    Returns:
+        Dictionary with keys:
+        - 'metadata': Normalized document metadata (see ``get_document_metadata``)
+        - 'size': Downloaded file size in bytes
+        - 'text': Text content extracted from the document
+        
+    Raises:
+        DocumentSkipped: If the file exceeds ``INDEX_MAX_FILE_SIZE_MB``, is
+            in an unsupported format, or its text extraction failed.
+        Exception: If the metadata lookup or download fails.
+    """
+    with open_document(document_id, site_id=site_id, metadata=metadata) as document:
+        text = "\n\n".join(block.text for block in document["blocks"]).strip()
+        print(f"[Graph API] Extracted {len(text)} characters from {document_id}")
+        return {"metadata": document["metadata"], "size": document["size"], "text": text}
+
+
+def get_document_content(document_id: str, site_id: Optional[str] = None) -> str:
+    """Retrieve the text content of a SharePoint document.
+    
+    Args:
+        document_id: Unique identifier of the document.
+        site_id: SharePoint site identifier. If None, uses default from settings.
+        
+    Returns:
+        str: Text content extracted from the document.
+        
+    Note:
+        This function now supports basic text extraction for:
+
+        - Plain text files (.txt)
+        - Microsoft Word documents (.docx)
+        - PDF documents (.pdf, text-based)
+        - Excel workbooks (.xlsx)
+
+        For image-based or scanned PDFs, additional OCR processing
+        would be required (not implemented here). Use ``fetch_document``
+        when the metadata is needed as well.
+
+    TODO:
+        - Add OCR support for scanned PDFs
+        - Improve error handling and logging
+    """
+    return fetch_document(document_id, site_id=site_id)["text"]
+
+
+def get_document_metadata(
+    document_id: str,
+    site_id: Optional[str] = None,
+    refresh: bool = False,
+) -> Dict[str, Any]:
     """Retrieve metadata for a SharePoint document.
     
     Args:
         document_id: Unique identifier of the document.
+        site_id: SharePoint site identifier. If None, uses default from settings.
+        refresh: Bypass the metadata cache, e.g. because the cached download
+            URL was rejected.
         
     Returns:
         Dict containing document metadata (name, url, modified date, author, etc.).
         
-    TODO:
-        - Implement Graph API call to get document metadata
-        - Include all relevant metadata fields
+    Note:
+        Results are cached (see ``app.metadata_cache``). Cached entries are
+        revalidated with ``If-None-Match`` once ``METADATA_CACHE_TTL_SECONDS``
+        has passed and refetched once the download URL is older than
+        ``DOWNLOAD_URL_TTL_SECONDS``.
     """
     settings = get_settings()
-    token = get_access_token()
     
     # Demo mode: return realistic metadata
     if settings.demo_mode:
@@ -399,32 +801,166 @@ def get_document_metadata(document_id: str) -> Dict[str, Any]:
             "author": "Demo User",
         })
     
+    site_id = site_id or settings.sharepoint_site_id
+    cache = get_metadata_cache()
+    cache_key = (site_id, document_id)
+    state, entry = ("miss", None) if refresh else cache.lookup(cache_key)
+    
+    if state == "fresh":
+        return dict(entry.metadata)
+    
     # Real implementation: Get document metadata from Graph API
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Accept": "application/json",
-    }
+    headers = {"Accept": "application/json"}
+    if state == "stale":
+        headers["If-None-Match"] = entry.etag
     
     try:
-        metadata_url = f"https://graph.microsoft.com/v1.0/sites/{settings.sharepoint_site_id}/drive/items/{document_id}"
-        response = requests.get(metadata_url, headers=headers)
-        response.raise_for_status()
+        metadata_url = f"https://graph.microsoft.com/v1.0/sites/{site_id}/drive/items/{document_id}"
+        response = _graph_request("GET", metadata_url, headers=headers)
         
-        item = response.json()
+        if response.status_code == 304 and entry is not None:
+            cache.mark_not_modified(cache_key)
+            return dict(entry.metadata)
         
-        return {
-            "id": item["id"],
-            "name": item["name"],
-            "web_url": item.get("webUrl", ""),
-            "download_url": item.get("@microsoft.graph.downloadUrl", ""),
-            "modified_date": item.get("lastModifiedDateTime", ""),
-            "author": item.get("createdBy", {}).get("user", {}).get("displayName", "Unknown"),
-            "size": item.get("size", 0),
-        }
+        response.raise_for_status()
+        
+        metadata = _metadata_from_item(response.json())
+        cache.put(cache_key, metadata)
+        return metadata
         
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"[ERROR] Failed to get document metadata: {e}")
-        if hasattr(e, 'response') and e.response is not None:
+        if isinstance(e, httpx.HTTPStatusError):
             print(f"[ERROR] Response: {e.response.text}")
         raise Exception(f"Failed to get metadata for document {document_id}: {e}")
 
+
+# Graph accepts at most 20 requests per JSON batch
+GRAPH_BATCH_LIMIT = 20
+
+
+def get_documents_metadata(
+    document_ids: Iterable[str],
+    site_id: Optional[str] = None,
+    max_retries: int = 3,
+) -> Dict[str, Dict[str, Any]]:
+    """Retrieve metadata for many SharePoint documents using Graph JSON batching.
+    
+    Lookups are packed into ``$batch`` requests of up to 20 items. Items that
+    come back throttled (429) or with a transient server error (5xx) are
+    retried on their own, honoring ``Retry-After``, while the rest of the
+    batch is kept. Throttled items also slow down the tenant's limiter.
+    
+    Args:
+        document_ids: Unique identifiers of the documents.
+        site_id: SharePoint site identifier. If None, uses default from settings.
+        max_retries: Maximum retries per item for 429/5xx responses.
+        
+    Returns:
+        Dict mapping document ID to the same metadata dict returned by
+        ``get_document_metadata``. Documents that could not be retrieved
+        (e.g. 404, or still throttled after ``max_retries``) are omitted.
+        
+    Raises:
+        Exception: If a ``$batch`` request itself fails.
+        
+    Note:
+        Documents with a fresh metadata cache entry are answered from the
+        cache; all other lookups are fetched in full and cached.
+    """
+    settings = get_settings()
+    document_ids = list(dict.fromkeys(document_ids))
+    
+    if site_id is None:
+        site_id = settings.sharepoint_site_id
+    
+    # Demo mode: reuse the single-item demo metadata
+    if settings.demo_mode:
+        return {document_id: get_document_metadata(document_id) for document_id in document_ids}
+    
+    results: Dict[str, Dict[str, Any]] = {}
+    limiter = get_graph_limiter()
+    cache = get_metadata_cache()
+    
+    uncached_ids: List[str] = []
+    for document_id in document_ids:
+        state, entry = cache.lookup((site_id, document_id))
+        if state == "fresh":
+            results[document_id] = dict(entry.metadata)
+        else:
+            uncached_ids.append(document_id)
+    
+    try:
+        for offset in range(0, len(uncached_ids), GRAPH_BATCH_LIMIT):
+            pending = uncached_ids[offset:offset + GRAPH_BATCH_LIMIT]
+            attempt = 0
+            
+            while pending:
+                sent_at = time.monotonic()
+                headers = {
+                    "Content-Type": "application/json",
+                    "Accept": "application/json",
+                }
+                batch = {
+                    "requests": [
+                        {
+                            "id": str(index),
+                            "method": "GET",
+                            "url": f"/sites/{site_id}/drive/items/{document_id}?$select={_DRIVE_ITEM_SELECT}",
+                        }
+                        for index, document_id in enumerate(pending)
+                    ]
+                }
+                response = _graph_request(
+                    "POST",
+                    "https://graph.microsoft.com/v1.0/$batch",
+                    headers=headers,
+                    json=batch,
+                )
+                response.raise_for_status()
+                
+                retry_ids: List[str] = []
+                retry_delay = 0.0
+                throttled = False
+                for item_response in response.json().get("responses", []):
+                    document_id = pending[int(item_response["id"])]
+                    item_status = item_response.get("status", 0)
+                    
+                    if item_status == 200:
+                        results[document_id] = _metadata_from_item(item_response["body"])
+                        cache.put((site_id, document_id), results[document_id])
+                    elif item_status in RETRYABLE_STATUS_CODES:
+                        retry_ids.append(document_id)
+                        throttled = throttled or item_status in THROTTLE_STATUS_CODES
+                        retry_delay = max(
+                            retry_delay,
+                            _retry_after_seconds(item_response.get("headers", {}), attempt),
+                        )
+                    else:
+                        error = item_response.get("body", {}).get("error", {})
+                        print(
+                            f"[WARN] Metadata lookup for {document_id} failed "
+                            f"({item_status}): {error.get('message', '')}"
+                        )
+                
+                if retry_ids and attempt >= max_retries:
+                    print(f"[WARN] Giving up on {len(retry_ids)} metadata lookups after {attempt} retries")
+                    break
+                if retry_ids:
+                    attempt += 1
+                    print(f"[Graph API] Retrying {len(retry_ids)} throttled lookups in {retry_delay:.1f}s")
+                    if throttled:
+                        # Pauses every Graph request for this tenant, including the retry
+                        limiter.record_throttle(retry_delay, started_at=sent_at)
+                    else:
+                        time.sleep(retry_delay)
+                pending = retry_ids
+        
+        print(f"[Graph API] Batched metadata for {len(results)}/{len(document_ids)} documents")
+        return results
+        
+    except httpx.HTTPError as e:
+        print(f"[ERROR] Failed to get batched document metadata: {e}")
+        if isinstance(e, httpx.HTTPStatusError):
+            print(f"[ERROR] Response: {e.response.text}")
+        raise Exception(f"Failed to get metadata for {len(document_ids)} documents: {e}")
@@ -46,8 +46,11 @@ def load_llm_model(max_tokens=8096, temperature=0.3, top_p=0.8, llm_model_name='
         top_p: 상위 확률 파라미터
 
     Returns:
-        ChatOpenAI: 초기화된 LLM 모델
+        ChatOpenAI: 초기화된 LLM 모델 (LLM_PROVIDER=local이면 EchoChatModel)
     """
+    if os.getenv("LLM_PROVIDER", "openai").lower() == "local":
+        return _load_local_llm_model(max_tokens)
+
     # PwC GenAI Shared Service 설정
     base_url = os.getenv("PWC_GENAI_BASE_URL", "https://genai-sharedservice-americas.pwcinternal.com/v1")
     api_key = os.getenv("OPENAI_API_KEY")
@@ -78,6 +81,32 @@ def load_llm_model(max_tokens=8096, temperature=0.3, top_p=0.8, llm_model_name='
         return llm
 
 
+def _load_local_llm_model(max_tokens):
+    """오프라인 벤치마크용 로컬 에코 LLM을 초기화합니다.
+
+    Args:
+        max_tokens: 최대 토큰 수
+
+    Returns:
+        EchoChatModel: 문서 내용을 LOCAL_LLM_TOKENS_PER_SEC 속도로 돌려주는 모델
+    """
+    from local_models import EchoChatModel
+
+    tokens_per_second = float(os.getenv("LOCAL_LLM_TOKENS_PER_SEC", "50"))
+    cache_key = _get_cache_key("local_llm", max_tokens=max_tokens, tokens_per_second=tokens_per_second)
+
+    with _cache_lock:
+        if cache_key in _model_cache:
+            return _model_cache[cache_key]
+
+        _manage_cache_size()
+
+        print(f"[load_llm_model] Using local echo LLM ({tokens_per_second:g} tokens/s)")
+        llm = EchoChatModel(tokens_per_second=tokens_per_second, max_tokens=max_tokens)
+        _model_cache[cache_key] = llm
+        return llm
+
+
 def load_ocr_model(max_tokens=8096, temperature=0.3, top_p=0.8, model=None):
     """PwC GenAI Shared Service OCR 모델을 초기화합니다.
 
@@ -119,11 +148,22 @@ def load_ocr_model(max_tokens=8096, temperature=0.3, top_p=0.8, model=None):
 
 def load_embed_model(model_name: str = None):
     """
-    BGE-M3 또는 OpenAI를 선택하여 임베딩 모델을 로드.
-    GPU(CUDA) 자동 사용 지원.
+    EMBED_PROVIDER에 따라 임베딩 모델을 로드.
+
+    - openai (기본값): PwC GenAI Shared Service의 OpenAI 호환 임베딩
+    - local: 외부 호출 없는 해싱/랜덤 투영 임베딩 (오프라인 벤치마크용)
+      차원은 LOCAL_EMBED_DIMENSION (없으면 EMBEDDING_DIMENSION, 둘 다 0이면 1536),
+      요청당 모의 지연은 LOCAL_EMBED_LATENCY_MS
     """
 
     provider = os.getenv("EMBED_PROVIDER", "openai").lower()
+    if provider == "local":
+        from local_models import HashingEmbeddings
+
+        dimension = int(os.getenv("LOCAL_EMBED_DIMENSION") or os.getenv("EMBEDDING_DIMENSION") or 0) or 1536
+        latency_ms = float(os.getenv("LOCAL_EMBED_LATENCY_MS", "0"))
+        print(f"[load_embed_model] Using local hashing embedding ({dimension} dims)")
+        return HashingEmbeddings(dimension=dimension, latency_ms=latency_ms)
 
     print("[load_embed_model] Using OpenAI embedding")
     base_url = os.getenv("PWC_GENAI_BASE_URL", "https://genai-sharedservice-americas.pwcinternal.com/v1")
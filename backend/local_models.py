@@ -0,0 +1,157 @@
+"""오프라인 벤치마크용 로컬 임베딩/LLM 모델
+
+외부 게이트웨이 없이 인덱싱/검색 파이프라인 전체를 부하 테스트하고
+프로파일링하기 위한 결정적(deterministic) 모델입니다.
+EMBED_PROVIDER=local, LLM_PROVIDER=local 로 선택합니다 (llm_utils 참고).
+"""
+
+import re
+import time
+import zlib
+from typing import Any, Iterator, List, Optional
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+# 단어 및 단어 내부 문자 n-gram 추출 (한국어 어절의 조사/어미 변화에도 유사도 유지)
+_WORD_RE = re.compile(r"\w+")
+_CHAR_NGRAM = 3
+
+# 투영 행렬 시드 (프로세스/재시작과 무관하게 같은 텍스트는 같은 벡터)
+_PROJECTION_SEED = 0x10CA1
+
+
+class HashingEmbeddings(Embeddings):
+    """해싱 트릭 + 랜덤 투영 기반 로컬 임베딩 모델
+
+    텍스트의 단어/문자 n-gram을 crc32로 ``num_buckets``개 버킷에 해싱한
+    빈도 벡터를 고정 시드 가우시안 행렬로 ``dimension`` 차원에 투영하고
+    L2 정규화합니다. 배치 전체가 한 번의 행렬 곱으로 계산됩니다.
+
+    Attributes:
+        model: 모델 이름 (임베딩 캐시 키에 사용)
+        dimension: 임베딩 차원
+        latency: 요청 1회당 모의 지연 시간 (초)
+    """
+
+    def __init__(self, dimension: int = 1536, latency_ms: float = 0.0, num_buckets: int = 4096) -> None:
+        self.model = f"local.hashing-{dimension}"
+        self.dimension = dimension
+        self.latency = latency_ms / 1000
+        self.num_buckets = num_buckets
+
+        rng = np.random.default_rng(_PROJECTION_SEED)
+        self._projection = rng.standard_normal((num_buckets, dimension), dtype=np.float32)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """여러 텍스트를 임베딩합니다.
+
+        Args:
+            texts: 임베딩할 텍스트 목록
+
+        Returns:
+            List[List[float]]: 텍스트 순서대로의 단위 벡터 목록
+        """
+        self._simulate_latency()
+        return self._embed(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        """검색 질의 하나를 임베딩합니다."""
+        self._simulate_latency()
+        return self._embed([text])[0].tolist()
+
+    def _simulate_latency(self) -> None:
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        rows: List[int] = []
+        buckets: List[int] = []
+        for row, text in enumerate(texts):
+            features = _features(text)
+            buckets.extend(zlib.crc32(feature.encode("utf-8")) % self.num_buckets for feature in features)
+            rows.extend([row] * len(features))
+
+        counts = np.zeros((len(texts), self.num_buckets), dtype=np.float32)
+        np.add.at(counts, (np.asarray(rows, dtype=np.intp), np.asarray(buckets, dtype=np.intp)), 1.0)
+        # 빈도 편향 완화 (자주 나오는 단어가 벡터를 지배하지 않도록)
+        np.sqrt(counts, out=counts)
+
+        vectors = counts @ self._projection
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        # 빈 텍스트는 영벡터 대신 고정 단위 벡터 (코사인 거리 계산 시 NaN 방지)
+        vectors[norms[:, 0] == 0] = self._projection[0]
+        norms[norms == 0] = np.linalg.norm(self._projection[0])
+        return vectors / norms
+
+
+def _features(text: str) -> List[str]:
+    """해싱할 특징 목록 (소문자 단어 + 단어 내부 문자 n-gram)"""
+    features: List[str] = []
+    for word in _WORD_RE.findall(text.lower()):
+        features.append(word)
+        if len(word) > _CHAR_NGRAM:
+            features.extend(f"#{word[i:i + _CHAR_NGRAM]}" for i in range(len(word) - _CHAR_NGRAM + 1))
+    return features
+
+
+class EchoChatModel(BaseChatModel):
+    """프롬프트의 문서 내용을 그대로 돌려주는 로컬 LLM
+
+    ``<문서 내용>`` 구간이 있으면 그 부분을, 없으면 마지막 메시지를
+    공백 단위 토큰으로 나눠 ``tokens_per_second`` 속도로 생성(스트리밍)합니다.
+    ``invoke``도 같은 시간만큼 걸리므로 생성 지연이 포함된 검색 응답 시간을
+    측정할 수 있습니다.
+
+    Attributes:
+        model_name: 모델 이름
+        tokens_per_second: 초당 생성 토큰 수 (0 이하이면 지연 없음)
+        max_tokens: 최대 생성 토큰 수
+    """
+
+    model_name: str = "local.echo"
+    tokens_per_second: float = 50.0
+    max_tokens: int = 8096
+
+    @property
+    def _llm_type(self) -> str:
+        return "local-echo"
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        content = "".join(chunk.message.content for chunk in self._stream(messages, stop, run_manager, **kwargs))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        delay = 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        for token in self._echo_tokens(messages):
+            if delay:
+                time.sleep(delay)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    def _echo_tokens(self, messages: List[BaseMessage]) -> List[str]:
+        """돌려줄 텍스트를 공백을 포함한 토큰 단위로 분리"""
+        text = str(messages[-1].content) if messages else ""
+        match = re.search(r"<문서 내용>\s*(.*?)\s*</문서 내용>", text, re.DOTALL)
+        if match:
+            text = match.group(1)
+        return re.findall(r"\S+\s*", text)[:self.max_tokens]
@@ -0,0 +1,109 @@
+"""Script to measure the recall cost of Matryoshka embedding truncation.
+
+Chunk texts are sampled from the indexed collection and embedded at the
+model's full dimension. Each of the first ``--queries`` chunks is then used
+as a query: its exact top-k neighbours with full vectors are compared with
+the top-k found with vectors truncated to each candidate dimension and
+renormalized (as done with ``EMBEDDING_TRUNCATE_DIMENSION``).
+
+Usage:
+    python scripts/eval_truncation.py
+    python scripts/eval_truncation.py --samples 2000 --queries 200 --top-k 10 --dims 256 512 1024
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from typing import List
+
+import numpy as np
+
+from app.config import get_settings
+from app.qdrant_client import get_qdrant_client
+from llm_utils import load_embed_model
+
+
+def _sample_texts(limit: int) -> List[str]:
+    """Read up to ``limit`` chunk texts from the collection."""
+    client = get_qdrant_client()
+    collection_name = get_settings().qdrant_collection_name
+    texts: List[str] = []
+    offset = None
+    while len(texts) < limit:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            limit=min(256, limit - len(texts)),
+            offset=offset,
+            with_payload=["text"],
+            with_vectors=False,
+        )
+        texts.extend(point.payload["text"] for point in points if point.payload.get("text"))
+        if offset is None:
+            break
+    return texts
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _top_k(queries: np.ndarray, corpus: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k most similar corpus vectors, excluding the query itself."""
+    scores = queries @ corpus.T
+    scores[np.arange(len(queries)), np.arange(len(queries))] = -np.inf
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def main(samples: int, queries: int, top_k: int, dims: List[int]) -> None:
+    """Embed sampled chunks and report recall@k per truncated dimension.
+
+    Args:
+        samples: Number of chunk texts forming the corpus.
+        queries: Number of corpus chunks used as queries.
+        top_k: Number of neighbours compared.
+        dims: Candidate truncation dimensions.
+    """
+    print("=" * 60)
+    print("Matryoshka Truncation Recall")
+    print("=" * 60)
+
+    texts = _sample_texts(samples)
+    if len(texts) <= top_k:
+        print(f"✗ Only {len(texts)} chunks indexed; index more documents first")
+        sys.exit(1)
+
+    model = load_embed_model()
+    vectors: List[List[float]] = []
+    for start in range(0, len(texts), 128):
+        vectors.extend(model.embed_documents(texts[start:start + 128]))
+    full = _normalize(np.asarray(vectors, dtype=np.float32))
+    queries = min(queries, len(texts))
+    print(f"\nCorpus: {len(texts)} chunks, {queries} queries, full dimension {full.shape[1]}\n")
+
+    reference = _top_k(full[:queries], full, top_k)
+    print(f"{'dims':>6} {'recall@' + str(top_k):>10} {'float32 MB':>11} {'float16 MB':>11}")
+    for dim in sorted(set(dims) | {full.shape[1]}):
+        if dim > full.shape[1]:
+            continue
+        truncated = _normalize(full[:, :dim].copy())
+        found = _top_k(truncated[:queries], truncated, top_k)
+        recall = np.mean([len(set(a) & set(b)) / top_k for a, b in zip(reference, found)])
+        size_mb = len(texts) * dim * 4 / 1024 / 1024
+        print(f"{dim:>6} {recall:>10.3f} {size_mb:>11.2f} {size_mb / 2:>11.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--dims", type=int, nargs="+", default=[256, 512, 1024])
+    args = parser.parse_args()
+
+    main(args.samples, args.queries, args.top_k, args.dims)
@@ -2,6 +2,11 @@
 
 This script can be run from the command line to index all SharePoint documents
 or specific documents by ID.
+
+Usage:
+    python scripts/run_indexing.py              # index all documents
+    python scripts/run_indexing.py <doc_id>     # index a single document
+    python scripts/run_indexing.py --sync       # index only changes since the last sync
 """
 
 import sys
@@ -13,14 +18,19 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from typing import Optional
 
 from app.qdrant_client import ensure_collection_exists
-from app.rag.indexer import index_all_sharepoint_documents, index_sharepoint_document
+from app.rag.indexer import (
+    index_all_sharepoint_documents,
+    index_sharepoint_document,
+    sync_sharepoint_documents,
+)
 
 
-def main(document_id: Optional[str] = None) -> None:
+def main(document_id: Optional[str] = None, sync: bool = False) -> None:
     """Run the indexing process.
     
     Args:
         document_id: Optional document ID to index. If None, indexes all documents.
+        sync: Index only documents changed since the last sync (Graph delta query).
     """
     print("=" * 60)
     print("RAG-SPO Document Indexing Script")
@@ -41,6 +51,13 @@ def main(document_id: Optional[str] = None) -> None:
             print(f"\nIndexing specific document: {document_id}")
             result = index_sharepoint_document(document_id)
             print(f"✓ Indexed {result['chunks_indexed']} chunks from document {document_id}")
+        elif sync:
+            print("\nSyncing changed SharePoint documents...")
+            result = sync_sharepoint_documents()
+            print(
+                f"✓ Re-indexed {result['documents_indexed']} documents "
+                f"({result['total_chunks']} chunks), removed {result['documents_deleted']}"
+            )
         else:
             print("\nIndexing all SharePoint documents...")
             result = index_all_sharepoint_documents()
@@ -59,9 +76,13 @@ def main(document_id: Optional[str] = None) -> None:
 if __name__ == "__main__":
     # Parse command line arguments
     doc_id = None
+    sync_mode = False
     if len(sys.argv) > 1:
-        doc_id = sys.argv[1]
-        print(f"Document ID provided: {doc_id}")
+        if sys.argv[1] == "--sync":
+            sync_mode = True
+        else:
+            doc_id = sys.argv[1]
+            print(f"Document ID provided: {doc_id}")
     
-    main(document_id=doc_id)
+    main(document_id=doc_id, sync=sync_mode)
 